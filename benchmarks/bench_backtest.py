@@ -0,0 +1,136 @@
+"""
+Time of a parameter sweep with `src.strategy.backtest` over a synthetic day of books and fair values,
+single process and on the process pool. Also checks that the vectorized quote matches `CustomBot`'s,
+and that quotes around a fair value near or below zero (market 6) stay a bounded distance from it.
+
+Usage: python -m benchmarks.bench_backtest [events_per_second] [processes]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from src.strategy.backtest import (DEFAULT_GRID, FAIR_STD_COLUMNS, ProductTape, align_fair_values, grid,
+                                   run_backtest, sweep)
+from src.strategy.quoting import QuoteParams, quote, quote_arrays
+
+DAY_NS = 86_400 * 10**9
+
+def synthetic_day(events_per_second: float, seed=0):
+    """
+    Random-walk books for both products, trades at the touch, and a fair value and std every 3 minutes.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    tapes = {}
+    for product, start in (('5_Flights', 3000.0), ('6_Airport', 100.0)):
+        n = int(86_400 * events_per_second)
+        timestamp = np.sort(rng.integers(0, DAY_NS, n))
+        mid = start + np.cumsum(rng.choice([-1.0, 0.0, 0.0, 0.0, 1.0], n))
+        half = rng.integers(1, 4, n)
+        n_trades = n // 10
+        trade_at = np.sort(rng.integers(0, n, n_trades))
+        trade_side = rng.choice([-1, 1], n_trades)
+        tapes[product] = ProductTape(
+            timestamp=timestamp,
+            best_bid=mid - half,
+            best_ask=mid + half,
+            bid_volume=rng.integers(1, 20, n),
+            ask_volume=rng.integers(1, 20, n),
+            trade_timestamp=timestamp[trade_at] + 1,
+            trade_price=mid[trade_at] + trade_side * half[trade_at],
+        )
+
+    # Fair values every 3 minutes, a few ticks off the mid at that time
+    fair_times = np.arange(0, DAY_NS, 180 * 10**9)
+    fair_values = pd.DataFrame(index=pd.to_datetime(fair_times))
+    for product, column, std_column, std in (('5_Flights', 'market5_estimate', 'market5_std', 12.0),
+                                             ('6_Airport', 'market6_estimate', 'market6_std', 36.0)):
+        tape = tapes[product]
+        at = np.clip(np.searchsorted(tape.timestamp, fair_times), 0, len(tape) - 1)
+        fair_values[column] = (tape.best_bid[at] + tape.best_ask[at]) / 2 + rng.normal(0, 3, len(fair_times))
+        # Settlement stds of the size the Monte Carlo gives
+        fair_values[std_column] = std * rng.uniform(0.8, 1.2, len(fair_times))
+    return tapes, fair_values
+
+def check_quote_parity(n=20_000, seed=1):
+    rng = np.random.default_rng(seed)
+    bid = rng.integers(50, 150, n).astype(float)
+    ask = bid + rng.integers(1, 5, n)
+    fair = rng.uniform(40, 160, n)
+    std = rng.uniform(0, 10, n)
+    params = QuoteParams(min_spread=2.0, fair_weight=0.3)
+    valid, is_buy, price = quote_arrays(bid, ask, fair, std, params)
+    for i in range(n):
+        expected = quote(bid[i], ask[i], fair[i], std[i], params)
+        assert valid[i] and (bool(is_buy[i]), int(price[i])) == expected[:2], (i, expected, is_buy[i], price[i])
+
+def check_quote_near_zero():
+    params = QuoteParams(min_spread=2.0, spread_per_std=0.5, fair_weight=0.5)
+    # Market 6 figures from bench_montecarlo: mean about 2.2, std about 36
+    assert quote(0, 6, 2.2, 36.2, params) == (False, 21, 2.6)
+    assert quote(-2, 2, 2.2, 36.2, params) == (True, -17, 1.1)
+    # Fair value exactly zero and negative: the spread comes from the std alone, not from the fair value
+    assert quote(-1, 1, 0.0, 10.0, params) == (False, 5, 0.0)
+    assert quote(-30, -24, -20.0, 4.0, params) == (True, -26, -23.5)
+    assert quote(-30, -24, -40.0, 4.0, params) == (False, -32, -33.5)
+    for fair in (-50.0, -2.0, -0.1, 0.0, 0.1, 2.0, 50.0):
+        for std in (0.0, 1.0, 36.2):
+            is_buy, price, mean_price = quote(fair - 3, fair + 3, fair, std, params)
+            half_spread = max(params.min_spread, params.spread_per_std * std)
+            # Passive side of the mean, at most the half spread (plus rounding) away from it
+            assert (price <= mean_price if is_buy else price >= mean_price), (fair, std)
+            assert abs(price - mean_price) <= half_spread + 0.5, (fair, std, price)
+
+def check_inventory_skew():
+    params = QuoteParams(min_spread=2.0, fair_weight=0.5, inventory_skew=1.0)
+    # The skew is the same number of price units wherever the fair value is, zero and negative included
+    for fair in (-40.0, 0.0, 2.2, 3000.0):
+        flat = quote(fair - 1, fair + 1, fair, 0.0, params, 0)
+        long = quote(fair - 1, fair + 1, fair, 0.0, params, 4)
+        short = quote(fair - 1, fair + 1, fair, 0.0, params, -4)
+        assert long[2] == flat[2] - 2.0 and short[2] == flat[2] + 2.0, (fair, flat, long, short)
+        assert not long[0] and short[0], (fair, long, short)
+    valid, is_buy, price = quote_arrays(np.array([-1.0, 2199.0]), np.array([1.0, 2201.0]), np.array([0.0, 2200.0]),
+                                        np.zeros(2), params, np.array([4, -4]))
+    assert [quote(-1, 1, 0.0, 0.0, params, 4)[:2], quote(2199, 2201, 2200.0, 0.0, params, -4)[:2]] == \
+        [(bool(b), int(p)) for b, p in zip(is_buy, price)]
+
+def check_backtest_uses_stds(tapes, aligned, aligned_stds):
+    # The recorded std widens the quote as it does live: a wide spread_per_std sends fewer orders into fills
+    narrow = QuoteParams(min_spread=1.0, spread_per_std=0.0)
+    wide = QuoteParams(min_spread=1.0, spread_per_std=1.0)
+    assert run_backtest(tapes, aligned, narrow, fair_stds=aligned_stds) == run_backtest(tapes, aligned, narrow)
+    with_stds = run_backtest(tapes, aligned, wide, fair_stds=aligned_stds)
+    without = run_backtest(tapes, aligned, wide)
+    assert with_stds["fills"] < without["fills"], (with_stds, without)
+
+def main(events_per_second=2.0, processes=None):
+    check_quote_parity()
+    check_quote_near_zero()
+    check_inventory_skew()
+    tapes, fair_values = synthetic_day(events_per_second)
+    aligned = align_fair_values(tapes, fair_values)
+    aligned_stds = align_fair_values(tapes, fair_values, FAIR_STD_COLUMNS)
+    check_backtest_uses_stds(tapes, aligned, aligned_stds)
+    params_list = grid(**DEFAULT_GRID)
+    ticks = sum(len(tape) for tape in tapes.values())
+    print(f"{len(params_list)} configurations over {ticks:,} book events")
+
+    start = time.perf_counter()
+    single = sweep(tapes, aligned, params_list[:20], processes=1, fair_stds=aligned_stds)
+    per_config = (time.perf_counter() - start) / 20
+    print(f"1 process: {per_config * 1000:.1f} ms per configuration "
+          f"(~{per_config * len(params_list):.1f}s for the grid)")
+
+    processes = processes or os.cpu_count()
+    start = time.perf_counter()
+    results = sweep(tapes, aligned, params_list, processes=processes, fair_stds=aligned_stds)
+    print(f"{processes} processes: full grid in {time.perf_counter() - start:.1f}s")
+    print(results.head(5).to_string())
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0,
+         int(sys.argv[2]) if len(sys.argv) > 2 else None)
@@ -0,0 +1,181 @@
+"""
+End-to-end load test of `CustomBot` against the local exchange simulator (src/sim/exchange.py), no network needed.
+
+1. Tick-to-order: with no background flow, a market bid on 5_Flights is added and cancelled in turn,
+   which moves the bot's quote. Measures the time from the book change in the engine to the bot's
+   first request (the cancel) and to its new order arriving at the exchange. Ticks are spaced out so the
+   order gateway's rate limit is not part of the measurement; at high event rates it caps orders/s.
+2. Event rate: background flow at increasing rates. Reports the rate the engine actually produced,
+   how many books the bot's stream received, how many its handler processed or conflated away,
+   and the age of the book when the handler picked it up.
+
+Also checks that a requote whose cancel fails sends nothing and reconciles before the next one, and that
+`stop()` waits for a handler that is still running before it closes the order gateway.
+
+Usage: python -m benchmarks.bench_exchange [ticks] [seconds_per_rate] [latency_ms]
+"""
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+
+from imcity_template import OrderRequest, Side
+from main import CustomBot
+from src.runtime.runtime import FairValues, Runtime
+from src.sim.exchange import MARKET_USER, SimExchange
+
+# Wide enough that the bot's quote (at least min_spread from the mean) rests instead of crossing
+HALF_SPREAD = 40
+FAIR_VALUES = FairValues(m5=3010, m6=100)
+RATES = (50, 200, 1000, 5000)
+
+def start_bot(exchange: SimExchange) -> CustomBot:
+    runtime = Runtime(lambda: FAIR_VALUES)
+    runtime.publish(FAIR_VALUES)
+    # The fixed fair values never go stale during the test
+    bot = CustomBot(exchange.url, "loadtest", "loadtest", runtime, max_fair_value_age_s=float("inf"))
+    bot.start(dispatch="conflate")
+    return bot
+
+def wait_for(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.0005)
+    return True
+
+def percentiles(name: str, seconds: list[float]):
+    if not seconds:
+        print(f"{name:<22} no samples")
+        return
+    ms = np.asarray(seconds) * 1000
+    print(f"{name:<22} n={len(ms):4}  p50 {np.percentile(ms, 50):7.2f} ms  p90 {np.percentile(ms, 90):7.2f} ms  "
+          f"p99 {np.percentile(ms, 99):7.2f} ms  max {ms.max():7.2f} ms")
+
+def check_requote_cancel_failure():
+    exchange = SimExchange(event_rate=0, depth=10, half_spread=HALF_SPREAD, seed=0).start()
+    # Not started: no stream, so only the requotes below send anything
+    bot = CustomBot(exchange.url, "loadtest", "loadtest", Runtime(None))
+    try:
+        [resting] = bot.requote("5_Flights", [OrderRequest("5_Flights", 3000, Side.BUY, 1)])
+        # The order goes away behind the bot's back, so the bot's cancel of it fails
+        exchange.engine.cancel("loadtest", resting.id)
+        seen = len(exchange.order_log)
+        assert bot.requote("5_Flights", [OrderRequest("5_Flights", 3001, Side.BUY, 1)]) == []
+        assert [method for _, method, _ in exchange.order_log[seen:]] == ["DELETE"] and bot.orders.stale
+        # The next requote lists the exchange's orders first and then sends
+        [sent] = bot.requote("5_Flights", [OrderRequest("5_Flights", 3001, Side.BUY, 1)])
+        assert [(o.id, o.price) for o in exchange.engine.orders_of("loadtest", "5_Flights")] == [(sent.id, 3001)]
+    finally:
+        bot.gateway.close()
+        exchange.close()
+
+def check_stop_waits_for_handlers():
+    exchange = SimExchange(event_rate=0, depth=10, half_spread=HALF_SPREAD, seed=0).start()
+    bot = start_bot(exchange)
+    started, finished = [], []
+    handle = bot.on_orderbook
+
+    def slow(book):
+        started.append(time.monotonic())
+        time.sleep(0.3)
+        handle(book)
+        finished.append(time.monotonic())
+
+    try:
+        assert wait_for(lambda: len(exchange.engine.orders_of("loadtest", "5_Flights")) == 1, 10)
+        # The next book reaches a handler that is still in the middle of it when stop() is called
+        bot._sse_thread.dispatcher._handle_orderbook = slow
+        exchange.engine.submit(MARKET_USER, "5_Flights", "BUY", 2975, 1)
+        assert wait_for(lambda: started, 5)
+    finally:
+        bot.stop()
+        stopped = time.monotonic()
+        bot.stop()
+        exchange.close()
+    # The handler's requote ran on the open gateway and nothing ran after stop() returned
+    assert len(finished) == len(started) and finished[-1] <= stopped, (started, finished, stopped)
+
+def tick_to_order(n_ticks: int, latency_ms: float) -> tuple[list[float], list[float]]:
+    exchange = SimExchange(event_rate=0, depth=10, half_spread=HALF_SPREAD, latency_ms=latency_ms, seed=0).start()
+    engine = exchange.engine
+    bot = start_bot(exchange)
+    to_request, to_order = [], []
+    try:
+        if not wait_for(lambda: len(engine.orders_of("loadtest", "5_Flights")) == 1, 10):
+            return to_request, to_order
+
+        bid = max(o.price for o in engine.orders_of(MARKET_USER, "5_Flights") if o.side == "BUY")
+        improved = None
+        for _ in range(n_ticks):
+            # Two requests per tick; spaced so the gateway's rate limiter never holds them back
+            time.sleep(0.15)
+            seen = len(exchange.order_log)
+            start = time.monotonic()
+            # Each move shifts the market mid by 2 and the bot's quote by about a tick
+            if improved is None:
+                improved = engine.submit(MARKET_USER, "5_Flights", "BUY", bid + 4, 1)["id"]
+            else:
+                engine.cancel(MARKET_USER, improved)
+                improved = None
+            if not wait_for(lambda: any(method == "POST" for _, method, _ in exchange.order_log[seen:]), 2):
+                continue
+            requests = exchange.order_log[seen:]
+            to_request.append(requests[0][0] - start)
+            to_order.append(next(at for at, method, _ in requests if method == "POST") - start)
+    finally:
+        bot.stop()
+        exchange.close()
+    return to_request, to_order
+
+def event_rate(rate: float, seconds: float, latency_ms: float) -> dict:
+    exchange = SimExchange(event_rate=0, depth=10, half_spread=HALF_SPREAD, latency_ms=latency_ms, seed=1).start()
+    bot = start_bot(exchange)
+    try:
+        wait_for(lambda: (bot.dispatcher_stats() or {}).get("handled", 0) >= 2, 10)
+        before = bot.dispatcher_stats()
+        published, orders = exchange.engine.events_published, len(exchange.order_log)
+        exchange.flow.event_rate = rate
+        exchange.flow.start()
+        time.sleep(seconds)
+        exchange.flow.stop()
+        after = bot.dispatcher_stats()
+        return {
+            "produced": (exchange.engine.events_published - published) / seconds,
+            "received": (after["received"] - before["received"]) / seconds,
+            "handled": (after["handled"] - before["handled"]) / seconds,
+            "conflated": (after["dropped"] - before["dropped"]) / max(after["received"] - before["received"], 1),
+            "age_avg": after["age_avg"],
+            "age_max": after["age_max"],
+            "orders": (len(exchange.order_log) - orders) / seconds,
+        }
+    finally:
+        bot.stop()
+        exchange.close()
+
+def main(n_ticks=100, seconds=5.0, latency_ms=0.0):
+    # CustomBot and SSEThread print as they go
+    with contextlib.redirect_stdout(io.StringIO()):
+        check_requote_cancel_failure()
+        check_stop_waits_for_handlers()
+        to_request, to_order = tick_to_order(n_ticks, latency_ms)
+        results = {rate: event_rate(rate, seconds, latency_ms) for rate in RATES}
+
+    print(f"Tick-to-order, {n_ticks} ticks, {latency_ms} ms injected REST latency")
+    percentiles("tick -> first request", to_request)
+    percentiles("tick -> new order", to_order)
+
+    print(f"\nSustained event rate, {seconds}s per rate")
+    print(f"{'target/s':>9} {'produced/s':>10} {'received/s':>10} {'handled/s':>9} {'conflated':>9} "
+          f"{'age avg':>9} {'age max':>9} {'orders/s':>8}")
+    for rate, r in results.items():
+        print(f"{rate:9.0f} {r['produced']:10.1f} {r['received']:10.1f} {r['handled']:9.1f} {r['conflated']:9.1%} "
+              f"{r['age_avg'] * 1000:7.2f}ms {r['age_max'] * 1000:7.2f}ms {r['orders']:8.1f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 5.0,
+         float(sys.argv[3]) if len(sys.argv) > 3 else 0.0)
@@ -0,0 +1,54 @@
+"""
+Times simulate_settlements on a synthetic full day: 450 arrivals and 450 departures spread over the price6 window.
+
+The target is well under 100 ms for 10k scenarios. On a single slow core (np.sum over 10M floats in about
+12 ms) it measures about 80 ms best and 85-95 ms median. That is under the target but not by much: the
+remaining cost is the few full passes over the 9M 16-bit uniforms.
+
+Also checks that with every flight already flown the simulation gives exactly `price6`, including flights
+timed at either end of the window.
+
+Usage: python -m benchmarks.bench_montecarlo [n_scenarios]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.indicators.markets import PRICE6_END, PRICE6_START, price6
+from src.indicators.montecarlo import simulate_settlements
+
+def _schedule(rng, n_flights):
+    minutes = np.sort(rng.integers(0, 24 * 60, n_flights))
+    index = pd.DatetimeIndex(PRICE6_START + pd.to_timedelta(minutes, unit='min'), name='expected_time')
+    return pd.DataFrame({'flight_num': [f"LH {i}" for i in range(n_flights)]}, index=index)
+
+def check_flown_matches_price6(rng):
+    arrivals, departures = _schedule(rng, 60), _schedule(rng, 40)
+    # Flights at both ends of the window count in price6 (the end one in a bucket of its own)
+    edges = pd.DatetimeIndex([PRICE6_START, PRICE6_END, PRICE6_END], name='expected_time')
+    arrivals = pd.concat([arrivals, pd.DataFrame({'flight_num': ['A', 'B', 'C']}, index=edges)]).sort_index()
+    result = simulate_settlements(arrivals, departures, n_scenarios=100, now=PRICE6_END + pd.Timedelta(days=1), seed=0)
+    assert result.price6.std == 0 and result.price6.mean == price6(arrivals, departures), \
+        (result.price6.mean, price6(arrivals, departures))
+
+def main(n_scenarios=10_000, repeats=10):
+    check_flown_matches_price6(np.random.default_rng(1))
+    rng = np.random.default_rng(0)
+    arrivals, departures = _schedule(rng, 450), _schedule(rng, 450)
+
+    simulate_settlements(arrivals, departures, n_scenarios=n_scenarios, seed=0)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = simulate_settlements(arrivals, departures, n_scenarios=n_scenarios, seed=0)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{n_scenarios} scenarios x 900 flights: best {min(timings) * 1000:.1f} ms, "
+          f"median {np.median(timings) * 1000:.1f} ms")
+    print(f"price5: mean {result.price5.mean:.1f} std {result.price5.std:.1f}")
+    print(f"price6: mean {result.price6.mean:.1f} std {result.price6.std:.1f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,82 @@
+"""
+Per-event cost of turning an `order` SSE event into the OrderBook handed to on_orderbook,
+before (sorted dicts + frozen Order per level) and after (in-place LocalBook), on books of growing depth.
+
+Usage: python -m benchmarks.bench_orderbook [events]
+"""
+import random
+import sys
+import time
+
+from imcity_template import LocalBook, Order, OrderBook
+
+def legacy_orderbook(orderbook):
+    # SSEThread._handle_orderbook_change before the local book
+    buy_orders = sorted(
+        [
+            {"price": float(price), "volume": volumes["marketVolume"], "own_volume": volumes["userVolume"]}
+            for price, volumes in orderbook["buyOrders"].items()
+        ],
+        key=lambda d: -d["price"],
+    )
+    sell_orders = sorted(
+        [
+            {"price": float(price), "volume": volumes["marketVolume"], "own_volume": volumes["userVolume"]}
+            for price, volumes in orderbook["sellOrders"].items()
+        ],
+        key=lambda d: d["price"],
+    )
+    return OrderBook(
+        orderbook["productsymbol"],
+        orderbook["tickSize"],
+        list(map(lambda order: Order(**order), buy_orders)),
+        list(map(lambda order: Order(**order), sell_orders)),
+    )
+
+def make_events(depth, n_events, level_change_rate=0.1, seed=0):
+    """
+    Full-book events as the exchange sends them. Most events only change volumes;
+    `level_change_rate` of them add or remove a price level.
+    """
+    rng = random.Random(seed)
+    bids = {str(1000 - i): rng.randint(1, 50) for i in range(depth)}
+    asks = {str(1001 + i): rng.randint(1, 50) for i in range(depth)}
+    events = []
+    for _ in range(n_events):
+        side = bids if rng.random() < 0.5 else asks
+        if rng.random() < level_change_rate:
+            price = rng.choice(list(side))
+            del side[price]
+            side[str(int(price) + (depth if side is asks else -depth))] = rng.randint(1, 50)
+        else:
+            side[rng.choice(list(side))] = rng.randint(1, 50)
+        events.append({
+            "productsymbol": "6_Airport",
+            "tickSize": 1.0,
+            "buyOrders": {p: {"marketVolume": v, "userVolume": 0} for p, v in bids.items()},
+            "sellOrders": {p: {"marketVolume": v, "userVolume": 0} for p, v in asks.items()},
+        })
+    return events
+
+def _per_event(handle, events):
+    start = time.perf_counter()
+    for event in events:
+        book = handle(event)
+        book.buy_orders[0].price, book.sell_orders[0].price
+    return (time.perf_counter() - start) / len(events)
+
+def main(n_events=2000):
+    for depth in (5, 50, 500):
+        events = make_events(depth, n_events)
+        local = LocalBook("6_Airport", 1.0)
+
+        for event in events[:50]:
+            assert legacy_orderbook(event).to_dict() == local.update(event).to_dict()
+
+        before = _per_event(legacy_orderbook, events)
+        after = _per_event(LocalBook("6_Airport", 1.0).update, events)
+        print(f"depth={depth:4}  before={before * 1e6:8.1f} us/event  after={after * 1e6:7.1f} us/event  "
+              f"speedup={before / after:5.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
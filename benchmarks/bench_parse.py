@@ -0,0 +1,37 @@
+"""
+Compares the BeautifulSoup parser with the streaming parser on the saved schedule pages.
+
+Usage: python -m benchmarks.bench_parse [repeats]
+"""
+import sys
+import time
+from pathlib import Path
+
+from src.fetch.extract_html import parse_muc_schedule, parse_muc_schedule_stream
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+def _best_of(parse, html_content, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parse(html_content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(repeats=30):
+    for path in sorted(FIXTURES.glob("muc_*.html")):
+        html_content = path.read_text(encoding="utf-8")
+
+        expected = parse_muc_schedule(html_content)
+        actual = parse_muc_schedule_stream(html_content)
+        if not expected.equals(actual):
+            raise SystemExit(f"{path.name}: streaming parser output differs from parse_muc_schedule")
+
+        bs4_seconds = _best_of(parse_muc_schedule, html_content, repeats)
+        stream_seconds = _best_of(parse_muc_schedule_stream, html_content, repeats)
+        print(f"{path.name:32} rows={len(expected):3}  bs4={bs4_seconds * 1000:7.2f} ms  "
+              f"stream={stream_seconds * 1000:6.2f} ms  speedup={bs4_seconds / stream_seconds:5.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
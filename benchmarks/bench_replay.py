@@ -0,0 +1,65 @@
+"""
+Records a session from the local exchange simulator with `StreamRecorder`, then replays it into
+`CustomBot` as fast as possible with `ReplayEngine` and reports the replay speed.
+
+On a single slow core it replays about 20k events/s (about 48 us per event, 35-40x real time at the
+default 500 events/s), so a full day at that rate (about 45M events) takes about 40 minutes, not seconds.
+Order calls are already made inline (`InlineGateway`); what is left is spread over JSON decoding, the
+book updates, the fill model and the bot's own handler, with no single hot spot left to remove.
+
+Usage: python -m benchmarks.bench_replay [record_seconds] [event_rate]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from imcity_template import BaseBot
+from main import CustomBot
+from src.runtime.runtime import FairValues, Runtime
+from src.sim.exchange import SimExchange
+from src.sim.replay import ReplayEngine, StreamRecorder
+
+FAIR_VALUES = FairValues(m5=3010, m6=100)
+
+class PassiveBot(BaseBot):
+    def on_orderbook(self, orderbook):
+        pass
+
+    def on_trades(self, trades):
+        pass
+
+def record(path: str, seconds: float, event_rate: float) -> int:
+    exchange = SimExchange(event_rate=event_rate, depth=10, half_spread=40, seed=0).start()
+    bot = PassiveBot(exchange.url, "recorder", "recorder")
+    with StreamRecorder(path) as recorder:
+        bot.start(recorder=recorder)
+        time.sleep(seconds)
+        bot.stop()
+    exchange.close()
+    return recorder.events
+
+def main(seconds=10.0, event_rate=500.0):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.sselog.gz")
+        with contextlib.redirect_stdout(io.StringIO()):
+            events = record(path, seconds, event_rate)
+
+            runtime = Runtime(lambda: FAIR_VALUES)
+            runtime.publish(FAIR_VALUES)
+            bot = CustomBot("http://replay", "replay", "replay", runtime)
+            stats = ReplayEngine(bot, path).run()
+
+        print(f"Recorded {events} events in {seconds:.0f}s ({os.path.getsize(path) / 1024:.0f} KiB gzipped)")
+        print(f"Replayed {stats.events} events ({stats.order_events} books, {stats.trade_events} trades) "
+              f"in {stats.wall_seconds:.2f}s: {stats.events / stats.wall_seconds:,.0f} events/s, "
+              f"{stats.recorded_seconds / stats.wall_seconds:,.0f}x real time")
+        print(f"Fills {stats.fills}, positions {stats.positions}")
+        day_events = 86_400 * events / seconds
+        print(f"A day at this event rate ({day_events:,.0f} events) replays in ~{day_events * stats.wall_seconds / stats.events:,.0f}s")
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 500.0)
@@ -0,0 +1,125 @@
+"""
+Read latency of the shared fair-value feed, unchanged (cached) and right after a publish, compared with
+reading `Runtime.snapshot` in-process. A reader in a second process then checks that no read is torn
+while the producer publishes as fast as it can. Also checks that a producer killed mid-publish does not
+block readers and that a restarted producer invalidates what they cached.
+
+Usage: python -m benchmarks.bench_shared [reads] [check_s]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from src.indicators.buckets import Price6Buckets
+from src.runtime.runtime import FairValues, Runtime
+from src.runtime.shared import _SEQ, _SEQ_OFFSET, FairValuePublisher, FairValueReader
+
+def consistent_values(i: int) -> FairValues:
+    # Every field derives from i, so a read that mixes two publishes shows up
+    return FairValues(m5=float(i), m6=-float(i), m5_std=2.0 * i, m6_std=3.0 * i, timestamp=1e9 + i)
+
+def check_reader(path: str, check_s: float, result) -> None:
+    reader = FairValueReader(path, retry_s=0)
+    reads = torn = 0
+    end = time.monotonic() + check_s
+    while time.monotonic() < end:
+        fair_values = reader.snapshot
+        if fair_values is None:
+            continue
+        i = fair_values.m5
+        if (fair_values.m6, fair_values.m5_std, fair_values.m6_std, fair_values.timestamp) != (-i, 2.0 * i, 3.0 * i, 1e9 + i):
+            torn += 1
+        buckets = reader.buckets()
+        if buckets is not None and not (buckets[0] == buckets[0][0]).all():
+            torn += 1
+        reads += 1
+    result.put((reads, torn, reader.retries, reader.version))
+
+def check_stuck_and_restart(path: str) -> None:
+    publisher = FairValuePublisher(path)
+    reader = FairValueReader(path)
+    publisher.publish(consistent_values(7))
+    assert reader.snapshot == consistent_values(7)
+
+    # A producer killed between its two counter writes leaves the counter odd
+    _SEQ.pack_into(publisher._map, _SEQ_OFFSET, publisher._seq + 1)
+    start = time.perf_counter()
+    assert reader.snapshot == consistent_values(7) and reader.buckets() is None
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    assert reader.snapshot == consistent_values(7)
+    again = time.perf_counter() - start
+    print(f"stuck writer: first read {first * 1e6:.0f} us, later reads {again * 1e6:.1f} us, {reader.stalls} stall(s)")
+
+    # The restarted producer counts from 0 again and reaches the version the reader cached
+    publisher.close()
+    publisher = FairValuePublisher(path)
+    assert reader.snapshot is None
+    publisher.publish(consistent_values(8))
+    assert publisher._seq == 2 and reader.snapshot == consistent_values(8)
+    reader.close()
+    publisher.close()
+
+def main(reads=200_000, check_s=3.0):
+    path = os.path.join(tempfile.gettempdir(), f"bench_shared_{os.getpid()}")
+    check_stuck_and_restart(path)
+    buckets = Price6Buckets()
+    publisher = FairValuePublisher(path)
+    reader = FairValueReader(path)
+    try:
+        publisher.publish(consistent_values(1), buckets)
+
+        start = time.perf_counter()
+        for _ in range(reads):
+            reader.snapshot
+        elapsed = time.perf_counter() - start
+        print(f"shared read, unchanged:      {elapsed / reads * 1e6:.2f} us")
+
+        n = reads // 10
+        start = time.perf_counter()
+        for i in range(n):
+            publisher.publish(consistent_values(i))
+            reader.snapshot
+        publish_and_read = (time.perf_counter() - start) / n
+        start = time.perf_counter()
+        for i in range(n):
+            publisher.publish(consistent_values(i))
+        publish = (time.perf_counter() - start) / n
+        print(f"shared read, after publish:  {(publish_and_read - publish) * 1e6:.2f} us (publish {publish * 1e6:.2f} us)")
+
+        start = time.perf_counter()
+        for _ in range(n):
+            reader.buckets()
+        print(f"shared bucket read:          {(time.perf_counter() - start) / n * 1e6:.2f} us ({len(buckets.terms)} buckets)")
+
+        runtime = Runtime(None)
+        runtime.publish(consistent_values(1))
+        start = time.perf_counter()
+        for _ in range(reads):
+            runtime.snapshot
+        print(f"in-process Runtime.snapshot: {(time.perf_counter() - start) / reads * 1e6:.2f} us")
+        runtime.shutdown()
+
+        # Cross-process: the producer rewrites the values and the bucket counts (all equal to i) nonstop
+        result = multiprocessing.Queue()
+        process = multiprocessing.Process(target=check_reader, args=(path, check_s, result))
+        process.start()
+        i = 0
+        end = time.monotonic() + check_s + 1
+        while process.is_alive() and time.monotonic() < end:
+            i += 1
+            buckets.arrivals[:] = i
+            publisher.publish(consistent_values(i), buckets)
+        checked, torn, retries, version = result.get(timeout=10)
+        process.join()
+        print(f"cross-process: {i} publishes, {checked} reads, {torn} torn, {retries} retries, last version {version}")
+        assert torn == 0
+    finally:
+        reader.close()
+        publisher.close(unlink=True)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 3.0)
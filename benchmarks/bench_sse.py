@@ -0,0 +1,142 @@
+"""
+Market-stream read throughput (events/s, including JSON decoding) against a local SSE stub, before
+(`sseclient` over `requests` plus `json.loads` per event) and after (`EventStreamParser` over raw socket
+reads with `json_loads`, i.e. orjson when it is installed).
+
+The stub sends `events` full-book events of `depth` levels per side, either one HTTP chunk per event
+(like the exchange) or packed into 64 KiB chunks (a reader that has fallen behind).
+
+Also checks that `SSEThread` starts its reconnect backoff over after a connection that delivered events
+drops mid-stream, and closes the dropped connection.
+
+Needs `sseclient_py` for the "before" reader (pip install sseclient_py==1.8.0); the bot itself no longer uses it.
+
+Usage: python -m benchmarks.bench_sse [events] [depth]
+"""
+import contextlib
+import io
+import json
+import random
+import sys
+import threading
+import time
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+import sseclient
+
+from imcity_template import SSE_READ_SIZE, EventStreamParser, SSEThread, json_loads
+
+def book_event(depth: int, i: int) -> bytes:
+    book = {
+        "productsymbol": "5_Flights",
+        "tickSize": 1,
+        "buyOrders": {str(3000 - j): {"marketVolume": 5 + (i + j) % 7, "userVolume": 0} for j in range(depth)},
+        "sellOrders": {str(3001 + j): {"marketVolume": 5 + (i * j) % 7, "userVolume": 0} for j in range(depth)},
+    }
+    return f"event: order\ndata: {json.dumps(book)}\n\n".encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+        for chunk in self.server.chunks:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        if not self.server.abort:
+            self.wfile.write(b"0\r\n\r\n")
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, chunks: list[bytes], abort: bool = False):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.chunks = chunks
+        # Drop the connection without the final chunk, as a network failure would
+        self.abort = abort
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/market/stream"
+
+def read_sseclient(url: str) -> int:
+    response = requests.get(url, stream=True, headers={"Accept": "text/event-stream"}, timeout=30)
+    count = 0
+    for event in sseclient.SSEClient(response).events():
+        if event.event == "order":
+            json.loads(event.data)
+            count += 1
+    return count
+
+def read_parser(url: str) -> int:
+    response = requests.get(url, stream=True, headers={"Accept": "text/event-stream"}, timeout=30)
+    parser = EventStreamParser()
+    count = 0
+    while chunk := response.raw.read1(SSE_READ_SIZE):
+        for event, data, _ in parser.feed(chunk):
+            if event == "order":
+                json_loads(data)
+                count += 1
+    return count
+
+def pack(events: list[bytes], size: int = 65536) -> list[bytes]:
+    chunks, current = [], b""
+    for event in events:
+        current += event
+        if len(current) >= size:
+            chunks.append(current)
+            current = b""
+    return chunks + ([current] if current else [])
+
+def check_reconnect_backoff(drops=5):
+    server = StubServer([book_event(1, 0)], abort=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    bounds, streams = [], []
+    uniform = random.uniform
+
+    def record(low, high):
+        bounds.append(high)
+        return uniform(low, high)
+
+    thread = SSEThread("", server.url, lambda book: None, lambda trade: None, backoff_s=0.01, max_backoff_s=1.0)
+    with mock.patch.object(random, "uniform", record), contextlib.redirect_stdout(io.StringIO()):
+        thread.start()
+        while thread.reconnects < drops:
+            streams.append(thread._http_stream)
+            time.sleep(0.005)
+        thread.close()
+        thread.join()
+    server.shutdown()
+    server.server_close()
+    # Every drop raised mid-stream after an event, so every wait is drawn from the first backoff step
+    assert bounds[:drops] == [0.01] * drops, bounds
+    assert all(stream.raw.closed for stream in streams if stream is not None)
+
+def main(events=20_000, depth=10):
+    check_reconnect_backoff()
+    payloads = [book_event(depth, i) for i in range(events)]
+    print(f"{events} events of {sum(map(len, payloads)) / events:.0f} bytes, decoder {json_loads.__module__}")
+    for framing, chunks in (("chunk per event", payloads), ("64 KiB chunks", pack(payloads))):
+        server = StubServer(chunks)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        for name, read in (("sseclient + json", read_sseclient), ("EventStreamParser", read_parser)):
+            start = time.perf_counter()
+            count = read(server.url)
+            elapsed = time.perf_counter() - start
+            assert count == events, (name, count)
+            print(f"{framing:<16} {name:<18} {count / elapsed:10,.0f} events/s  {elapsed / count * 1e6:6.1f} us/event")
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10)
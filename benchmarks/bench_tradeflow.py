@@ -0,0 +1,85 @@
+"""
+Cost of feeding `TradeFlowIndicators` with trade bursts and of reading its indicators, after checking
+the rolling values against a brute-force recomputation over the same trades.
+
+Usage: python -m benchmarks.bench_tradeflow [trades] [capacity]
+"""
+import math
+import sys
+import time
+
+import numpy as np
+
+from src.indicators.tradeflow import TradeFlow, TradeFlowIndicators
+
+WINDOWS_S = (1.0, 10.0, 60.0)
+
+def brute_force(at, price, volume, now, window_s, capacity):
+    start = max(0, len(at) - capacity)
+    keep = np.nonzero(at[start:] > now - window_s)[0] + start
+    if not len(keep):
+        return None, 0.0, None
+    moves = np.diff(price)
+    signs = np.zeros(len(price))
+    for i in range(1, len(price)):
+        signs[i] = np.sign(moves[i - 1]) or signs[i - 1]
+    p, v = price[keep], volume[keep]
+    window_moves = moves[keep[keep > 0] - 1]
+    return (
+        float((p * v).sum() / v.sum()),
+        float((signs[keep] * v).sum() / v.sum()),
+        float(window_moves.std()) if len(window_moves) >= 2 else None,
+    )
+
+def check(n=3000, capacity=512, seed=0):
+    rng = np.random.default_rng(seed)
+    at = np.cumsum(rng.exponential(0.05, n))
+    price = 3000 + np.cumsum(rng.choice([-2.0, -1.0, 0.0, 1.0, 2.0], n))
+    volume = rng.integers(1, 10, n).astype(float)
+    flow = TradeFlow(WINDOWS_S, capacity)
+    for i in range(n):
+        flow.add(price[i], volume[i], at[i])
+        if i % 97 == 0 or i == n - 1:
+            now = at[i] + rng.uniform(0, 2)
+            for window_s in WINDOWS_S:
+                vwap, imbalance, volatility = brute_force(at[:i + 1], price[:i + 1], volume[:i + 1], now, window_s, capacity)
+                assert (flow.vwap(window_s, now) is None) == (vwap is None), (i, window_s)
+                if vwap is not None:
+                    assert math.isclose(flow.vwap(window_s, now), vwap, rel_tol=1e-9), (i, window_s)
+                    assert math.isclose(flow.imbalance(window_s, now), imbalance, abs_tol=1e-9), (i, window_s)
+                if volatility is None:
+                    assert flow.volatility(window_s, now) is None, (i, window_s)
+                else:
+                    assert math.isclose(flow.volatility(window_s, now), volatility, rel_tol=1e-6, abs_tol=1e-9), (i, window_s)
+
+def main(trades=200_000, capacity=4096):
+    check()
+    rng = np.random.default_rng(1)
+    prices = (3000 + np.cumsum(rng.choice([-1, 0, 1], trades))).tolist()
+    volumes = rng.integers(1, 10, trades).tolist()
+    # Bursts of 50 trades in one event, as the stream delivers them
+    events = [
+        [{"product": "5_Flights", "price": p, "volume": v} for p, v in zip(prices[i:i + 50], volumes[i:i + 50])]
+        for i in range(0, trades, 50)
+    ]
+
+    indicators = TradeFlowIndicators(WINDOWS_S, capacity)
+    start = time.perf_counter()
+    for event in events:
+        indicators.on_trades(event)
+    elapsed = time.perf_counter() - start
+    print(f"on_trades: {trades / elapsed:,.0f} trades/s, {elapsed / trades * 1e6:.2f} us per trade ({len(WINDOWS_S)} windows)")
+
+    flow = indicators["5_Flights"]
+    reads = 100_000
+    start = time.perf_counter()
+    for _ in range(reads):
+        flow.vwap(60.0)
+        flow.imbalance(60.0)
+    elapsed = time.perf_counter() - start
+    print(f"vwap + imbalance read: {elapsed / reads * 1e6:.2f} us")
+    print(indicators.snapshot(60.0))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4096)
@@ -0,0 +1,106 @@
+"""
+Order round-trip latency against a local stub exchange, before (module-level `requests.post`,
+a new connection per call) and after (`BaseBot` on the pooled keep-alive `Transport`).
+
+The stub can add a delay to every new connection (`connect_ms`) to stand in for the TCP/TLS
+handshake of a remote exchange, which is what the pooled transport saves.
+
+Usage: python -m benchmarks.bench_transport [orders] [connect_ms]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+from imcity_template import STANDARD_HEADERS, BaseBot, OrderRequest, Side
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle + delayed ACK add ~40 ms on keep-alive
+    disable_nagle_algorithm = True
+    next_id = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body: dict | list, headers: dict | None = None):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/api/user/authenticate":
+            self._reply({}, {"Authorization": "Bearer stub"})
+            return
+        StubHandler.next_id += 1
+        self._reply({
+            "id": str(StubHandler.next_id), "status": "ACTIVE", "product": request["product"],
+            "side": request["side"], "price": request["price"], "volume": request["volume"], "filled": 0,
+            "user": "bench", "timestamp": "", "targetUser": None, "message": None,
+        })
+
+    def do_DELETE(self):
+        self._reply({})
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, connect_ms: float):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.connect_ms = connect_ms
+
+    def get_request(self):
+        connection = super().get_request()
+        time.sleep(self.connect_ms / 1000)
+        return connection
+
+class BenchBot(BaseBot):
+    def on_orderbook(self, orderbook):
+        pass
+
+    def on_trades(self, trades):
+        pass
+
+def summary(name, seconds):
+    ms = np.asarray(seconds) * 1000
+    print(f"{name:<28} mean {ms.mean():7.3f} ms   p50 {np.percentile(ms, 50):7.3f} ms   p99 {np.percentile(ms, 99):7.3f} ms")
+
+def main(n_orders=500, connect_ms=2.0):
+    server = StubServer(connect_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    order = OrderRequest("5_Flights", 100.0, Side.BUY, 1)
+    payload = {"product": "5_Flights", "price": 100.0, "side": "BUY", "volume": 1}
+
+    before = []
+    for _ in range(n_orders):
+        start = time.perf_counter()
+        requests.post(f"{url}/api/order", json=payload, headers={**STANDARD_HEADERS, "Authorization": "Bearer stub"})
+        before.append(time.perf_counter() - start)
+
+    bot = BenchBot(url, "bench", "bench")
+    bot.auth_token
+    after = []
+    for _ in range(n_orders):
+        start = time.perf_counter()
+        bot.send_order(order)
+        after.append(time.perf_counter() - start)
+
+    print(f"{n_orders} orders, {connect_ms} ms per new connection")
+    summary("requests.post (new conn)", before)
+    summary("Transport (keep-alive)", after)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 2.0)
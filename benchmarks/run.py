@@ -0,0 +1,384 @@
+"""
+Benchmark suite over offline fixtures: per stage, latency percentiles and throughput, compared with a
+saved baseline.
+
+Stages and fixtures:
+
+- `parse`: `parse_muc_schedule` and `parse_muc_schedule_columns` on the saved Munich schedule pages.
+- `fetch`: `fetch_schedules` (requests, page cache, parsing, combining) with the flight-search URLs
+  answered from the saved pages by a requests adapter, once with a cold page cache and once with
+  every page unchanged (304).
+- `price6`: `price6` from scratch, and `FlightStateIndex.update` + `Price6Buckets.apply` when a few
+  flights move, on the fetched schedules.
+- `orderbook`: `SSEThread._handle_orderbook_change` on synthetic books of 5, 50 and 500 levels per side.
+- `sse`: the recorded market stream in fixtures/market_stream.sselog.gz through `EventStreamParser`,
+  `json_loads` and the book/trade handlers, one chunk per event.
+- `on_orderbook`: `CustomBot.on_orderbook` on the books of the recorded stream, quoting around the
+  fair values and settlement stds of the fetched schedules, orders answered by the replay fill model.
+
+`--save` writes the results to the baseline file (merged per case). Otherwise each case's p50 is
+compared with the baseline and the run fails when one is more than `--threshold` slower. Baselines are
+only comparable on the machine that wrote them.
+
+Usage: python -m benchmarks.run [--stages parse,fetch,...] [--budget 1.0] [--baseline PATH] [--save] [--threshold 0.25]
+       python -m benchmarks.run --record-stream [seconds]
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from benchmarks.bench_orderbook import make_events
+from imcity_template import EventStreamParser, SSEThread, json_loads
+from main import CustomBot
+from src.fetch.extract_html import parse_muc_schedule, parse_muc_schedule_columns
+from src.fetch.get_html import get_session
+from src.fetch.main import MAX_PAGE_LIMIT, MAX_WORKERS, fetch_schedules, page_cache
+from src.fetch.pipeline import shutdown_parse_pool
+from src.indicators.buckets import Price6Buckets
+from src.indicators.flights import FlightStateIndex
+from src.indicators.markets import price5, price6
+from src.indicators.montecarlo import simulate_settlements
+from src.runtime.runtime import FairValues, Runtime
+from src.sim.replay import ReplayEngine, read_stream
+
+FIXTURES = Path(__file__).parent / "fixtures"
+STREAM_FIXTURE = FIXTURES / "market_stream.sselog.gz"
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+MUC_URL = "https://www.munich-airport.com/"
+# Pages per direction served by the fetch stub; the last one is short (arrivals) or empty (departures)
+FULL_PAGES = 8
+
+@dataclass
+class Measurement:
+    samples: np.ndarray  # seconds per call
+    items: int  # rows, events or books handled per call
+    unit: str
+
+    def percentile(self, q: float) -> float:
+        return float(np.percentile(self.samples, q))
+
+    @property
+    def throughput(self) -> float:
+        return self.items / float(self.samples.mean())
+
+    def to_dict(self) -> dict:
+        return {
+            "p50_us": self.percentile(50) * 1e6,
+            "p90_us": self.percentile(90) * 1e6,
+            "p99_us": self.percentile(99) * 1e6,
+            "throughput": self.throughput,
+            "unit": self.unit,
+            "samples": len(self.samples),
+        }
+
+def repeat(call, items: int, unit: str, budget_s: float, setup=None, min_samples: int = 5) -> Measurement:
+    """
+    Times `call` until `budget_s` has passed and at least `min_samples` calls were made; `setup` runs untimed before each.
+    """
+    samples = []
+    end = time.perf_counter() + budget_s
+    while len(samples) < min_samples or time.perf_counter() < end:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return Measurement(np.asarray(samples), items, unit)
+
+def schedule_pages() -> dict[str, str]:
+    return {path.stem: path.read_text(encoding="utf-8") for path in sorted(FIXTURES.glob("muc_*.html"))}
+
+def stage_parse(budget_s: float):
+    pages = schedule_pages()
+    rows = sum(len(parse_muc_schedule(html_content)) for html_content in pages.values())
+    for name, parse in (("parse_muc_schedule", parse_muc_schedule), ("parse_muc_schedule_columns", parse_muc_schedule_columns)):
+        yield f"parse.{name}", repeat(lambda: [parse(html_content) for html_content in pages.values()], rows, "rows", budget_s)
+
+class FixtureAdapter(BaseAdapter):
+    """
+    Answers flight-search requests with the saved pages, with an ETag so unchanged pages get a 304.
+    With `down`, every request gets a 503 instead.
+    """
+
+    def __init__(self, pages: dict[bool, list[bytes]], down: bool = False):
+        super().__init__()
+        self.pages = pages
+        self.down = down
+        self.requests = 0
+
+    def send(self, request, **kwargs):
+        self.requests += 1
+        url = urlsplit(request.url)
+        pages = self.pages[url.path.endswith("/arrivals")]
+        page = int(parse_qs(url.query)["page"][0])
+        body = pages[page - 1] if page <= len(pages) else b""
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.encoding = "utf-8"
+        response.headers = CaseInsensitiveDict({"ETag": etag, "Content-Type": "text/html; charset=utf-8"})
+        if self.down:
+            response.status_code, response._content = 503, b""
+        elif request.headers.get("If-None-Match") == etag:
+            response.status_code, response._content = 304, b""
+        else:
+            response.status_code, response._content = 200, body
+        return response
+
+    def close(self):
+        pass
+
+def with_bad_time(html_content: str) -> str:
+    # The parser drops a row whose time does not parse; the first row's scheduled time becomes '2x:04' or similar
+    start = html_content.index('fp-flight-time-scheduled">') + len('fp-flight-time-scheduled">')
+    return html_content[:start + 1] + "x" + html_content[start + 2:]
+
+@contextlib.contextmanager
+def fixture_site(down: bool = False, bad_rows: bool = False):
+    pages = schedule_pages()
+    if bad_rows:
+        pages = {name: with_bad_time(html_content) for name, html_content in pages.items()}
+    arrivals = [pages["muc_arrivals_page"].encode()] * FULL_PAGES + [pages["muc_arrivals_last_page"].encode()]
+    departures = [pages["muc_departures_page"].encode()] * FULL_PAGES
+    session = get_session(MAX_WORKERS)
+    adapter = FixtureAdapter({True: arrivals, False: departures}, down)
+    session.mount(MUC_URL, adapter)
+    try:
+        yield adapter
+    finally:
+        session.adapters.pop(MUC_URL, None)
+        page_cache.clear()
+
+def fetched_schedules() -> tuple[pd.DataFrame, pd.DataFrame]:
+    with fixture_site():
+        return fetch_schedules()
+
+def check_fetch_outage():
+    # With the board down, each direction stops after its first failures rather than walking every page
+    with fixture_site(down=True) as adapter, contextlib.redirect_stdout(io.StringIO()):
+        arrivals, departures = fetch_schedules()
+    assert arrivals.empty and departures.empty
+    assert adapter.requests < 2 * MAX_PAGE_LIMIT, adapter.requests
+
+def check_fetch_bad_rows():
+    # A full page with a row the parser drops is still full: every page is fetched, one row fewer each
+    arrivals, departures = fetched_schedules()
+    with fixture_site(bad_rows=True), contextlib.redirect_stdout(io.StringIO()):
+        bad_arrivals, bad_departures = fetch_schedules()
+    assert (len(bad_arrivals), len(bad_departures)) == (len(arrivals) - FULL_PAGES - 1, len(departures) - FULL_PAGES), \
+        (len(bad_arrivals), len(bad_departures))
+
+def stage_fetch(budget_s: float):
+    check_fetch_outage()
+    check_fetch_bad_rows()
+    with fixture_site():
+        arrivals, departures = fetch_schedules()
+        rows = len(arrivals) + len(departures)
+        yield "fetch.cold_cache", repeat(fetch_schedules, rows, "rows", budget_s, setup=page_cache.clear)
+        fetch_schedules()
+        yield "fetch.unchanged", repeat(fetch_schedules, rows, "rows", budget_s)
+
+def moved(schedule_df: pd.DataFrame, n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    The schedule with `n` random flights re-timed by up to an hour, as between two scrapes.
+    """
+    index = schedule_df.index.to_numpy().copy()
+    rows = rng.choice(len(index), size=n, replace=False)
+    index[rows] += rng.integers(-60, 61, size=n).astype("timedelta64[m]")
+    return schedule_df.set_axis(pd.DatetimeIndex(index, name=schedule_df.index.name)).sort_index(kind="stable")
+
+def stage_price6(budget_s: float):
+    arrivals, departures = fetched_schedules()
+    rows = len(arrivals) + len(departures)
+    yield "price6.full", repeat(lambda: price6(arrivals, departures), rows, "rows", budget_s)
+
+    rng = np.random.default_rng(0)
+    variants = [(moved(arrivals, 5, rng), moved(departures, 5, rng)) for _ in range(16)]
+    index, buckets = FlightStateIndex(), Price6Buckets()
+    buckets.apply(index.update(arrivals, departures).changes())
+    schedules = iter(())
+
+    def update():
+        nonlocal schedules
+        schedule = next(schedules, None)
+        if schedule is None:
+            schedules = iter([s for variant in variants for s in ((arrivals, departures), variant)])
+            schedule = next(schedules)
+        buckets.apply(index.update(*schedule).changes())
+
+    yield "price6.incremental", repeat(update, rows, "rows", budget_s)
+
+def inline_thread(handle_orderbook=lambda book: None) -> SSEThread:
+    return SSEThread("Bearer bench", "http://bench", handle_orderbook, lambda trades: None)
+
+def per_call(handle, arguments) -> np.ndarray:
+    samples = np.empty(len(arguments))
+    for i, argument in enumerate(arguments):
+        start = time.perf_counter()
+        handle(argument)
+        samples[i] = time.perf_counter() - start
+    return samples
+
+def stage_orderbook(budget_s: float):
+    for depth in (5, 50, 500):
+        events = make_events(depth, max(200, int(2000 * budget_s)))
+        thread = inline_thread()
+        yield f"orderbook.depth_{depth}", Measurement(per_call(thread._handle_orderbook_change, events), 1, "events")
+
+def stream_chunks() -> list[bytes]:
+    return [b"event: %s\ndata: %s\n\n" % (event.encode(), payload) for _, event, payload in read_stream(str(STREAM_FIXTURE))]
+
+def stage_sse(budget_s: float):
+    chunks = stream_chunks()
+    thread = inline_thread()
+    parser = EventStreamParser()
+
+    def handle(chunk):
+        for event, data, _ in parser.feed(chunk):
+            if event == "order":
+                thread._handle_orderbook_change(json_loads(data))
+            elif event == "trade":
+                thread._handle_trade_event(json_loads(data))
+
+    samples = [per_call(handle, chunks)]
+    end = time.perf_counter() + budget_s
+    while time.perf_counter() < end:
+        samples.append(per_call(handle, chunks))
+    yield "sse.recorded_stream", Measurement(np.concatenate(samples), 1, "events")
+
+def fixture_fair_values() -> FairValues:
+    """
+    Fair values and settlement stds of the fetched fixture schedules, as a refresh would publish them.
+    """
+    arrivals, departures = fetched_schedules()
+    scenarios = simulate_settlements(arrivals, departures, seed=0)
+    return FairValues(m5=price5(arrivals, departures), m6=price6(arrivals, departures),
+                      m5_std=scenarios.price5.std, m6_std=scenarios.price6.std)
+
+def stage_on_orderbook(budget_s: float):
+    fair_values = fixture_fair_values()
+    runtime = Runtime(None)
+    runtime.publish(fair_values)
+    samples = []
+    end = time.perf_counter() + budget_s
+    with contextlib.redirect_stdout(io.StringIO()):
+        while not samples or time.perf_counter() < end:
+            bot = CustomBot("http://replay", "replay", "replay", runtime, max_fair_value_age_s=float("inf"))
+            handle = bot.on_orderbook
+
+            def timed(book):
+                start = time.perf_counter()
+                handle(book)
+                samples.append(time.perf_counter() - start)
+
+            bot.on_orderbook = timed
+            ReplayEngine(bot, str(STREAM_FIXTURE)).run()
+            bot.gateway.close()
+    runtime.shutdown()
+    yield "on_orderbook.recorded_stream", Measurement(np.asarray(samples), 1, "books")
+
+STAGES = {
+    "parse": stage_parse,
+    "fetch": stage_fetch,
+    "price6": stage_price6,
+    "orderbook": stage_orderbook,
+    "sse": stage_sse,
+    "on_orderbook": stage_on_orderbook,
+}
+
+def record_stream(seconds: float = 3.0, event_rate: float = 500.0) -> None:
+    """
+    Re-records the stream fixture from the local exchange simulator.
+    """
+    from benchmarks.bench_replay import record
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        events = record(str(STREAM_FIXTURE), seconds, event_rate)
+    print(f"Recorded {events} events to {STREAM_FIXTURE} ({STREAM_FIXTURE.stat().st_size / 1024:.0f} KiB)")
+
+def duration(seconds: float) -> str:
+    return f"{seconds * 1e3:8.2f}ms" if seconds >= 1e-3 else f"{seconds * 1e6:8.1f}us"
+
+def load_baseline(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text()).get("cases", {})
+
+def save_baseline(path: Path, results: dict[str, Measurement]) -> None:
+    cases = load_baseline(path)
+    cases.update({name: measurement.to_dict() for name, measurement in results.items()})
+    baseline = {
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": cases,
+    }
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+def main(stages=tuple(STAGES), budget_s=1.0, baseline_path=BASELINE_FILE, save=False, threshold=0.25) -> int:
+    baseline = load_baseline(baseline_path)
+    results: dict[str, Measurement] = {}
+    regressions = []
+    print(f"{'case':<30} {'p50':>10} {'p90':>10} {'p99':>10} {'throughput':>18}  vs baseline p50")
+    try:
+        for stage in stages:
+            for name, measurement in STAGES[stage](budget_s):
+                results[name] = measurement
+                p50 = measurement.percentile(50)
+                line = (f"{name:<30} {duration(p50)} {duration(measurement.percentile(90))} "
+                        f"{duration(measurement.percentile(99))} {measurement.throughput:>10,.0f} {measurement.unit + '/s':<7}")
+                base = baseline.get(name)
+                if base is not None:
+                    change = p50 * 1e6 / base["p50_us"] - 1
+                    line += f"  {change:+7.1%}"
+                    if change > threshold:
+                        line += "  REGRESSION"
+                        regressions.append(name)
+                print(line)
+    finally:
+        shutdown_parse_pool()
+
+    if save:
+        save_baseline(baseline_path, results)
+        print(f"Saved {len(results)} cases to {baseline_path}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} case(s) more than {threshold:.0%} slower than {baseline_path}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds of timing per case")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown before failing, e.g. 0.25")
+    parser.add_argument("--record-stream", type=float, nargs="?", const=3.0, metavar="SECONDS",
+                        help="re-record the market stream fixture from the simulator and exit")
+    args = parser.parse_args()
+
+    if args.record_stream is not None:
+        record_stream(args.record_stream)
+        sys.exit(0)
+    unknown = set(args.stages.split(",")) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    sys.exit(main(args.stages.split(","), args.budget, args.baseline, args.save, args.threshold))
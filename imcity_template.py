@@ -1,58 +1,42 @@
 import json
+import random
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, asdict
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ReadTimeout
 from enum import StrEnum
-from functools import cached_property
-from threading import Thread
+from threading import Condition, Event, Lock, Thread, current_thread, local
 from typing import Any, Callable, Literal
 from abc import ABC, abstractmethod
 from traceback import format_exc
-from collections.abc import Mapping
+from collections.abc import Mapping, Sequence
 
 import requests
-import sseclient
 
+try:
+    # Optional faster decoder for the market stream: pip install orjson
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
-def check_if_right_sse_used():
-    # I don't have a better way to define if it is sseclient or sseclient-py
-    if "maxime.petazzoni" in sseclient.__email__:
-        return
-
-    print(
-        """
-It looks like you have installed the wrong SSE client library.
-Please ensure you have installed `sseclient-py` and not `sseclient`.
-
-To fix this, follow these steps:
-
-1. If you have installed `sseclient`, uninstall it:
-    ```
-    pip uninstall sseclient
-    ```
-
-2. Install `sseclient-py`:
-    ```
-    pip install sseclient-py
-    ```
-
-To avoid such issues, it's recommended to use a virtual environment and install dependencies from `requirements.txt`.
-
-Here's how you can set up a virtual environment and install the correct dependencies:
-
-```
-python3 -m venv .
-source ./bin/activate
-pip3 install -r ./requirements.txt
-```
-"""
-    )
-    quit(1)
 
+STANDARD_HEADERS = {"Content-Type": "application/json; charset=utf-8"}
 
-check_if_right_sse_used()
+# Upper bounds of the latency histogram buckets in seconds: 1-2-5 steps from 10 us to 10 s, then overflow
+LATENCY_BUCKETS = tuple(m * 10.0 ** e for e in range(-5, 1) for m in (1, 2, 5)) + (10.0,)
 
+# Order-entry rate the gateway keeps to (sustained requests per second, and burst); set to the exchange's limits
+ORDER_RATE_PER_S = 20.0
+ORDER_BURST = 20
 
-STANDARD_HEADERS = {"Content-Type": "application/json; charset=utf-8"}
+# Market stream: bytes asked of the socket per read, and the reconnect backoff (doubling from the first value up to the second)
+SSE_READ_SIZE = 65536
+SSE_BACKOFF_S = 0.5
+SSE_MAX_BACKOFF_S = 30.0
+# How long stopping waits for a running order book handler (e.g. one blocked in a REST call) to return
+HANDLER_JOIN_TIMEOUT_S = 5.0
 
 
 class DictLikeFrozenDataclassMapping(Mapping):
@@ -107,12 +91,207 @@ class Order(DictLikeFrozenDataclassMapping):
     own_volume: int
 
 
-@dataclass(frozen=True)
-class OrderBook(DictLikeFrozenDataclassMapping):
-    product: str
-    tick_size: float
-    buy_orders: list[Order]
-    sell_orders: list[Order]
+class BookSide:
+    """
+    Price levels of one side of a book, best level first, stored in parallel lists.
+    Updated in place from each full-book event: when the set of price levels is unchanged
+    (the common case) only the volumes are overwritten and nothing is sorted or allocated.
+    """
+
+    __slots__ = ("descending", "prices", "volumes", "own_volumes", "_index")
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        self.prices: list[float] = []
+        self.volumes: list[int] = []
+        self.own_volumes: list[int] = []
+        self._index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def update(self, levels: dict[str, dict[str, int]]) -> None:
+        index = self._index
+        if levels.keys() != index.keys():
+            self._rebuild(levels)
+            return
+
+        volumes = self.volumes
+        own_volumes = self.own_volumes
+        for price, level in levels.items():
+            i = index[price]
+            volumes[i] = level["marketVolume"]
+            own_volumes[i] = level["userVolume"]
+
+    def _rebuild(self, levels: dict[str, dict[str, int]]) -> None:
+        keys = sorted(levels, key=float, reverse=self.descending)
+        self._index = {price: i for i, price in enumerate(keys)}
+        self.prices = [float(price) for price in keys]
+        self.volumes = [levels[price]["marketVolume"] for price in keys]
+        self.own_volumes = [levels[price]["userVolume"] for price in keys]
+
+    def load(self, orders: "list[Order]") -> None:
+        orders = sorted(orders, key=lambda order: order.price, reverse=self.descending)
+        self._index = {str(order.price): i for i, order in enumerate(orders)}
+        self.prices = [order.price for order in orders]
+        self.volumes = [order.volume for order in orders]
+        self.own_volumes = [order.own_volume for order in orders]
+
+    def order(self, i: int) -> Order:
+        return Order(self.prices[i], self.volumes[i], self.own_volumes[i])
+
+    def best_other_price(self) -> float | None:
+        """
+        Best price with volume from someone other than the user.
+        """
+        for i, volume in enumerate(self.volumes):
+            if volume > self.own_volumes[i]:
+                return self.prices[i]
+        return None
+
+
+class BookSideView(Sequence):
+    """
+    Read-only sequence of `Order`s over a `BookSide`; an `Order` is only created for the levels accessed.
+    """
+
+    __slots__ = ("_side",)
+
+    def __init__(self, side: BookSide):
+        self._side = side
+
+    def __len__(self) -> int:
+        return len(self._side.prices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._side.order(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("order book level out of range")
+        return self._side.order(i)
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other) if isinstance(other, Sequence) else NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class OrderBook(Mapping):
+    """
+    Lightweight view over the book of one product.
+
+    `buy_orders` (best bid first) and `sell_orders` (best ask first) behave like lists of `Order`s.
+    The `best_*` properties and `depth` read the underlying storage without allocating.
+    Views handed to `on_orderbook` track the live book; call `copy()` to keep a fixed snapshot.
+    """
+
+    __slots__ = ("product", "tick_size", "bids", "asks")
+    _keys = ("product", "tick_size", "buy_orders", "sell_orders")
+
+    def __init__(self, product: str, tick_size: float, buy_orders: "BookSide | list[Order]",
+                 sell_orders: "BookSide | list[Order]"):
+        self.product = product
+        self.tick_size = tick_size
+        self.bids = buy_orders if isinstance(buy_orders, BookSide) else _side_from_orders(buy_orders, True)
+        self.asks = sell_orders if isinstance(sell_orders, BookSide) else _side_from_orders(sell_orders, False)
+
+    @property
+    def buy_orders(self) -> BookSideView:
+        return BookSideView(self.bids)
+
+    @property
+    def sell_orders(self) -> BookSideView:
+        return BookSideView(self.asks)
+
+    @property
+    def best_bid_price(self) -> float | None:
+        return self.bids.prices[0] if self.bids.prices else None
+
+    @property
+    def best_ask_price(self) -> float | None:
+        return self.asks.prices[0] if self.asks.prices else None
+
+    @property
+    def best_other_bid_price(self) -> float | None:
+        """
+        Best bid ignoring levels that only hold the user's own orders.
+        """
+        return self.bids.best_other_price()
+
+    @property
+    def best_other_ask_price(self) -> float | None:
+        """
+        Best ask ignoring levels that only hold the user's own orders.
+        """
+        return self.asks.best_other_price()
+
+    @property
+    def best_bid_volume(self) -> int:
+        return self.bids.volumes[0] if self.bids.volumes else 0
+
+    @property
+    def best_ask_volume(self) -> int:
+        return self.asks.volumes[0] if self.asks.volumes else 0
+
+    def depth(self) -> tuple[int, int]:
+        return len(self.bids), len(self.asks)
+
+    def copy(self) -> "OrderBook":
+        return OrderBook(self.product, self.tick_size, list(self.buy_orders), list(self.sell_orders))
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_dict(self) -> dict:
+        return {
+            "product": self.product,
+            "tick_size": self.tick_size,
+            "buy_orders": [order.to_dict() for order in self.buy_orders],
+            "sell_orders": [order.to_dict() for order in self.sell_orders],
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"OrderBook(product={self.product!r}, tick_size={self.tick_size!r}, "
+            f"buy_orders={self.buy_orders!r}, sell_orders={self.sell_orders!r})"
+        )
+
+
+def _side_from_orders(orders: list[Order], descending: bool) -> BookSide:
+    side = BookSide(descending)
+    side.load(orders)
+    return side
+
+
+class LocalBook:
+    """
+    Book of one product maintained from `order` events. `view` is created once and reused for every event.
+    """
+
+    __slots__ = ("product", "bids", "asks", "view")
+
+    def __init__(self, product: str, tick_size: float):
+        self.product = product
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.view = OrderBook(product, tick_size, self.bids, self.asks)
+
+    def update(self, event: dict[str, Any]) -> OrderBook:
+        self.view.tick_size = event["tickSize"]
+        self.bids.update(event["buyOrders"])
+        self.asks.update(event["sellOrders"])
+        return self.view
 
 
 class Side(StrEnum):
@@ -143,14 +322,453 @@ class OrderResponse:
     message: str | None
 
 
+@dataclass
+class LiveOrder:
+    id: str
+    product: str
+    side: Side
+    price: float
+    volume: int
+    registered_at: float
+
+
+class OrderRegistry:
+    """
+    Local view of the user's resting orders, so quoting does not have to ask the exchange every tick.
+
+    Orders are added from `OrderResponse`s, removed on successful cancels and reduced by the user's
+    own trades. Fills can only be attributed approximately (a trade does not carry the order id),
+    so the registry is periodically replaced by the exchange's list, see `BaseBot.reconcile_orders`.
+    """
+
+    def __init__(self, username: str):
+        self.username = username
+        self._orders: dict[str, LiveOrder] = {}
+        self._removed: dict[str, float] = {}
+        self._lock = Lock()
+        self.stale = False
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def add(self, response: OrderResponse) -> None:
+        remaining = response.volume - response.filled
+        if remaining <= 0 or response.status not in ("ACTIVE", "PART_FILLED"):
+            return
+        with self._lock:
+            self._orders[response.id] = LiveOrder(
+                response.id, response.product, Side(response.side), response.price, remaining, time.monotonic()
+            )
+
+    def remove(self, order_id: str) -> None:
+        with self._lock:
+            self._orders.pop(order_id, None)
+            self._removed[order_id] = time.monotonic()
+
+    def remove_at(self, product: str, price: float) -> None:
+        with self._lock:
+            for order in [o for o in self._orders.values() if o.product == product and o.price == price]:
+                del self._orders[order.id]
+                self._removed[order.id] = time.monotonic()
+
+    def for_product(self, product: str) -> list[LiveOrder]:
+        with self._lock:
+            return [order for order in self._orders.values() if order.product == product]
+
+    def on_trades(self, trades: list[dict] | dict) -> None:
+        for trade in trades if isinstance(trades, list) else [trades]:
+            if trade["buyer"] == self.username:
+                self._fill(trade["product"], Side.BUY, trade["price"], trade["volume"])
+            if trade["seller"] == self.username:
+                self._fill(trade["product"], Side.SELL, trade["price"], trade["volume"])
+
+    def _fill(self, product: str, side: Side, price: float, volume: int) -> None:
+        """
+        Takes a fill off the orders that could have traded at `price`: exact price first, then oldest.
+        """
+        with self._lock:
+            candidates = [
+                o for o in self._orders.values()
+                if o.product == product and o.side == side
+                and (o.price >= price if side == Side.BUY else o.price <= price)
+            ]
+            candidates.sort(key=lambda o: (o.price != price, o.registered_at))
+            for order in candidates:
+                if volume <= 0:
+                    break
+                taken = min(order.volume, volume)
+                order.volume -= taken
+                volume -= taken
+                if order.volume <= 0:
+                    del self._orders[order.id]
+            if volume > 0:
+                # More filled than we knew about
+                self.stale = True
+
+    def replace(self, orders: list[dict], since: float) -> None:
+        """
+        Replaces the registry with the exchange's list of orders, fetched after `since` (monotonic).
+        Orders sent or cancelled locally while the list was in flight are kept as the registry has them.
+        """
+        with self._lock:
+            fresh = {}
+            for order in orders:
+                remaining = order["volume"] - order.get("filled", 0)
+                if remaining <= 0 or self._removed.get(order["id"], 0.0) >= since:
+                    continue
+                known = self._orders.get(order["id"])
+                fresh[order["id"]] = LiveOrder(
+                    order["id"], order["product"], Side(order["side"]), order["price"], remaining,
+                    known.registered_at if known else since,
+                )
+            for order in self._orders.values():
+                if order.registered_at > since and order.id not in fresh:
+                    fresh[order.id] = order
+
+            self._orders = fresh
+            self._removed = {order_id: at for order_id, at in self._removed.items() if at >= since}
+            self.stale = False
+
+
+class PositionTracker:
+    """
+    The user's net position and cash per product, kept from the user's own trades, so reading them is free.
+
+    Cash is only known from the trades seen since start. Positions are periodically checked against the
+    exchange, see `BaseBot.reconcile_positions`; a check is skipped when an own trade arrived while the
+    exchange's numbers were in flight, since they may or may not include it.
+    """
+
+    def __init__(self, username: str):
+        self.username = username
+        self._positions: dict[str, int] = {}
+        self._cash: dict[str, float] = {}
+        self._traded_at = 0.0
+        self._lock = Lock()
+        self.trades = 0
+
+    def position(self, product: str) -> int:
+        return self._positions.get(product, 0)
+
+    def cash(self, product: str) -> float:
+        return self._cash.get(product, 0.0)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                product: {"position": self._positions.get(product, 0), "cash": self._cash.get(product, 0.0)}
+                for product in self._positions.keys() | self._cash.keys()
+            }
+
+    def on_trades(self, trades: list[dict] | dict) -> None:
+        for trade in trades if isinstance(trades, list) else [trades]:
+            # A trade against ourselves shows up on both sides and nets out
+            if trade["buyer"] == self.username:
+                self._apply(trade["product"], trade["volume"], trade["price"])
+            if trade["seller"] == self.username:
+                self._apply(trade["product"], -trade["volume"], trade["price"])
+
+    def _apply(self, product: str, signed_volume: int, price: float) -> None:
+        with self._lock:
+            self._positions[product] = self._positions.get(product, 0) + signed_volume
+            self._cash[product] = self._cash.get(product, 0.0) - signed_volume * price
+            self._traded_at = time.monotonic()
+            self.trades += 1
+
+    def replace(self, positions: dict[str, int], since: float) -> dict[str, int] | None:
+        """
+        Takes the exchange's net positions, fetched after `since` (monotonic). Returns the corrections
+        made (exchange minus local, per product that differed), or None if the check was skipped.
+        """
+        with self._lock:
+            if self._traded_at >= since:
+                return None
+            corrections = {
+                product: positions.get(product, 0) - self._positions.get(product, 0)
+                for product in positions.keys() | self._positions.keys()
+                if positions.get(product, 0) != self._positions.get(product, 0)
+            }
+            self._positions = {product: volume for product, volume in positions.items() if volume}
+            return corrections
+
+
+class LatencyHistogram:
+    """
+    Counts of latencies in the fixed `LATENCY_BUCKETS`; recording is a bisect and a few increments.
+    Percentiles are reported as the upper bound of the bucket they fall in (capped at the maximum seen).
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return 0.0
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class LatencyRecorder:
+    """
+    Latency histograms of the hot path, one per stage, in seconds:
+
+    - `decode`: JSON decoding of an `order` event
+    - `book`: updating the `LocalBook`
+    - `queue`: SSE receipt to handler entry (includes decode, book and any dispatch wait)
+    - `handler`: `on_orderbook` from entry to exit
+    - `rest_<METHOD>`: REST round trips, retries included
+    - `tick_to_ack`: SSE receipt to the response of an order sent while handling that event
+
+    User code can `record` its own stages. Histograms are updated without a lock: recording threads
+    mostly own their stages, and an occasional lost increment does not matter for monitoring.
+    """
+
+    STAGES = ("decode", "book", "queue", "handler", "tick_to_ack", "rest_GET", "rest_POST", "rest_DELETE")
+
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+        self._tick = local()
+
+    def record(self, stage: str, seconds: float) -> None:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        histogram.record(seconds)
+
+    @property
+    def tick(self) -> float | None:
+        """
+        Receipt time (`time.monotonic()`) of the event being handled on this thread, if any.
+        """
+        return getattr(self._tick, "received_at", None)
+
+    def run_handler(self, handle: Callable[[OrderBook], Any], view: OrderBook, received_at: float) -> None:
+        start = time.monotonic()
+        self.record("queue", start - received_at)
+        self._tick.received_at = received_at
+        try:
+            handle(view)
+        finally:
+            self._tick.received_at = None
+            self.record("handler", time.monotonic() - start)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {stage: histogram.snapshot() for stage, histogram in self.histograms.items() if histogram.count}
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{stage} p50={stats['p50'] * 1000:.2f}ms p99={stats['p99'] * 1000:.2f}ms (n={stats['count']})"
+            for stage, stats in self.snapshot().items()
+        )
+
+    def reset(self) -> None:
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+
+class ConflatingDispatcher:
+    """
+    Hands order books to `handle_orderbook` on one worker thread per product, so a slow
+    handler never holds up the stream reader.
+
+    The reader only parks the newest raw event of each product in a conflation slot. A worker
+    always handles the latest event of its product; events superseded while the handler was
+    busy are dropped. Each worker owns its product's `LocalBook`, so books are only ever
+    updated and read on the same thread.
+    """
+
+    def __init__(
+        self,
+        handle_orderbook: Callable[[OrderBook], Any],
+        books: dict[str, LocalBook],
+        latency: LatencyRecorder | None = None,
+    ):
+        self._handle_orderbook = handle_orderbook
+        self._books = books
+        self._latency = latency or LatencyRecorder()
+        self._slots: dict[str, tuple[dict[str, Any], float]] = {}
+        self._workers: dict[str, Thread] = {}
+        self._condition = Condition()
+        self._closed = False
+
+        self.received = 0
+        self.handled = 0
+        self.dropped = 0
+        self.age_count = 0
+        self.age_total = 0.0
+        self.age_max = 0.0
+        self.age_last = 0.0
+
+    def submit(self, orderbook: dict[str, Any], received_at: float) -> None:
+        """
+        Called by the reader thread. `received_at` is the `time.monotonic()` of receipt.
+        """
+        symbol = orderbook["productsymbol"]
+        with self._condition:
+            if self._closed:
+                return
+            self.received += 1
+            if symbol in self._slots:
+                self.dropped += 1
+            self._slots[symbol] = (orderbook, received_at)
+            if symbol not in self._workers:
+                worker = Thread(target=self._work, args=(symbol,), name=f"orderbook-{symbol}", daemon=True)
+                self._workers[symbol] = worker
+                worker.start()
+            self._condition.notify_all()
+
+    def _work(self, symbol: str) -> None:
+        while True:
+            with self._condition:
+                while symbol not in self._slots and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                orderbook, received_at = self._slots.pop(symbol)
+
+            book = self._books.get(symbol)
+            if book is None:
+                book = self._books[symbol] = LocalBook(symbol, orderbook["tickSize"])
+            start = time.monotonic()
+            view = book.update(orderbook)
+            updated = time.monotonic()
+            self._latency.record("book", updated - start)
+
+            age = updated - received_at
+            with self._condition:
+                self.age_count += 1
+                self.age_total += age
+                self.age_max = max(self.age_max, age)
+                self.age_last = age
+
+            try:
+                self._latency.run_handler(self._handle_orderbook, view, received_at)
+            except Exception:
+                print(f"Order book handler failed for {symbol}:")
+                print(format_exc())
+
+            with self._condition:
+                self.handled += 1
+
+    def stats(self) -> dict[str, float]:
+        """
+        `queued` is the number of products with an unhandled book right now; ages are in seconds.
+        """
+        with self._condition:
+            return {
+                "received": self.received,
+                "handled": self.handled,
+                "dropped": self.dropped,
+                "queued": len(self._slots),
+                "age_avg": self.age_total / self.age_count if self.age_count else 0.0,
+                "age_max": self.age_max,
+                "age_last": self.age_last,
+            }
+
+    def close(self, timeout: float = HANDLER_JOIN_TIMEOUT_S) -> None:
+        """
+        Drops the queued books and waits up to `timeout` for handlers still running, so none of them acts
+        after this returns (unless it overran the timeout).
+        """
+        with self._condition:
+            self._closed = True
+            self._slots.clear()
+            self._condition.notify_all()
+            workers = list(self._workers.values())
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            if worker is current_thread():
+                continue
+            worker.join(max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                print(f"Order book handler {worker.name} still running after {timeout}s")
+
+
+class EventStreamParser:
+    """
+    Incremental `text/event-stream` parser over raw bytes.
+
+    `feed` takes whatever the socket returned and gives back the complete events in it as
+    (event, data, id) tuples, with `data` still bytes; a partial event is kept for the next chunk.
+    Events are split with one `bytes.split` per chunk, so there is no per-byte or per-line Python loop.
+    """
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> list[tuple[str, bytes, str | None]]:
+        data = self._buffer + chunk if self._buffer else chunk
+        if b"\r" in data:
+            # A trailing CR may be the first half of a CRLF
+            hold = data.endswith(b"\r")
+            if hold:
+                data = data[:-1]
+            data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n") + (b"\r" if hold else b"")
+        blocks = data.split(b"\n\n")
+        self._buffer = blocks.pop()
+
+        events = []
+        for block in blocks:
+            event = "message"
+            event_id = None
+            lines = []
+            for line in block.split(b"\n"):
+                if not line or line[0] == 58:  # b":" starts a comment (keep-alives)
+                    continue
+                name, _, value = line.partition(b":")
+                if value[:1] == b" ":
+                    value = value[1:]
+                if name == b"data":
+                    lines.append(value)
+                elif name == b"event":
+                    event = value.decode()
+                elif name == b"id":
+                    event_id = value.decode()
+            if lines:
+                events.append((event, lines[0] if len(lines) == 1 else b"\n".join(lines), event_id))
+        return events
+
+
 class SSEThread(Thread):
     bearer: str
     url: str
     _handle_orderbook: Callable[[OrderBook], Any]
     _handle_trade_event: Callable[[Trade], Any]
+    _books: dict[str, LocalBook]
+    _latency: LatencyRecorder
+    _recorder: Any = None
+    _dispatcher: ConflatingDispatcher | None = None
     _http_stream: requests.Response | None = None
-    _client: sseclient.SSEClient | None = None
-    _closed: bool = False
 
     def __init__(
         self,
@@ -158,115 +776,399 @@ class SSEThread(Thread):
         url: str,
         handle_orderbook: Callable[[OrderBook], Any],
         handle_trade_event: Callable[[Trade], Any],
+        books: dict[str, LocalBook] | None = None,
+        dispatch: Literal["inline", "conflate"] = "inline",
+        latency: LatencyRecorder | None = None,
+        recorder: Any = None,
+        refresh_bearer: Callable[[str], str] | None = None,
+        on_resync: Callable[[], Any] | None = None,
+        backoff_s: float = SSE_BACKOFF_S,
+        max_backoff_s: float = SSE_MAX_BACKOFF_S,
     ):
+        """
+        With `dispatch="inline"` handlers run on this thread. With `dispatch="conflate"` order books
+        go through a `ConflatingDispatcher`, so a slow `handle_orderbook` only ever sees the newest book.
+        A `recorder` gets `record(event, data)` for every raw event before it is handled
+        (e.g. `src.sim.replay.StreamRecorder`).
+
+        A dropped stream is reopened after a jittered exponential backoff (`backoff_s` doubling up to
+        `max_backoff_s`, reset once events flow again); a 401 gets a new bearer from `refresh_bearer`.
+        Events missed in between cannot be replayed, so after a reconnect the local books are dropped
+        (each is rebuilt from its product's next full book) and `on_resync` is called, unless the server
+        numbers its events and resumed right after the last one seen. A jump in the numbering
+        mid-stream is handled the same way.
+        """
         super().__init__()
 
         self.bearer = bearer
         self.url = url
         self._handle_orderbook = handle_orderbook
         self._handle_trade_event = handle_trade_event
+        self._books = books if books is not None else {}
+        self._latency = latency or LatencyRecorder()
+        self._recorder = recorder
+        self._refresh_bearer = refresh_bearer
+        self._on_resync = on_resync
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self._closed = Event()
+        self._last_id: str | None = None
+        self._connected_before = False
+        # Whether the current connection attempt delivered any event, however it ended
+        self._events_received = False
+        self.reconnects = 0
+        self.resyncs = 0
+        if dispatch == "conflate":
+            self._dispatcher = ConflatingDispatcher(handle_orderbook, self._books, self._latency)
 
     def run(self):
-        while not self._closed:
+        attempt = 0
+        while not self._closed.is_set():
+            self._events_received = False
             try:
                 self._start_sse_client()
-            except Exception:
-                if not self._closed:
-                    print("Encountered an error. Trying to restart SSE client...")
-                    print(format_exc())
+            except Exception as e:
+                if self._closed.is_set():
+                    return
+                print(f"SSE stream failed: {e!r}")
+            finally:
+                # A failed attempt must not keep its connection out of the pool
+                if self._http_stream is not None:
+                    self._http_stream.close()
+            if self._closed.is_set():
+                return
+            # Most drops raise (ProtocolError, ReadTimeout) rather than end cleanly; either way a stream that
+            # delivered events was healthy, so the backoff starts over
+            if self._events_received:
+                attempt = 0
+
+            attempt += 1
+            self.reconnects += 1
+            delay = random.uniform(0, min(self.max_backoff_s, self.backoff_s * 2 ** (attempt - 1)))
+            print(f"Reconnecting to the SSE stream in {delay:.1f}s...")
+            self._closed.wait(delay)
+
+    @property
+    def dispatcher(self) -> ConflatingDispatcher | None:
+        return self._dispatcher
 
     def close(self):
-        self._closed = True
-        if self._http_stream:
-            self._http_stream.close()
-        if self._client:
-            self._client.close()
-
-    def _handle_orderbook_change(self, orderbook: dict[str, Any]):
-        buy_orders = sorted(
-            [
-                {
-                    "price": float(price),
-                    "volume": volumes["marketVolume"],
-                    "own_volume": volumes["userVolume"],
-                }
-                for price, volumes in orderbook["buyOrders"].items()
-            ],
-            key=lambda d: -d["price"],
-        )
-        sell_orders = sorted(
-            [
-                {
-                    "price": float(price),
-                    "volume": volumes["marketVolume"],
-                    "own_volume": volumes["userVolume"],
-                }
-                for price, volumes in orderbook["sellOrders"].items()
-            ],
-            key=lambda d: d["price"],
-        )
-
-        self._handle_orderbook(
-            OrderBook(
-                orderbook["productsymbol"],
-                orderbook["tickSize"],
-                list(map(lambda order: Order(**order), buy_orders)),
-                list(map(lambda order: Order(**order), sell_orders)),
-            )
-        )
+        self._closed.set()
+        http_stream = self._http_stream
+        if http_stream is not None:
+            http_stream.close()
+        if self._dispatcher:
+            self._dispatcher.close()
+
+    def _handle_orderbook_change(self, orderbook: dict[str, Any], received_at: float | None = None):
+        received_at = received_at or time.monotonic()
+        if self._dispatcher:
+            self._dispatcher.submit(orderbook, received_at)
+            return
 
-    def _start_sse_client(self):
+        symbol = orderbook["productsymbol"]
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = LocalBook(symbol, orderbook["tickSize"])
+
+        start = time.monotonic()
+        view = book.update(orderbook)
+        self._latency.record("book", time.monotonic() - start)
+        self._latency.run_handler(self._handle_orderbook, view, received_at)
+
+    def _resync(self, reason: str):
+        print(f"SSE stream {reason}: resyncing order books")
+        self.resyncs += 1
+        # Readers look books up by symbol, so the next full book of each product starts a fresh one
+        self._books.clear()
+        if self._on_resync:
+            self._on_resync()
+
+    def _check_gap(self, event_id: str) -> None:
+        last_id, self._last_id = self._last_id, event_id
+        if last_id is not None and last_id.isdigit() and event_id.isdigit() and int(event_id) != int(last_id) + 1:
+            self._resync(f"skipped from event {last_id} to {event_id}")
+
+    def _start_sse_client(self) -> bool:
+        """
+        Reads the stream until it ends. Returns whether any event arrived.
+        """
         headers = {
             "Authorization": self.bearer,
             "Accept": "text/event-stream; charset=utf-8",
         }
+        if self._last_id is not None:
+            headers["Last-Event-ID"] = self._last_id
         try:
             self._http_stream = requests.get(
-                self.url, stream=True, headers=headers, timeout=30
+                self.url, stream=True, headers=headers, timeout=(3.05, 30)
             )
-            self._client = sseclient.SSEClient(self._http_stream)
-
-            for event in self._client.events():
-                if event.event == "order":
-                    self._handle_orderbook_change(json.loads(event.data))
-                elif event.event == "trade":
-                    self._handle_trade_event(json.loads(event.data))
         except ReadTimeout:
             print(f"⚠️ Connection timed out (30s) - SSE stream could not start.")
-            # Optionally: Set stream to None or handle the retry logic here
             self._http_stream = None
+            return False
+
+        if self._http_stream.status_code == 401 and self._refresh_bearer:
+            self.bearer = self._refresh_bearer(self.bearer)
+        self._http_stream.raise_for_status()
+
+        reconnected = self._connected_before
+        self._connected_before = True
+        first = True
+        parser = EventStreamParser()
+        raw = self._http_stream.raw
+        while True:
+            # Whatever has arrived, up to SSE_READ_SIZE (urllib3 >= 2); raw.read(n) would wait for all n bytes
+            chunk = raw.read1(SSE_READ_SIZE)
+            if not chunk:
+                return not first
+            received_at = time.monotonic()
+            for event, data, event_id in parser.feed(chunk):
+                if first:
+                    first = False
+                    self._events_received = True
+                    # Without ids, or if the server did not resume where we left off, the gap is unknown
+                    if reconnected and (event_id is None or self._last_id is None or not (
+                            event_id.isdigit() and self._last_id.isdigit() and int(event_id) == int(self._last_id) + 1)):
+                        self._resync("reconnected")
+                        self._last_id = None
+                if event_id is not None:
+                    self._check_gap(event_id)
+
+                if self._recorder:
+                    self._recorder.record(event, data)
+                if event == "order":
+                    start = time.monotonic()
+                    orderbook = json_loads(data)
+                    self._latency.record("decode", time.monotonic() - start)
+                    self._handle_orderbook_change(orderbook, received_at)
+                elif event == "trade":
+                    self._handle_trade_event(json_loads(data))
+
+class Transport:
+    """
+    Keep-alive HTTP client for the exchange's REST API, shared by all `BaseBot` calls.
+
+    Connections come from one pooled session, every request has a timeout, and idempotent calls
+    (GET, DELETE) are retried a bounded number of times with jittered exponential backoff on
+    connection errors, timeouts and 5xx gateway errors. A 401 fetches a new token through
+    `authenticate` and repeats the request once.
+    """
+
+    IDEMPOTENT = ("GET", "DELETE")
+    RETRY_STATUS = (502, 503, 504)
+
+    def __init__(
+        self,
+        base_url: str,
+        authenticate: Callable[[], str],
+        pool_size: int = 16,
+        timeout: float | tuple[float, float] = (3.05, 10),
+        retries: int = 2,
+        backoff_s: float = 0.05,
+        latency: LatencyRecorder | None = None,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._authenticate = authenticate
+        self._token: str | None = None
+        self._token_lock = Lock()
+        self._latency = latency or LatencyRecorder()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def token(self) -> str:
+        if self._token is None:
+            return self.refresh_token(None)
+        return self._token
+
+    def refresh_token(self, rejected: str | None) -> str:
+        """
+        Authenticates again unless another thread already replaced the `rejected` token.
+        """
+        with self._token_lock:
+            if self._token is None or self._token == rejected:
+                self._token = self._authenticate()
+            return self._token
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Sends an authenticated request to `base_url + path`. Raises once the retries are used up.
+        """
+        url = f"{self.base_url}{path}"
+        attempts = 1 + (self.retries if method in self.IDEMPOTENT else 0)
+        reauthenticated = False
+        attempt = 0
+        start = time.monotonic()
+        while True:
+            token = self.token
+            headers = {**STANDARD_HEADERS, "Authorization": token}
+            try:
+                response = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                attempt += 1
+                if attempt >= attempts:
+                    raise
+                self._sleep(attempt)
+                continue
+
+            if response.status_code == 401 and not reauthenticated:
+                reauthenticated = True
+                self.refresh_token(token)
+                continue
+            if response.status_code in self.RETRY_STATUS and attempt + 1 < attempts:
+                attempt += 1
+                self._sleep(attempt)
+                continue
+            self._latency.record(f"rest_{method}", time.monotonic() - start)
+            return response
+
+    def _sleep(self, attempt: int):
+        time.sleep(random.uniform(0, self.backoff_s * 2 ** (attempt - 1)))
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class TokenBucket:
+    """
+    Blocking token-bucket rate limiter: `rate` tokens per second, at most `burst` saved up.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes one token, sleeping until it is available. Returns the seconds waited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going negative reserves the token, so concurrent callers queue up behind each other
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class OrderGateway:
+    """
+    Non-blocking order entry for a `BaseBot`.
+
+    Calls return futures right away and run on a bounded worker pool; the `*_many` variants return
+    their futures in request order. Every request first takes a token from a shared `TokenBucket`,
+    so bursts are spread out to the exchange's rate limit instead of being rejected.
+    """
+
+    def __init__(self, bot: "BaseBot", max_workers: int = 8, rate: float = ORDER_RATE_PER_S, burst: int = ORDER_BURST):
+        self._bot = bot
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="order-gateway")
+        self.limiter = TokenBucket(rate, burst)
+
+    def _limited(self, call: Callable, *args):
+        self.limiter.acquire()
+        return call(*args)
+
+    def submit(self, order_request: OrderRequest) -> Future:
+        return self._pool.submit(self._limited, self._bot.send_order, order_request)
+
+    def submit_many(self, order_requests: list[OrderRequest]) -> list[Future]:
+        return [self.submit(order_request) for order_request in order_requests]
+
+    def cancel(self, order_id: str) -> Future:
+        return self._pool.submit(self._limited, self._bot.cancel_order_by_id, order_id)
+
+    def cancel_many(self, order_ids: list[str]) -> list[Future]:
+        return [self.cancel(order_id) for order_id in order_ids]
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
 
 class BaseBot(ABC):
     username: str
     _password: str
     _cmi_url: str
     _sse_thread: SSEThread = None
+    _stopped: bool = False
 
-    def __init__(self, cmi_url: str, username: str, password: str):
+    def __init__(self, cmi_url: str, username: str, password: str, pool_size: int = 16,
+                 timeout: float | tuple[float, float] = (3.05, 10)):
         self._cmi_url = cmi_url
         self.username = username
         self._password = password
-
-    @cached_property
-    def auth_token(self):
-        return self._authenticate()
+        self.latency = LatencyRecorder()
+        self.transport = Transport(cmi_url, self._authenticate, pool_size=pool_size, timeout=timeout,
+                                   latency=self.latency)
+        self.books: dict[str, LocalBook] = {}
+        self.orders = OrderRegistry(username)
+        self.positions = PositionTracker(username)
+        self.gateway = OrderGateway(self)
+
+    @property
+    def auth_token(self) -> str:
+        return self.transport.token
 
     def start(
-        self, on_orderbook: Callable | None = None, on_trades: Callable | None = None
+        self,
+        on_orderbook: Callable | None = None,
+        on_trades: Callable | None = None,
+        dispatch: Literal["inline", "conflate"] = "inline",
+        recorder: Any = None,
     ) -> None:
         """
-        Creates SSE thread to handle market events
+        Creates SSE thread to handle market events.
+        Use `dispatch="conflate"` when `on_orderbook` blocks (e.g. on REST calls), see `ConflatingDispatcher`.
+        Pass a `recorder` (e.g. `src.sim.replay.StreamRecorder`) to log the raw stream for replay.
         """
         if self._sse_thread:
             raise Exception(
                 "Bot already running. Please use the `stop()` method before trying again."
             )
+        if self._stopped:
+            raise Exception("Bot was stopped and its order gateway closed. Please create a new bot.")
+
+        handle_trades = on_trades or self.on_trades
+
+        def handle_trade_event(trades):
+            # Own fills update the order registry and positions before the strategy sees them
+            self.orders.on_trades(trades)
+            self.positions.on_trades(trades)
+            handle_trades(trades)
 
         self._sse_thread = SSEThread(
             bearer=self.auth_token,
             url=f"{self._cmi_url}/api/market/stream",
             handle_orderbook=on_orderbook or self.on_orderbook,
-            handle_trade_event=on_trades or self.on_trades,
+            handle_trade_event=handle_trade_event,
+            books=self.books,
+            dispatch=dispatch,
+            latency=self.latency,
+            recorder=recorder,
+            refresh_bearer=self.transport.refresh_token,
+            on_resync=self._on_stream_resync,
         )
 
         print("Starting SSEThread...")
@@ -275,13 +1177,39 @@ class BaseBot(ABC):
 
     def stop(self) -> None:
         """
-        Closes SSE thread
+        Closes the SSE thread, waits for running order book handlers, then shuts down the order gateway
+        and the HTTP session. Safe to call more than once.
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        if self._sse_thread:
+            print("Closing SSE Thread...")
+            # Also joins the dispatcher's workers, so no handler requotes on the closed gateway below
+            self._sse_thread.close()
+            self._sse_thread.join()
+            self._sse_thread = None
+            print("SSE Thread closed")
+        self.gateway.close()
+        self.transport.close()
+
+    def _on_stream_resync(self):
+        # Fills may have been missed along with the stream, so the registry is checked before the next requote
+        self.orders.stale = True
+
+    def latency_snapshot(self) -> dict[str, dict[str, float]]:
         """
-        print("Closing SSE Thread...")
-        self._sse_thread.close()
-        self._sse_thread.join()
-        self._sse_thread = None
-        print("SSE Thread closed")
+        Per-stage latency statistics in seconds, see `LatencyRecorder`.
+        """
+        return self.latency.snapshot()
+
+    def dispatcher_stats(self) -> dict[str, float] | None:
+        """
+        Counters of the conflating dispatcher, or None when handlers run inline.
+        """
+        if self._sse_thread and self._sse_thread.dispatcher:
+            return self._sse_thread.dispatcher.stats()
+        return None
 
     @abstractmethod
     def on_orderbook(self, orderbook: OrderBook):
@@ -296,34 +1224,96 @@ class BaseBot(ABC):
 
     def send_order(self, order_request: OrderRequest) -> OrderResponse | None:
         payload = asdict(order_request)
-        url = f"{self._cmi_url}/api/order"
-        response = requests.post(url, json=payload, headers=self._get_headers())
+        response = self.transport.post("/api/order", json=payload)
         if response.status_code == 200:
-            return OrderResponse(**response.json())
+            order_response = OrderResponse(**response.json())
+            self.orders.add(order_response)
+            tick = self.latency.tick
+            if tick is not None:
+                self.latency.record("tick_to_ack", time.monotonic() - tick)
+            return order_response
         else:
             print(
                 f"Failed to send order, {order_request}, with response {response.content}"
             )
 
+    def requote(self, product: str, desired_orders: list[OrderRequest]) -> list[OrderResponse]:
+        """
+        Makes the user's resting orders in `product` match `desired_orders`, using the local order registry.
+        Live orders with the same side, price and remaining volume are kept, the other ones are cancelled,
+        and only the missing orders are sent. Nothing goes over the wire when the quote is unchanged.
+        """
+        # Sends run on the gateway's threads, so the tick is taken here
+        tick = self.latency.tick
+        if self.orders.stale:
+            self.reconcile_orders()
+
+        unmatched = self.orders.for_product(product)
+        missing = []
+        for request in desired_orders:
+            match = next(
+                (o for o in unmatched if o.side == request.side and o.price == request.price and o.volume == request.volume),
+                None,
+            )
+            if match is None:
+                missing.append(request)
+            else:
+                unmatched.remove(match)
+
+        # Cancels land before the new orders go out, so the two never cross
+        cancels = self.gateway.cancel_many([order.id for order in unmatched])
+        wait(cancels)
+        failed = [future for future in cancels if future.exception() is not None or future.result() is None]
+        if failed:
+            # An order we meant to cancel may still rest; sending now could cross it or double the quote.
+            # The next requote reconciles with the exchange first.
+            for future in failed:
+                if future.exception() is not None:
+                    print(f"Failed to cancel order: {future.exception()}")
+            self.orders.stale = True
+            return []
+        sent = [future.result() for future in self.gateway.submit_many(missing)]
+        if tick is not None and missing:
+            self.latency.record("tick_to_ack", time.monotonic() - tick)
+        return [response for response in sent if response is not None]
+
+    def position(self, product: str) -> int:
+        """
+        Net position in `product` from the local tracker; no I/O.
+        """
+        return self.positions.position(product)
+
+    def reconcile_positions(self) -> bool:
+        """
+        Checks the tracked positions against the exchange's and adopts the exchange's on a mismatch.
+        """
+        since = time.monotonic()
+        positions = self.request_net_positions()
+        if positions is None:
+            return False
+        corrections = self.positions.replace(positions, since)
+        if corrections:
+            print(f"Positions corrected from the exchange: {corrections}")
+        return corrections is not None
+
+    def reconcile_orders(self) -> bool:
+        """
+        Replaces the local order registry with the exchange's list of the user's orders.
+        """
+        since = time.monotonic()
+        orders = self.request_all_orders()
+        if orders is None:
+            return False
+        self.orders.replace(orders, since)
+        return True
+
     def send_mass_orders(
         self, order_requests: list[OrderRequest]
     ) -> list[OrderResponse]:
-        responses = []
-
-        def worker(order_request, response_list):
-            response = self.send_order(order_request)
-            response_list.append(response)
-
-        threads = []
-        for order_request in order_requests:
-            thread = Thread(target=worker, args=(order_request, responses))
-            threads.append(thread)
-            thread.start()
-
-        for thread in threads:
-            thread.join()
-
-        return responses
+        """
+        Sends the orders through the gateway's pool and waits; responses are in request order.
+        """
+        return [future.result() for future in self.gateway.submit_many(order_requests)]
     
     def clear_orders_for_product(self, product_symbol: str) -> None:
         """
@@ -343,47 +1333,47 @@ class BaseBot(ABC):
                 self.cancel_order_by_id(order["id"])
 
     def request_all_orders(self) -> list[dict] | None:
-        url = f"{self._cmi_url}/api/order/current-user"
-        response = requests.get(url, headers=self._get_headers())
+        response = self.transport.get("/api/order/current-user")
         if response.status_code == 200:
             return response.json()
         else:
             print(f"Failed to get all orders: {response.content}")
 
     def cancel_order_by_id(self, order_id: str) -> dict | None:
-        url = f"{self._cmi_url}/api/order/{order_id}"
-        response = requests.delete(url, headers=self._get_headers())
+        response = self.transport.delete(f"/api/order/{order_id}")
         if response.status_code == 200:
+            self.orders.remove(order_id)
             return response.json()
 
         print(f"Failed to cancel order: {response.content}")
+        # Most likely filled or already gone; the next requote asks the exchange
+        self.orders.stale = True
 
     def cancel_order(self, product: str, price: float) -> dict | None:
-        url = f"{self._cmi_url}/api/order?product={product}&price={price}"
-        response = requests.delete(url, headers=self._get_headers())
+        response = self.transport.delete("/api/order", params={"product": product, "price": price})
         if response.status_code == 200:
+            self.orders.remove_at(product, price)
             return response.json()
         else:
             print(f"Failed to cancel order: {response.content}")
 
     def cancel_all_orders(self) -> None:
         for order in self.request_all_orders():
-            url = f"{self._cmi_url}/api/order/{order['id']}"
-            response = requests.delete(url, headers=self._get_headers())
-            if response.status_code != 200:
+            response = self.transport.delete(f"/api/order/{order['id']}")
+            if response.status_code == 200:
+                self.orders.remove(order['id'])
+            else:
                 print(f"Failed to cancel order: {response.content}")
 
     def request_all_products(self) -> list[Product] | None:
-        url = f"{self._cmi_url}/api/product"
-        response = requests.get(url, headers=self._get_headers())
+        response = self.transport.get("/api/product")
         if response.status_code == 200:
             return list(map(lambda prod: Product(**prod), json.loads(response.text)))
         else:
             print(f"Failed to get all products: {response.content}")
 
     def request_positions(self) -> dict[str, int] | None:
-        url = f"{self._cmi_url}/api/position/current-user"
-        response = requests.get(url, headers=self._get_headers())
+        response = self.transport.get("/api/position/current-user")
         if response.status_code == 200:
             return {
                 position["product"]: position["volume"] for position in response.json()
@@ -392,8 +1382,7 @@ class BaseBot(ABC):
             print(f"Failed to get positions: {response.content}")
 
     def request_net_positions(self) -> dict[str, int] | None:
-        url = f"{self._cmi_url}/api/position/current-user"
-        response = requests.get(url, headers=self._get_headers())
+        response = self.transport.get("/api/position/current-user")
         if response.status_code == 200:
             return {
                 position["product"]: position["netPosition"]
@@ -405,7 +1394,7 @@ class BaseBot(ABC):
     def _authenticate(self) -> str:
         auth = {"username": self.username, "password": self._password}
         url = f"{self._cmi_url}/api/user/authenticate"
-        response = requests.post(url, headers=STANDARD_HEADERS, json=auth)
+        response = self.transport.session.post(url, headers=STANDARD_HEADERS, json=auth, timeout=self.transport.timeout)
         response.raise_for_status()
 
         return response.headers["Authorization"]
@@ -1,5 +1,7 @@
-import schedule
+import functools
 import logging
+import os
+import time
 
 # --- 1. Setup Logging Configuration ---
 logging.basicConfig(
@@ -10,89 +12,212 @@ logging.basicConfig(
 logger = logging.getLogger("TradingBot")
 
 from imcity_template import BaseBot, OrderBook, OrderRequest, Side
-from src.fetch.main import fetch_schedule
-from src.indicators.markets import price5, price6
-
-def calculate_expected_prices():
+from src.fetch.main import fetch_schedules, page_cache
+from src.fetch.pipeline import shutdown_parse_pool
+from src.indicators.buckets import Price6Buckets
+from src.indicators.flights import FlightStateIndex
+from src.indicators.markets import price5
+from src.indicators.tradeflow import TradeFlowIndicators
+from src.indicators.montecarlo import simulate_settlements
+from src.runtime.refresh import AdaptiveRefresh, munich_now
+from src.runtime.runtime import FairValues, Runtime
+from src.runtime.shared import SHARED_FAIR_VALUES_PATH, FairValuePublisher, FairValueReader
+from src.strategy.quoting import QuoteParams, quote
+from util import SNAPSHOT_FILE, add_to_series, close_series, load_warm_start, save_warm_start
+
+# Quote parameters; tune them with `python -m src.strategy.backtest`
+QUOTE_PARAMS = QuoteParams(min_spread=2.0, spread_per_std=0.5, fair_weight=0.5, volume=1, inventory_skew=1.0)
+# Point at a local simulator with e.g. CMI_URL=http://127.0.0.1:8080 (python -m src.sim.exchange)
+CMI_URL = os.environ.get("CMI_URL", "http://ec2-18-203-201-148.eu-west-1.compute.amazonaws.com")
+# How often the local order registry is checked against the exchange
+ORDER_RECONCILE_INTERVAL_S = 30
+# How often the positions kept from our trades are checked against the exchange
+POSITION_RECONCILE_INTERVAL_S = 120
+# Flight-level state between refreshes; price6 is updated from the changes only
+flight_index = FlightStateIndex()
+price6_buckets = Price6Buckets()
+# Refresh interval bounds; within them it follows the board's change rate and the price6 window
+refresh_policy = AdaptiveRefresh(min_interval_s=30, max_interval_s=900)
+# Quoting pauses when the fair values are older than this (a few missed refreshes)
+MAX_FAIR_VALUE_AGE_S = 600
+# Several bots share one scrape: start one process with FAIR_VALUE_FEED=produce (scrapes and publishes,
+# does not trade) and the bots with FAIR_VALUE_FEED=consume (read the shared segment, never scrape)
+FAIR_VALUE_FEED = os.environ.get("FAIR_VALUE_FEED", "")
+FAIR_VALUE_FEED_PATH = os.environ.get("FAIR_VALUE_FEED_PATH", SHARED_FAIR_VALUES_PATH)
+# RECORD_SERIES=1 appends every refresh's estimates to util.TIME_SERIES_FILE (off by default)
+RECORD_SERIES = os.environ.get("RECORD_SERIES", "") == "1"
+
+def calculate_expected_prices() -> FairValues | None:
     try:
-        arrivals = fetch_schedule(is_arrival=True)
-        departures = fetch_schedule(is_arrival=False)
+        arrivals, departures = fetch_schedules()
+        if arrivals.empty and departures.empty:
+            # Every page failed; keep the last fair values rather than publish ones for an empty airport
+            logger.error("Schedule scrape returned no flights")
+            return None
+
+        changes = flight_index.update(arrivals, departures)
+        touched = price6_buckets.apply(changes.changes())
+        refresh_policy.observe(changes)
 
-        global m5_fair_value
         m5_fair_value = price5(arrivals, departures)
+        m6_fair_value = price6_buckets.value
+
+        scenarios = simulate_settlements(arrivals, departures, now=munich_now())
 
-        global m6_fair_value
-        m6_fair_value = price6(arrivals, departures)
+        fair_values = FairValues(
+            m5=m5_fair_value,
+            m6=m6_fair_value,
+            m5_std=scenarios.price5.std,
+            m6_std=scenarios.price6.std,
+        )
 
         # Clear visual separator for price updates
         logger.info(f"{'-'*15} PRICE UPDATE {'-'*15}")
-        logger.info(f"Est M5 (Flights): {m5_fair_value}")
-        logger.info(f"Est M6 (Airport): {m6_fair_value}")
+        logger.info(f"Est M5 (Flights): {m5_fair_value} (std {fair_values.m5_std:.1f}, 5-95%: {scenarios.price5.quantiles[0.05]:.0f}-{scenarios.price5.quantiles[0.95]:.0f})")
+        logger.info(f"Est M6 (Airport): {m6_fair_value} (std {fair_values.m6_std:.1f}, 5-95%: {scenarios.price6.quantiles[0.05]:.0f}-{scenarios.price6.quantiles[0.95]:.0f})")
+        logger.info(f"Page cache: {page_cache.stats()}")
+        logger.info(f"Schedule: {changes.summary()}, {len(touched)} price6 buckets changed")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Price6 bucket moves: {changes.bucket_moves(price6_buckets)}")
+
+        if RECORD_SERIES:
+            add_to_series(m5_fair_value, m6_fair_value, fair_values.m5_std, fair_values.m6_std)
+        save_warm_start(arrivals, departures, fair_values)
+
+        return fair_values
 
     except Exception as e:
         logger.error(f"Error calculating prices: {e}")
 
+def publish_expected_prices(publisher: FairValuePublisher) -> FairValues | None:
+    fair_values = calculate_expected_prices()
+    if fair_values is not None:
+        publisher.publish(fair_values, price6_buckets)
+    return fair_values
+
 class CustomBot(BaseBot):
 
+    def __init__(self, cmi_url: str, username: str, password: str, runtime: Runtime,
+                 params: QuoteParams = QUOTE_PARAMS, max_fair_value_age_s: float = MAX_FAIR_VALUE_AGE_S,
+                 feed: FairValueReader | None = None):
+        super().__init__(cmi_url, username, password)
+        self.runtime = runtime
+        # Fair values come from the shared feed when given, otherwise from the runtime's own refreshes
+        self.feed = feed
+        self.params = params
+        self.max_fair_value_age_s = max_fair_value_age_s
+        self.paused: set[str] = set()
+        # Rolling VWAP, imbalance and volatility of the market's trades
+        self.trade_flow = TradeFlowIndicators()
+
     def on_trades(self, trades: list[dict]):
-        return
+        self.trade_flow.on_trades(trades)
 
     def on_orderbook(self, orderbook: OrderBook):
+        start = time.monotonic()
         product = orderbook.product
         if not product == '5_Flights' and not product == '6_Airport':
             return
-        fair_value = m5_fair_value if product == '5_Flights' else m6_fair_value
-
-        if not orderbook.buy_orders or not orderbook.sell_orders:
+        # One read of the published snapshot, so both values come from the same refresh
+        fair_values = self.runtime.snapshot if self.feed is None else self.feed.snapshot
+        if fair_values is None or time.time() - fair_values.timestamp > self.max_fair_value_age_s:
+            self.pause(product)
             return
-
-        best_bid = orderbook.buy_orders[0]
-        best_ask = orderbook.sell_orders[0]
-
-        if best_bid.price >= best_ask.price:
+        if product in self.paused:
+            self.paused.discard(product)
+            logger.info(f"Quoting {product} again")
+        fair_value = fair_values.m5 if product == '5_Flights' else fair_values.m6
+        fair_std = fair_values.m5_std if product == '5_Flights' else fair_values.m6_std
+
+        # Our own resting quote must not move the mid we quote around
+        position = self.position(product)
+        quoted = quote(orderbook.best_other_bid_price, orderbook.best_other_ask_price, fair_value, fair_std,
+                       self.params, position)
+        if quoted is None:
             return
+        is_buy, price, mean_price = quoted
 
-        spread = 0.008
-        mid = (best_bid.price + best_ask.price) / 2
-        mean_price = (mid + fair_value) / 2
-
-        # Clear old Orders before making new ones
-        self.clear_orders_for_product(product)
-
-        # Open new Orders
-        price = round(mean_price * ((1 + spread) if fair_value > mean_price else (1 - spread)))
         order = OrderRequest(product=product,
                              price=price,
-                             volume=1,
-                             side=(Side.BUY if fair_value > mean_price else Side.SELL)
+                             volume=self.params.volume,
+                             side=(Side.BUY if is_buy else Side.SELL)
                              )
         
-        print(f"Fair: {fair_value}, Mean: {mean_price} -> {"Buy" if fair_value > mean_price else "Sell"} at {price}")
-            
-        self.send_order(order)
-
-m5_fair_value = None 
-m6_fair_value = None
-
-try:
+        self.latency.record("quote", time.monotonic() - start)
+
+        # Only touches the exchange when the quote differs from the resting orders
+        if self.requote(product, [order]):
+            print(f"Fair: {fair_value}, Mean: {mean_price}, Position: {position} -> {"Buy" if is_buy else "Sell"} at {price}")
+
+    def pause(self, product: str):
+        """
+        Stops quoting `product` until fair values are available again, and pulls its resting orders.
+        """
+        if product not in self.paused:
+            self.paused.add(product)
+            logger.warning(f"Fair values missing or older than {self.max_fair_value_age_s:.0f}s, quoting of {product} paused")
+        if self.orders.for_product(product):
+            self.requote(product, [])
+
+# Guarded so parse-pool workers can import this module without starting the bot
+if __name__ == "__main__":
     print("\n")
     logger.info(f"{'='*10} BOT INITIALIZATION {'='*10}")
-    
-    calculate_expected_prices()
-    schedule.every(3).minutes.do(calculate_expected_prices)
-    
-    logger.info("Scheduler started.")
-
-    market_bot = CustomBot("http://ec2-18-203-201-148.eu-west-1.compute.amazonaws.com", "Die Market-Macher eV.", "MarketMacherTUM!")
-    market_bot.start()
-
-    logger.info("Bot connected. Monitoring streams...")
-    
-    while True:
-        schedule.run_pending()
-        pass
-
-except KeyboardInterrupt:
-    market_bot.stop()
-    print("\n")
-    logger.info("🛑 Script stopped by user.")
\ No newline at end of file
+
+    publisher = FairValuePublisher(FAIR_VALUE_FEED_PATH) if FAIR_VALUE_FEED == "produce" else None
+    feed = FairValueReader(FAIR_VALUE_FEED_PATH) if FAIR_VALUE_FEED == "consume" else None
+
+    if feed is not None:
+        runtime = Runtime(None)
+        logger.info(f"Reading fair values from the shared feed at {feed.path}")
+    else:
+        refresh = calculate_expected_prices if publisher is None else functools.partial(publish_expected_prices, publisher)
+        runtime = Runtime(refresh, refresh_interval_s=180, policy=refresh_policy)
+        # Quote from the last refresh's fair values right away; the scrape catches up in the background
+        warm_start = load_warm_start()
+        if warm_start is not None:
+            runtime.publish(warm_start.fair_values)
+            # The first scrape then reports only what changed since the snapshot
+            changes = flight_index.update(warm_start.arrivals, warm_start.departures, at=warm_start.saved_at)
+            price6_buckets.apply(changes.changes())
+            refresh_policy.observe(changes)
+            if publisher is not None:
+                publisher.publish(warm_start.fair_values, price6_buckets)
+            logger.info(f"Warm start from {SNAPSHOT_FILE}: fair values from {warm_start.age_s:.0f}s ago, "
+                        f"{len(warm_start.arrivals)} arrivals, {len(warm_start.departures)} departures")
+        runtime.refresh_now()
+
+        logger.info(f"Scheduler started (kill -USR1 {os.getpid()} to refresh now).")
+        if publisher is not None:
+            logger.info(f"Publishing fair values to the shared feed at {publisher.path}")
+
+    market_bot = None
+    if publisher is None:
+        market_bot = CustomBot(CMI_URL, "Die Market-Macher eV.", "MarketMacherTUM!", runtime, feed=feed)
+        market_bot.reconcile_orders()
+        market_bot.reconcile_positions()
+        market_bot.start(dispatch="conflate")
+
+        logger.info("Bot connected. Monitoring streams...")
+        runtime.scheduler.every(60).seconds.do(lambda: logger.info(f"Dispatcher: {market_bot.dispatcher_stats()}"))
+        runtime.scheduler.every(60).seconds.do(lambda: logger.info(f"Latency: {market_bot.latency.summary()}"))
+        runtime.scheduler.every(ORDER_RECONCILE_INTERVAL_S).seconds.do(market_bot.reconcile_orders)
+        runtime.scheduler.every(POSITION_RECONCILE_INTERVAL_S).seconds.do(market_bot.reconcile_positions)
+        runtime.scheduler.every(60).seconds.do(lambda: logger.info(f"Positions: {market_bot.positions.snapshot()}"))
+        runtime.scheduler.every(60).seconds.do(lambda: logger.info(f"Trade flow (60s): {market_bot.trade_flow.snapshot(60)}"))
+
+    try:
+        # Sleeps until the next refresh is due; returns on SIGTERM or Ctrl+C
+        runtime.run()
+    finally:
+        if market_bot is not None:
+            market_bot.stop()
+        if publisher is not None:
+            publisher.close()
+        if feed is not None:
+            feed.close()
+        runtime.shutdown()
+        shutdown_parse_pool()
+        close_series()
+        print("\n")
+        logger.info("🛑 Script stopped.")
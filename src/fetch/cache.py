@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+
+@dataclass
+class CacheEntry:
+    digest: bytes
+    etag: str | None
+    last_modified: str | None
+    fragment: object
+    parse_seconds: float
+
+class PageCache:
+    """
+    Per-page cache of parsed schedule fragments (whatever `parse` returns), keyed by the page's URL parameters.
+    A page is only parsed again when the server reports a change (no 304) and its bytes hash differently.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple, CacheEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.parse_seconds_spent = 0.0
+        self.parse_seconds_saved = 0.0
+
+    @staticmethod
+    def key(url: str, params: dict) -> tuple:
+        return (url, *sorted(params.items()))
+
+    def validators(self, key: tuple) -> dict:
+        """
+        Conditional-request headers for a page we have seen before.
+        """
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def fragment(self, key: tuple, response, parse):
+        """
+        Returns the parsed fragment for `response`, reusing the cached one if the page is unchanged.
+        """
+        entry = self._entries.get(key)
+
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                self.hits += 1
+                self.not_modified += 1
+                self.parse_seconds_saved += entry.parse_seconds
+            return entry.fragment
+
+        content = response.content
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        if entry is not None and entry.digest == digest:
+            with self._lock:
+                self.hits += 1
+                self.parse_seconds_saved += entry.parse_seconds
+            return entry.fragment
+
+        start = time.perf_counter()
+        fragment = parse(response.text)
+        parse_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self.parse_seconds_spent += parse_seconds
+            self._entries[key] = CacheEntry(
+                digest,
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'),
+                fragment,
+                parse_seconds,
+            )
+        return fragment
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "parse_seconds_spent": round(self.parse_seconds_spent, 4),
+                "parse_seconds_saved": round(self.parse_seconds_saved, 4),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,7 +1,28 @@
 from bs4 import BeautifulSoup
+from dataclasses import dataclass
+import numpy as np
 import pandas as pd
 import re
-from datetime import datetime
+import html
+from datetime import datetime, timedelta
+
+def _final_time_str(time_cell):
+    # Example text: "22:25 |" or "06:45 | 06:30"
+    if '|' in time_cell:
+        parts = time_cell.split('|')
+
+        # Check if the second part (Expected Time) is present and not just empty whitespace
+        expected_time = parts[1].strip() if len(parts) > 1 else ""
+
+        if expected_time:
+            # 1. Expected time is available (e.g., "06:30")
+            return expected_time
+        else:
+            # 2. Expected time is missing, so use the Scheduled Time (e.g., "22:25 |")
+            return parts[0].strip()
+
+    # 3. Only a single time value is present (no pipe)
+    return time_cell.strip()
 
 def parse_muc_schedule(html_content):
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -51,25 +72,8 @@ def parse_muc_schedule(html_content):
                 # Example text: "22:25 |" or "06:45 | 06:30"
                 time_cell = row.find('td', class_='fp-flight-time-muc').get_text(strip=True)
 
-                final_time_str = "" # Renamed variable for clarity
-
-                if '|' in time_cell:
-                    parts = time_cell.split('|')
-                    
-                    # Check if the second part (Expected Time) is present and not just empty whitespace
-                    expected_time = parts[1].strip() if len(parts) > 1 else ""
-
-                    if expected_time:
-                        # 1. Expected time is available (e.g., "06:30")
-                        final_time_str = expected_time
-                    else:
-                        # 2. Expected time is missing, so use the Scheduled Time (e.g., "22:25 |")
-                        final_time_str = parts[0].strip()
-                        
-                else:
-                    # 3. Only a single time value is present (no pipe)
-                    final_time_str = time_cell.strip()
-                
+                final_time_str = _final_time_str(time_cell)
+
                 # Combine Date and Time into ISO Format
                 iso_string = None
                 if current_date_str and final_time_str:
@@ -90,6 +94,304 @@ def parse_muc_schedule(html_content):
 
     return pd.DataFrame(flights_data)
 
+_DATE_RE = re.compile(r'(\d{2}\.\d{2}\.\d{4})')
+_TIME_RE = re.compile(r'(\d{1,2}):(\d{1,2})')
+# One token per tag or comment; everything between two tokens is a text node
+_TOKEN_RE = re.compile(r'<(?:(/?)([a-zA-Z][a-zA-Z0-9]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>|!--.*?--\s*>|![^>]*>|\?[^>]*>)', re.S)
+_CLASS_RE = re.compile(r'\bclass\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))', re.I)
+# Content of these tags is raw text, not markup
+_RAWTEXT_END = {name: re.compile(rf'</{name}\s*>', re.I) for name in ('script', 'style')}
+
+def _classes(attrs):
+    match = _CLASS_RE.search(attrs)
+    if not match:
+        return ()
+    return (match.group(1) or match.group(2) or match.group(3) or "").split()
+
+def _text(segments, strip):
+    if strip:
+        return "".join(t for t in (html.unescape(s).strip() for s in segments) if t)
+    return html.unescape("".join(segments))
+
+class _DatePrefixCache(dict):
+    """
+    Maps "DD.MM.YYYY" to its ISO prefix "YYYY-MM-DDT" (None if the date is invalid),
+    so each row only has to format its time instead of running strptime.
+    """
+
+    def __missing__(self, date_str):
+        try:
+            prefix = datetime.strptime(date_str, "%d.%m.%Y").date().isoformat() + "T"
+        except ValueError:
+            prefix = None
+        self[date_str] = prefix
+        return prefix
+
+class _DateEpochCache(dict):
+    """
+    Maps "DD.MM.YYYY" to the epoch seconds of that midnight (None if the date is invalid).
+    """
+
+    def __missing__(self, date_str):
+        try:
+            midnight = (datetime.strptime(date_str, "%d.%m.%Y") - _EPOCH) // _SECOND
+        except ValueError:
+            midnight = None
+        self[date_str] = midnight
+        return midnight
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+_NAT = np.iinfo(np.int64).min  # NaT as int64 nanoseconds
+
+def _epoch_ns(date_midnights, date_str, final_time_str):
+    """
+    Epoch nanoseconds of the naive timestamp `_iso_time` would return. Raises ValueError where it would.
+    """
+    midnight = date_midnights[date_str]
+    match = _TIME_RE.fullmatch(final_time_str)
+    if midnight is not None and match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour < 24 and minute < 60:
+            return (midnight + hour * 3600 + minute * 60) * 1_000_000_000
+    dt_obj = datetime.strptime(f"{date_str} {final_time_str}", "%d.%m.%Y %H:%M")
+    return (dt_obj - _EPOCH) // _SECOND * 1_000_000_000
+
+def _iso_time(date_prefixes, date_str, final_time_str):
+    """
+    Same result as `datetime.strptime(f"{date} {time}", "%d.%m.%Y %H:%M").isoformat()`.
+    Raises ValueError where strptime would.
+    """
+    prefix = date_prefixes[date_str]
+    match = _TIME_RE.fullmatch(final_time_str)
+    if prefix is not None and match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour < 24 and minute < 60:
+            return f"{prefix}{hour:02d}:{minute:02d}:00"
+    # Anything off the fast path gets strptime's exact semantics
+    return datetime.strptime(f"{date_str} {final_time_str}", "%d.%m.%Y %H:%M").isoformat()
+
+def _stream_rows(html_content):
+    """
+    Walks the tag stream once, without building a tree, and only collects the header,
+    the `fp-flight-date` separator rows and the number/time cells of `fp-flight-item` rows.
+    Returns a list of (flight_num, date_str, final_time_str), or None if the page has no flight table,
+    and the number of `fp-flight-item` rows, including the ones without a number or time cell.
+    """
+    header_segments = None   # text of the first fp-flights-headline h3 (None until found)
+    header_depth = 0
+    table_state = 0          # 0: before the table, 1: in the table, 2: in its tbody, 3: done
+    table_depth = 0
+    tr_depth = 0
+    row_kind = None          # 'date' / 'item' / None for the current top-level row
+    row_segments = None      # collected text of a date row
+    cell = None              # 'number' / 'time' while inside one of the wanted cells
+    cell_depth = 0
+    cells = {}
+
+    # Rows are (flight_num, date_str, final_time_str); date_str None means "header date"
+    rows = []
+    items = 0
+    current_date = None
+    uses_header_date = True
+
+    position = 0
+    length = len(html_content)
+    while position < length:
+        token = _TOKEN_RE.search(html_content, position)
+        end = token.start() if token else length
+        if end > position:
+            text = html_content[position:end]
+            if header_depth:
+                header_segments.append(text)
+            if cell is not None:
+                cells[cell].append(text)
+            elif row_segments is not None:
+                row_segments.append(text)
+        if not token:
+            break
+        position = token.end()
+
+        name = token.group(2)
+        if name is None:
+            continue  # comment, doctype or processing instruction
+        name = name.lower()
+        closing = token.group(1)
+
+        if not closing and name in _RAWTEXT_END:
+            close = _RAWTEXT_END[name].search(html_content, position)
+            position = close.end() if close else length
+            continue
+
+        if name == 'h3':
+            if closing:
+                if header_depth:
+                    header_depth -= 1
+            elif header_depth:
+                header_depth += 1
+            elif header_segments is None and 'fp-flights-headline' in _classes(token.group(3)):
+                header_segments = []
+                header_depth = 1
+            continue
+
+        if table_state == 0:
+            if name == 'table' and not closing and 'fp-flights-table-large' in _classes(token.group(3)):
+                table_state = 1
+                table_depth = 1
+            continue
+        if table_state == 3:
+            continue
+
+        if name == 'table':
+            table_depth += -1 if closing else 1
+            if table_depth == 0:
+                table_state = 3
+            continue
+        if table_state == 1:
+            if name == 'tbody' and not closing:
+                table_state = 2
+            continue
+
+        # Inside the tbody
+        if name == 'tbody' and closing and tr_depth == 0:
+            table_state = 3
+        elif name == 'tr':
+            if closing:
+                tr_depth -= 1
+                if tr_depth == 0:
+                    if row_kind == 'date':
+                        match = _DATE_RE.search(_text(row_segments, strip=False))
+                        if match:
+                            current_date = match.group(1)
+                            uses_header_date = False
+                    elif row_kind == 'item' and cells['number'] is not None and cells['time'] is not None:
+                        rows.append((
+                            _text(cells['number'], strip=True),
+                            None if uses_header_date else current_date,
+                            _final_time_str(_text(cells['time'], strip=True)),
+                        ))
+                    row_kind = None
+                    row_segments = None
+                    cell = None
+            else:
+                tr_depth += 1
+                if tr_depth == 1:
+                    classes = _classes(token.group(3))
+                    if 'fp-flight-date' in classes:
+                        row_kind = 'date'
+                        row_segments = []
+                    elif 'fp-flight-item' in classes:
+                        items += 1
+                        row_kind = 'item'
+                        cells = {'number': None, 'time': None}
+        elif name == 'td' and row_kind == 'item':
+            if closing:
+                if cell is not None:
+                    cell_depth -= 1
+                    if cell_depth == 0:
+                        cell = None
+            elif cell is not None:
+                cell_depth += 1
+            else:
+                classes = _classes(token.group(3))
+                for wanted, css in (('number', 'fp-flight-number'), ('time', 'fp-flight-time-muc')):
+                    if cells[wanted] is None and css in classes:
+                        cell = wanted
+                        cell_depth = 1
+                        cells[wanted] = []
+                        break
+
+    if table_state == 0:
+        return None, 0
+
+    header_date = None
+    if header_segments is not None:
+        match = _DATE_RE.search(_text(header_segments, strip=False))
+        if match:
+            header_date = match.group(1)
+
+    return [(flight_num, header_date if date_str is None else date_str, final_time_str)
+            for flight_num, date_str, final_time_str in rows], items
+
+def parse_muc_schedule_stream(html_content):
+    """
+    Single-pass, event-driven equivalent of `parse_muc_schedule`.
+    """
+    rows, _ = _stream_rows(html_content)
+    if rows is None:
+        return pd.DataFrame()
+
+    date_prefixes = _DatePrefixCache()
+    flight_nums = []
+    expected_times = []
+    for flight_num, date_str, final_time_str in rows:
+        iso_string = None
+        if date_str and final_time_str:
+            try:
+                iso_string = _iso_time(date_prefixes, date_str, final_time_str)
+            except ValueError:
+                continue
+
+        flight_nums.append(flight_num)
+        expected_times.append(iso_string)
+
+    if not flight_nums:
+        return pd.DataFrame()
+    return pd.DataFrame({'flight_num': flight_nums, 'expected_time': expected_times})
+
+@dataclass(frozen=True, slots=True)
+class ScheduleColumns:
+    """
+    Compact columnar form of one parsed page: flight numbers plus int64 epoch nanoseconds
+    (NaT encoded as int64 min). Cheap to pickle between processes.
+    `page_rows` counts the page's flight rows before unparseable ones are dropped, so it tells a full page
+    from a short (last) one.
+    """
+    flight_num: np.ndarray
+    expected_time: np.ndarray
+    page_rows: int = 0
+
+    def __len__(self):
+        return len(self.expected_time)
+
+def parse_muc_schedule_columns(html_content):
+    """
+    Same rows as `parse_muc_schedule_stream`, returned as `ScheduleColumns`.
+    """
+    rows, page_rows = _stream_rows(html_content)
+
+    date_midnights = _DateEpochCache()
+    flight_nums = []
+    expected_times = []
+    for flight_num, date_str, final_time_str in rows or ():
+        epoch_ns = _NAT
+        if date_str and final_time_str:
+            try:
+                epoch_ns = _epoch_ns(date_midnights, date_str, final_time_str)
+            except ValueError:
+                continue
+
+        flight_nums.append(flight_num)
+        expected_times.append(epoch_ns)
+
+    return ScheduleColumns(np.array(flight_nums, dtype=str), np.array(expected_times, dtype=np.int64), page_rows)
+
+def columns_to_schedule_df(pages):
+    """
+    Builds the schedule DataFrame (indexed by `expected_time`, sorted) from parsed pages
+    with one concat, one datetime conversion and one sort.
+    """
+    pages = [page for page in pages if len(page)]
+    if not pages:
+        # Return an empty DataFrame if no data was fetched
+        return pd.DataFrame()
+
+    flight_nums = np.concatenate([page.flight_num for page in pages])
+    expected_times = np.concatenate([page.expected_time for page in pages])
+
+    index = pd.to_datetime(expected_times.view('datetime64[ns]')).rename('expected_time')
+    return pd.DataFrame({'flight_num': flight_nums.astype(object)}, index=index).sort_index()
+
 # Usage Example (assuming 'html_content' is loaded)
 # df = parse_muc_schedule_iso(fullContent)
 # print(df.head())
\ No newline at end of file
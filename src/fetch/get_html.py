@@ -1,36 +1,76 @@
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 
-def get_muc_schedule(page, is_arrival: bool):
+# Rows per page requested from the flight search; a page with fewer rows is the last one
+PER_PAGE = 50
+
+# Headers are CRITICAL. Without 'User-Agent', the firewall will block you.
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'X-Requested-With': 'XMLHttpRequest', # Often required for AJAX endpoints
+    'Referer': 'https://www.munich-airport.com/flights/arrivals'
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session(pool_size: int = 16) -> requests.Session:
+    """
+    Returns the shared keep-alive session used for all schedule requests.
+    The connection pool is sized so every concurrent page request can reuse a socket.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HEADERS)
+            _session = session
+    return _session
+
+def muc_page_request(page, is_arrival: bool):
+    """
+    Returns (url, params) for one schedule page, without the cache-busting '_' parameter.
+    """
     base_url = f"https://www.munich-airport.com/flightsearch/{"arrivals" if is_arrival else "departures"}"
 
     # Construct the query parameters exactly as seen in your example request
     params = {
         'from': "2025-11-22T00:00:00",
         'allow_scroll_back': '1',
-        'per_page': '50',
+        'per_page': str(PER_PAGE),
         'min_date': "2025-11-22T00:00:00",
         'max_date': "2025-11-24T00:00:00",
         'page': str(page),
-        '_': str(int(time.time() * 1000))
     }
+    return base_url, params
 
-    # Headers are CRITICAL. Without 'User-Agent', the firewall will block you.
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'X-Requested-With': 'XMLHttpRequest', # Often required for AJAX endpoints
-        'Referer': 'https://www.munich-airport.com/flights/arrivals'
-    }
+def fetch_muc_page(page, is_arrival: bool, session: requests.Session | None = None, headers: dict | None = None):
+    """
+    Fetches one schedule page over the shared session.
+    Extra `headers` (e.g. conditional-request validators) are sent along.
+    Returns the response for status 200 or 304, or None if the request failed.
+    """
+    base_url, params = muc_page_request(page, is_arrival)
+    params['_'] = str(int(time.time() * 1000))
 
     try:
-        response = requests.get(base_url, params=params, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
+        response = (session or get_session()).get(base_url, params=params, headers=headers, timeout=10)
+
+        if response.status_code in (200, 304):
+            return response
         else:
             print(f"Error: Status Code {response.status_code}")
-            return ""
-            
+            return None
+
     except Exception as e:
         print(f"Request failed: {e}")
-        return ""
\ No newline at end of file
+        return None
+
+def get_muc_schedule(page, is_arrival: bool):
+    response = fetch_muc_page(page, is_arrival)
+    return response.text if response is not None and response.status_code == 200 else ""
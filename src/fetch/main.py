@@ -1,26 +1,111 @@
-from src.fetch.extract_html import parse_muc_schedule
-from src.fetch.get_html import get_muc_schedule
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-import pandas as pd
+from src.fetch.cache import PageCache
+from src.fetch.extract_html import columns_to_schedule_df
+from src.fetch.get_html import fetch_muc_page, get_session, muc_page_request, PER_PAGE
+from src.fetch.pipeline import parse_page
+
+# Pages requested up front per direction; more are requested while pages keep coming back full
+ESTIMATED_PAGE_LIMIT = 9
+# Hard stop in case the board never returns a short page
+MAX_PAGE_LIMIT = 30
+# Failed pages in a row after which a direction stops requesting more (the board is probably down)
+MAX_CONSECUTIVE_FAILURES = 3
+MAX_WORKERS = 16
+
+# Parsed pages survive between refreshes; unchanged pages are not parsed again
+page_cache = PageCache()
+
+def _fetch_page(page, is_arrival: bool):
+    key = PageCache.key(*muc_page_request(page, is_arrival))
+    response = fetch_muc_page(page, is_arrival=is_arrival, session=get_session(MAX_WORKERS),
+                              headers=page_cache.validators(key))
+    if response is None:
+        return None
+    return page_cache.fragment(key, response, parse_page)
+
+def _fetch_directions(directions, max_workers=MAX_WORKERS, prefetch_pages=ESTIMATED_PAGE_LIMIT, max_pages=MAX_PAGE_LIMIT,
+                      max_failures=MAX_CONSECUTIVE_FAILURES):
+    """
+    Fetches all pages of the given directions on one bounded pool.
+    The first `prefetch_pages` pages of every direction are requested at once, so wall-clock time
+    tracks the slowest page. Every full page requests one more; the first empty or short page (fewer
+    than PER_PAGE flight rows on the board, whether or not they parse) ends its direction and cancels
+    the requests queued behind it.
+    Failed requests are skipped; after `max_failures` of them in a row a direction requests no more
+    pages and cancels the ones queued, so an outage does not walk all `max_pages`.
+    Pages are parsed on the process pool as they arrive and combined once at the end.
+    """
+    pages = {d: {} for d in directions}
+    last_page = {d: max_pages for d in directions}
+    next_page = {d: 1 for d in directions}
+    failed = {d: 0 for d in directions}
+    failed_in_row = {d: 0 for d in directions}
+    stopped = set()
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def submit(is_arrival):
+            page = next_page[is_arrival]
+            next_page[is_arrival] += 1
+            pending[pool.submit(_fetch_page, page, is_arrival)] = (is_arrival, page)
+
+        for is_arrival in directions:
+            for _ in range(min(prefetch_pages, max_pages)):
+                submit(is_arrival)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                is_arrival, page = pending.pop(future)
+                if future.cancelled() or page > last_page[is_arrival]:
+                    continue
+
+                columns = future.result()
+                if columns is None:
+                    failed[is_arrival] += 1
+                    failed_in_row[is_arrival] += 1
+                    if failed_in_row[is_arrival] >= max_failures:
+                        # Give up on this direction: nothing more is requested
+                        stopped.add(is_arrival)
+                        last_page[is_arrival] = min(last_page[is_arrival], next_page[is_arrival] - 1)
+                        for other, (other_dir, _) in list(pending.items()):
+                            if other_dir == is_arrival and other.cancel():
+                                del pending[other]
+                        continue
+                else:
+                    failed_in_row[is_arrival] = 0
+                    if len(columns):
+                        pages[is_arrival][page] = columns
+
+                    # Rows the parser dropped still count: only a page the board filled less is the last one
+                    if columns.page_rows < PER_PAGE:
+                        # Last page reached: drop everything queued or fetched behind it
+                        last_page[is_arrival] = page
+                        for other, (other_dir, other_page) in list(pending.items()):
+                            if other_dir == is_arrival and other_page > page and other.cancel():
+                                del pending[other]
+                        for later in [p for p in pages[is_arrival] if p > page]:
+                            del pages[is_arrival][later]
+                        continue
+
+                if next_page[is_arrival] <= last_page[is_arrival]:
+                    submit(is_arrival)
+
+    for d in directions:
+        if failed[d]:
+            note = f", stopped after {max_failures} in a row" if d in stopped else ""
+            print(f"{'Arrivals' if d else 'Departures'}: {failed[d]} page(s) failed{note}")
+
+    return {d: columns_to_schedule_df([pages[d][p] for p in sorted(pages[d])]) for d in directions}
+
+def fetch_schedules():
+    """
+    Fetches arrivals and departures concurrently over the shared session.
+    Returns (arrivals_df, departures_df).
+    """
+    schedules = _fetch_directions((True, False))
+    return schedules[True], schedules[False]
 
 def fetch_schedule(is_arrival: bool):
-    estimated_page_limit = 9
-    all_schedules_dfs = []
-
-    for i in range(estimated_page_limit):
-        schedule_html = get_muc_schedule(i + 1, is_arrival=is_arrival)        
-        schedule_df = parse_muc_schedule(schedule_html)
-
-        if schedule_df is not None and not schedule_df.empty:
-            all_schedules_dfs.append(schedule_df)
-
-    if all_schedules_dfs:
-        final_schedule_df = pd.concat(all_schedules_dfs, ignore_index=True)
-        final_schedule_df['expected_time'] = pd.to_datetime(final_schedule_df['expected_time'])
-        final_schedule_df = final_schedule_df.set_index('expected_time')
-        final_schedule_df = final_schedule_df.sort_index()
-        
-        return final_schedule_df
-    else:
-        # Return an empty DataFrame if no data was fetched
-        return pd.DataFrame()
\ No newline at end of file
+    return _fetch_directions((is_arrival,))[is_arrival]
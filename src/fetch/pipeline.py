@@ -0,0 +1,42 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from src.fetch.extract_html import parse_muc_schedule_columns
+
+# Parsing holds the GIL, so pages are parsed in worker processes; 1 parses inline on the calling thread
+PARSE_PROCESSES = os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """
+    Returns the shared parse pool, starting it on first use.
+    Workers are spawned rather than forked because the bot already runs threads when the first refresh starts.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSE_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _pool
+
+def parse_page(html_content):
+    """
+    Parses one page's HTML into `ScheduleColumns` on the parse pool.
+    Blocks the calling (I/O) thread only, so pages fetched by other threads are parsed in parallel.
+    """
+    if PARSE_PROCESSES <= 1:
+        return parse_muc_schedule_columns(html_content)
+    return get_parse_pool().submit(parse_muc_schedule_columns, html_content).result()
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
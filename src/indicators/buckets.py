@@ -0,0 +1,113 @@
+import pandas as pd
+import numpy as np
+
+from src.indicators.markets import PRICE6_START, PRICE6_END, PRICE6_BUCKET
+
+def _metric_term(arrivals: int, departures: int) -> float:
+    total = arrivals + departures
+    return 300 * (arrivals - departures) / (total ** 1.5) if total > 0 else 0.0
+
+class Price6Buckets:
+    """
+    Incremental version of `price6`.
+
+    Keeps arrival/departure counts per 30-minute bucket of the settlement window in fixed arrays,
+    together with each bucket's metric term. `apply` takes a flight-level diff and only touches
+    the buckets it changes, so an update costs O(changes) instead of a full resample.
+    `rebuild` recomputes everything from DataFrames and serves as the cross-check.
+    """
+
+    def __init__(self, start: pd.Timestamp = PRICE6_START, end: pd.Timestamp = PRICE6_END, bucket: str = PRICE6_BUCKET):
+        self._start_ns = start.value
+        self._end_ns = end.value
+        self._bucket_ns = pd.Timedelta(bucket).value
+        # price6 slices the window with .loc, so a flight exactly at `end` opens one extra bucket
+        n_buckets = (self._end_ns - self._start_ns) // self._bucket_ns + 1
+
+        self.bucket_starts = pd.date_range(start, periods=n_buckets, freq=bucket)
+        self.arrivals = np.zeros(n_buckets, dtype=np.int64)
+        self.departures = np.zeros(n_buckets, dtype=np.int64)
+        self.terms = np.zeros(n_buckets, dtype=np.float64)
+        self.total = 0.0
+
+    @property
+    def value(self) -> int:
+        return round(float(self.total))
+
+    def bucket_of(self, timestamp) -> int | None:
+        """
+        Index of the bucket `timestamp` falls into, or None if it is outside the window (or NaT).
+        """
+        if timestamp is None:
+            return None
+        ns = timestamp if isinstance(timestamp, (int, np.integer)) else pd.Timestamp(timestamp).value
+        if ns == pd.NaT.value or not self._start_ns <= ns <= self._end_ns:
+            return None
+        return int((ns - self._start_ns) // self._bucket_ns)
+
+    def apply(self, changes) -> set[int]:
+        """
+        Applies a flight-level diff. `changes` yields (is_arrival, old_time, new_time) tuples:
+        old_time None for an added flight, new_time None for a removed one, both set for a re-timed one.
+        Returns the indices of the buckets that changed.
+        """
+        touched = set()
+        for is_arrival, old_time, new_time in changes:
+            counts = self.arrivals if is_arrival else self.departures
+
+            old_bucket = self.bucket_of(old_time)
+            new_bucket = self.bucket_of(new_time)
+            if old_bucket == new_bucket:
+                continue
+
+            if old_bucket is not None:
+                counts[old_bucket] -= 1
+                touched.add(old_bucket)
+            if new_bucket is not None:
+                counts[new_bucket] += 1
+                touched.add(new_bucket)
+
+        for i in touched:
+            term = _metric_term(int(self.arrivals[i]), int(self.departures[i]))
+            self.total += term - self.terms[i]
+            self.terms[i] = term
+
+        return touched
+
+    def rebuild(self, arrivals_df: pd.DataFrame, departures_df: pd.DataFrame) -> int:
+        """
+        Recomputes all buckets from full schedules (indexed by expected_time). Returns the new value.
+        """
+        self.arrivals[:] = self._counts(arrivals_df)
+        self.departures[:] = self._counts(departures_df)
+
+        total = self.arrivals + self.departures
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.terms[:] = np.where(
+                total > 0,
+                300 * (self.arrivals - self.departures) / (total ** 1.5),
+                0.0,
+            )
+        self.total = float(self.terms.sum())
+        return self.value
+
+    def _counts(self, schedule_df: pd.DataFrame) -> np.ndarray:
+        n_buckets = len(self.terms)
+        if schedule_df.empty:
+            return np.zeros(n_buckets, dtype=np.int64)
+
+        ns = schedule_df.index.values.astype('datetime64[ns]').view(np.int64)
+        ns = ns[(ns != pd.NaT.value) & (ns >= self._start_ns) & (ns <= self._end_ns)]
+        return np.bincount((ns - self._start_ns) // self._bucket_ns, minlength=n_buckets)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Per-bucket view with the same columns `price6` computes.
+        """
+        return pd.DataFrame({
+            'Arrivals': self.arrivals,
+            'Departures': self.departures,
+            'Sum': self.arrivals + self.departures,
+            'Diff': self.arrivals - self.departures,
+            'Metric': self.terms,
+        }, index=self.bucket_starts)
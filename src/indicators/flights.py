@@ -0,0 +1,134 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.indicators.buckets import Price6Buckets
+
+_NAT = pd.NaT.value
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """
+    Flights that differ between two consecutive schedules, one entry per flight.
+    Times are ns (naive Munich time); `old_time` is NaT for a new flight, `new_time` for a cancelled one.
+    """
+    at: float
+    is_arrival: np.ndarray
+    flight_num: np.ndarray
+    old_time: np.ndarray
+    new_time: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.flight_num)
+
+    @property
+    def new(self) -> np.ndarray:
+        return self.old_time == _NAT
+
+    @property
+    def cancelled(self) -> np.ndarray:
+        return self.new_time == _NAT
+
+    @property
+    def moved(self) -> np.ndarray:
+        return (self.old_time != _NAT) & (self.new_time != _NAT)
+
+    def changes(self):
+        """
+        The (is_arrival, old_time, new_time) tuples `Price6Buckets.apply` takes, None for a missing time.
+        """
+        for is_arrival, old_time, new_time in zip(self.is_arrival.tolist(), self.old_time.tolist(), self.new_time.tolist()):
+            yield is_arrival, None if old_time == _NAT else old_time, None if new_time == _NAT else new_time
+
+    def bucket_moves(self, buckets: Price6Buckets) -> list[tuple[str, int | None, int | None]]:
+        """
+        (flight_num, old bucket, new bucket) of every change that moves a flight into, out of or across price6 buckets.
+        """
+        moves = []
+        for flight_num, (_, old_time, new_time) in zip(self.flight_num.tolist(), self.changes()):
+            old_bucket, new_bucket = buckets.bucket_of(old_time), buckets.bucket_of(new_time)
+            if old_bucket != new_bucket:
+                moves.append((flight_num, old_bucket, new_bucket))
+        return moves
+
+    def summary(self) -> str:
+        return f"{int(self.new.sum())} new, {int(self.cancelled.sum())} cancelled, {int(self.moved.sum())} re-timed"
+
+def _columns(schedule_df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    if schedule_df.empty:
+        return np.empty(0, dtype=object), np.empty(0, dtype=np.int64)
+    return schedule_df['flight_num'].to_numpy(), schedule_df.index.values.astype('datetime64[ns]').view(np.int64)
+
+def _ranks(codes: np.ndarray) -> np.ndarray:
+    """
+    Occurrence number of every code among the earlier equal codes (0 for the first).
+    """
+    n = len(codes)
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    positions = np.arange(n)
+    group_start = np.empty(n, dtype=bool)
+    group_start[:1] = True
+    group_start[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = positions - np.maximum.accumulate(np.where(group_start, positions, 0))
+    return ranks
+
+class FlightStateIndex:
+    """
+    Latest expected time of every flight, keyed by direction, flight number and occurrence rank
+    (the same number shows up once per day on the board).
+
+    `update` diffs a new fetch against the previous one with one sorted-key intersection per direction
+    and returns the `ChangeSet`; the last `history` change sets are kept. The first update reports every flight as new,
+    so applying all change sets in order to an empty `Price6Buckets` keeps it equal to `price6`.
+    When an earlier occurrence of a flight number drops off the board the later ones shift rank and
+    show up as re-timed; the times in the change set are still the real ones, so bucket counts stay exact.
+    """
+
+    def __init__(self, history: int = 100):
+        self._states = {True: _columns(pd.DataFrame()), False: _columns(pd.DataFrame())}
+        self.history: deque[ChangeSet] = deque(maxlen=history)
+
+    def __len__(self) -> int:
+        return sum(len(flight_nums) for flight_nums, _ in self._states.values())
+
+    def update(self, arrivals: pd.DataFrame, departures: pd.DataFrame, at: float | None = None) -> ChangeSet:
+        """
+        Diffs the schedules fetched at wall-clock time `at` (default now) against the previous ones.
+        """
+        parts = []
+        for is_arrival, schedule_df in ((True, arrivals), (False, departures)):
+            old_nums, old_times = self._states[is_arrival]
+            new_nums, new_times = _columns(schedule_df)
+
+            # Integer key per (flight_num, rank); schedules are sorted by time, so ranks are in time order
+            codes, _ = pd.factorize(np.concatenate([old_nums, new_nums]))
+            codes = codes.astype(np.int64)
+            old_codes, new_codes = codes[:len(old_nums)], codes[len(old_nums):]
+            old_keys = (old_codes << 32) | _ranks(old_codes)
+            new_keys = (new_codes << 32) | _ranks(new_codes)
+            _, old_i, new_i = np.intersect1d(old_keys, new_keys, assume_unique=True, return_indices=True)
+
+            cancelled = np.ones(len(old_keys), dtype=bool)
+            cancelled[old_i] = False
+            added = np.ones(len(new_keys), dtype=bool)
+            added[new_i] = False
+            moved = old_times[old_i] != new_times[new_i]
+            old_i, new_i = old_i[moved], new_i[moved]
+
+            n_cancelled, n_added = int(cancelled.sum()), int(added.sum())
+            parts.append((
+                np.full(n_cancelled + n_added + len(old_i), is_arrival),
+                np.concatenate([old_nums[cancelled], new_nums[added], new_nums[new_i]]),
+                np.concatenate([old_times[cancelled], np.full(n_added, _NAT), old_times[old_i]]),
+                np.concatenate([np.full(n_cancelled, _NAT), new_times[added], new_times[new_i]]),
+            ))
+            self._states[is_arrival] = (new_nums, new_times)
+
+        changes = ChangeSet(time.time() if at is None else at, *(np.concatenate(column) for column in zip(*parts)))
+        self.history.append(changes)
+        return changes
@@ -1,19 +1,24 @@
 import pandas as pd
 import numpy as np
 
+# Settlement window of market 6 (both ends inclusive, as sliced by .loc)
+PRICE6_START = pd.Timestamp('2025-11-22 10:00:00')
+PRICE6_END = pd.Timestamp('2025-11-23 10:00:00')
+PRICE6_BUCKET = '30min'
+
 def price5(arrivals_df: pd.DataFrame, departures_df: pd.DataFrame):
     return 3 * (len(arrivals_df) + len(departures_df))
 
 def price6(arrivals_df: pd.DataFrame, departures_df: pd.DataFrame):
-    start_time = pd.Timestamp('2025-11-22 10:00:00')
-    end_time_exclusive = pd.Timestamp('2025-11-23 10:00:00')
+    start_time = PRICE6_START
+    end_time_exclusive = PRICE6_END
 
     # Filtern auf den relevanten Zeitraum
     arrivals_filtered = arrivals_df.loc[start_time:end_time_exclusive].copy()
     departures_filtered = departures_df.loc[start_time:end_time_exclusive].copy()
 
-    arrivals_count = arrivals_filtered.resample('30min').count().iloc[:, 0].rename('Arrivals')
-    departures_count = departures_filtered.resample('30min').count().iloc[:, 0].rename('Departures')
+    arrivals_count = arrivals_filtered.resample(PRICE6_BUCKET).count().iloc[:, 0].rename('Arrivals')
+    departures_count = departures_filtered.resample(PRICE6_BUCKET).count().iloc[:, 0].rename('Departures')
 
     data = pd.concat([arrivals_count, departures_count], axis=1).fillna(0)
 
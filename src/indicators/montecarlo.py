@@ -0,0 +1,187 @@
+from dataclasses import dataclass
+
+import pandas as pd
+import numpy as np
+
+from src.indicators.markets import PRICE6_BUCKET, PRICE6_END, PRICE6_START
+
+@dataclass(frozen=True)
+class DelayModel:
+    """
+    Per-flight perturbation of the expected time, in minutes.
+    A flight is cancelled with `cancel_prob`; otherwise it moves by -early_min + Exp(mean_delay_min).
+    """
+    cancel_prob: float = 0.02
+    mean_delay_min: float = 12.0
+    early_min: float = 5.0
+
+@dataclass(frozen=True)
+class SettlementDistribution:
+    mean: float
+    std: float
+    quantiles: dict[float, float]
+
+@dataclass(frozen=True)
+class SettlementScenarios:
+    price5: SettlementDistribution
+    price6: SettlementDistribution
+    n_scenarios: int
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Scenarios are simulated in blocks so the per-flight arrays stay cache-sized
+_BLOCK = 1024
+_BUCKET_MIN = pd.Timedelta(PRICE6_BUCKET) / pd.Timedelta(minutes=1)
+_WINDOW_MIN = (PRICE6_END - PRICE6_START) / pd.Timedelta(minutes=1)
+# As in Price6Buckets: price6 slices the window with .loc, so a flight exactly at PRICE6_END opens one extra bucket
+_N_BUCKETS = int(_WINDOW_MIN // _BUCKET_MIN) + 1
+# Buckets a simulated flight can land in. Its time is continuous, so it never lands exactly on PRICE6_END
+# and the extra bucket only ever holds flights already flown
+_SIM_BUCKETS = int(np.ceil(_WINDOW_MIN / _BUCKET_MIN))
+# Furthest a delay can move a flight, in buckets (P < 1e-8 with the default model)
+_MAX_SHIFT = 8
+
+def _minutes(schedule_df: pd.DataFrame) -> np.ndarray:
+    """
+    Expected times as minutes after PRICE6_START (NaT dropped).
+    """
+    if schedule_df.empty:
+        return np.empty(0, dtype=np.float64)
+    ns = schedule_df.index.values.astype('datetime64[ns]').view(np.int64)
+    ns = ns[ns != pd.NaT.value]
+    return (ns - PRICE6_START.value) / 60e9
+
+def _terms(arrivals: np.ndarray, departures: np.ndarray) -> np.ndarray:
+    total = arrivals + departures
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, 300 * (arrivals - departures) / (total * np.sqrt(total)), 0.0)
+
+def _distribution(values: np.ndarray, quantiles) -> SettlementDistribution:
+    return SettlementDistribution(
+        mean=float(values.mean()),
+        std=float(values.std()),
+        quantiles={q: float(v) for q, v in zip(quantiles, np.quantile(values, quantiles))},
+    )
+
+def simulate_settlements(arrivals_df: pd.DataFrame, departures_df: pd.DataFrame, n_scenarios: int = 10_000,
+                         model: DelayModel = DelayModel(), now: pd.Timestamp | None = None,
+                         quantiles=QUANTILES, seed: int | None = None) -> SettlementScenarios:
+    """
+    Monte-Carlo distribution of the market 5 and market 6 settlement values.
+
+    Every scenario cancels and delays each flight independently according to `model`; flights
+    expected before `now` are treated as already flown and kept as they are.
+
+    Only the bucket a flight ends up in matters, so delays are drawn as bucket shifts: with the
+    flight at fraction f of its bucket, it moves at least k buckets with probability
+    exp(-(k - f) / scale). One 16-bit uniform per flight and scenario decides both the shift and the
+    cancellation. Flights sharing a start bucket are counted as a group for the first step; the rare
+    longer shifts and the cancellations are corrected sparsely.
+    """
+    bit_generator = np.random.SFC64(seed)
+    rng = np.random.Generator(bit_generator)
+    scale = model.mean_delay_min / _BUCKET_MIN
+    further = np.exp(-1 / scale) if scale > 0 else 0.0
+    keep = 1.0 - model.cancel_prob
+    now_min = -np.inf if now is None else (now - PRICE6_START) / pd.Timedelta(minutes=1)
+
+    arrival_minutes = _minutes(arrivals_df)
+    departure_minutes = _minutes(departures_df)
+    minutes = np.concatenate([arrival_minutes, departure_minutes])
+    is_departure = np.concatenate([
+        np.zeros(len(arrival_minutes), dtype=np.int64),
+        np.ones(len(departure_minutes), dtype=np.int64),
+    ])
+
+    position = (minutes - model.early_min) / _BUCKET_MIN
+    base = np.floor(position).astype(np.int64)
+
+    flown = minutes < now_min
+    simulated = ~flown & (base >= -_MAX_SHIFT) & (base < _SIM_BUCKETS)
+    others = ~flown & ~simulated
+
+    # Already flown flights are fixed: their buckets are the same in every scenario
+    fixed_counts = np.zeros(2 * _N_BUCKETS, dtype=np.int64)
+    fixed_in_window = flown & (minutes >= 0) & (minutes <= _WINDOW_MIN)
+    fixed_bucket = (minutes[fixed_in_window] // _BUCKET_MIN).astype(np.int64)
+    np.add.at(fixed_counts, is_departure[fixed_in_window] * _N_BUCKETS + fixed_bucket, 1)
+    fixed_counts = fixed_counts.reshape(2, _N_BUCKETS)
+    # Buckets no simulated flight reaches contribute the same term to every scenario
+    fixed_term = float(_terms(*fixed_counts[:, _SIM_BUCKETS:]).sum())
+    fixed_counts = fixed_counts[:, :_SIM_BUCKETS]
+
+    # Every (scenario, direction) gets `width` slots: bucket b is slot b + _MAX_SHIFT.
+    # Flights are sorted by slot so flights sharing a slot can be counted as one group.
+    width = _SIM_BUCKETS + 2 * _MAX_SHIFT
+    sim_slot = is_departure[simulated] * width + _MAX_SHIFT + base[simulated]
+    order = np.argsort(sim_slot, kind='stable')
+    sim_slot = sim_slot[order]
+    group_slots, group_starts, group_sizes = np.unique(sim_slot, return_index=True, return_counts=True)
+    n_sim = len(sim_slot)
+
+    # A 16-bit uniform u decides everything: u >= cancel_threshold cancels the flight, otherwise
+    # it moves at least k buckets while u < first_step * further ** (k - 1)
+    cancel_threshold = int(np.ceil(keep * 65536))
+    if scale > 0:
+        first_step = keep * 65536 * np.exp(-(1 - (position - base)[simulated][order]) / scale)
+    else:
+        first_step = np.zeros(n_sim)
+    first_thresholds = np.ceil(first_step).astype(np.uint16)
+    second_thresholds = np.ceil(first_step * further).astype(np.uint16)
+    # Clamped for the one case it does not fit (no cancellations and a zero threshold), which the split below undoes
+    rare_thresholds = np.minimum(cancel_threshold - second_thresholds.astype(np.int64), 65535).astype(np.uint16)[:, None]
+    first_thresholds = first_thresholds[:, None]
+
+    price5 = np.empty(n_scenarios, dtype=np.float64)
+    price6 = np.empty(n_scenarios, dtype=np.float64)
+    n_flown = int(flown.sum())
+    n_others = int(others.sum())
+    # Per-group counts of moved flights fit a byte unless more than 255 flights share a slot
+    group_dtype = np.uint8 if group_sizes.max(initial=0) <= 255 else np.int16
+
+    for block_start in range(0, n_scenarios, _BLOCK):
+        n = min(_BLOCK, n_scenarios - block_start)
+        size = n_sim * n
+        # Flight-major: one row of scenarios per flight and one per slot, so the group sums and
+        # the group updates below work on whole contiguous rows
+        counts = np.zeros((2 * width, n), dtype=np.int64)
+        row_slot = lambda p: sim_slot[p // n] * n + p % n
+
+        uniforms = bit_generator.random_raw((size + 3) // 4).view(np.uint16)[:size].reshape(n_sim, n)
+        flat_uniforms = uniforms.ravel()
+        if n_sim:
+            moved = (uniforms < first_thresholds).view(np.uint8)
+            moved_per_group = np.add.reduceat(moved, group_starts, axis=0, dtype=group_dtype)
+            counts[group_slots] = group_sizes[:, None] - moved_per_group
+            counts[group_slots + 1] += moved_per_group
+
+        # The rare flights that move further or are cancelled are corrected one by one,
+        # at flat (flight, scenario) positions. Cancelled flights never pass a threshold,
+        # so they were counted in their start slot.
+        # Both are found in one pass: u - second_threshold wraps around below zero (uint16), so it lands
+        # at or above cancel_threshold - second_threshold exactly when u moves further or is cancelled
+        rare = np.flatnonzero((uniforms - second_thresholds[:, None]) >= rare_thresholds)
+        rare_uniforms = flat_uniforms[rare]
+        cancelled = rare[rare_uniforms >= cancel_threshold]
+        further_moved = rare[rare_uniforms < second_thresholds[rare // n]]
+        with np.errstate(divide='ignore'):
+            crossings = np.log(flat_uniforms[further_moved] / first_step[further_moved // n]) / np.log(further)
+        extra = np.minimum(np.ceil(crossings) - 1, _MAX_SHIFT - 1).astype(np.int64)
+        further_slot = row_slot(further_moved) + n
+
+        corrections = np.concatenate([further_slot, further_slot + extra * n, row_slot(cancelled)])
+        weights = np.concatenate([-np.ones(len(further_moved)), np.ones(len(further_moved)), -np.ones(len(cancelled))])
+        counts += np.bincount(corrections, weights, minlength=counts.size).astype(np.int64).reshape(counts.shape)
+
+        counts = counts.reshape(2, width, n)[:, _MAX_SHIFT:_MAX_SHIFT + _SIM_BUCKETS] + fixed_counts[:, :, None]
+
+        price6[block_start:block_start + n] = np.rint(_terms(counts[0], counts[1]).sum(axis=0) + fixed_term)
+
+        survivors = (n_sim - np.bincount(cancelled % n, minlength=n)
+                     + rng.binomial(n_others, keep, size=n) + n_flown)
+        price5[block_start:block_start + n] = 3 * survivors
+
+    return SettlementScenarios(
+        price5=_distribution(price5, quantiles),
+        price6=_distribution(price6, quantiles),
+        n_scenarios=n_scenarios,
+    )
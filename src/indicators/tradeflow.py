@@ -0,0 +1,208 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+# Rolling windows kept by default, in seconds
+WINDOWS_S = (10.0, 60.0, 300.0)
+
+class _Window:
+    """
+    Running sums over the trades of the last `length_s` seconds; `tail` is the sequence number of the oldest one.
+    """
+
+    __slots__ = ("length_s", "tail", "count", "volume", "notional", "signed_volume", "moves", "move_sum", "move_sq_sum")
+
+    def __init__(self, length_s: float):
+        self.length_s = length_s
+        self.tail = 0
+        self.count = 0
+        self.volume = 0.0
+        self.notional = 0.0
+        self.signed_volume = 0.0
+        self.moves = 0
+        self.move_sum = 0.0
+        self.move_sq_sum = 0.0
+
+    def clear(self):
+        # Resetting when the window empties also drops the rounding error the subtractions left behind
+        self.count = 0
+        self.volume = self.notional = self.signed_volume = 0.0
+        self.moves = 0
+        self.move_sum = self.move_sq_sum = 0.0
+
+class TradeFlow:
+    """
+    Rolling trade-flow indicators of one product over fixed time windows.
+
+    Trades go into preallocated NumPy ring buffers of `capacity` trades, and every window keeps running
+    sums that are updated when a trade enters and when it ages out. Adding a trade and reading an indicator
+    are amortized O(1) and allocate no arrays. A window never holds more than the last `capacity` trades.
+
+    - `vwap`: volume-weighted average price.
+    - `imbalance`: tick-rule signed volume over total volume, from -1 (all selling) to 1 (all buying);
+      a trade above the previous price counts as a buy, below as a sell, at the same price like the one before.
+    - `volatility`: standard deviation of the price change from one trade to the next, in price units
+      (market 6 settles around zero, so relative returns would not be meaningful).
+    - `last_trade_age`: seconds since the last trade.
+
+    Times are `time.monotonic()` seconds unless given explicitly (e.g. recorded times in a replay).
+    """
+
+    def __init__(self, windows_s=WINDOWS_S, capacity: int = 4096):
+        self.capacity = capacity
+        self._at = np.zeros(capacity, dtype=np.float64)
+        self._price = np.zeros(capacity, dtype=np.float64)
+        self._volume = np.zeros(capacity, dtype=np.float64)
+        self._sign = np.zeros(capacity, dtype=np.int8)
+        self._move = np.zeros(capacity, dtype=np.float64)
+        self._has_move = np.zeros(capacity, dtype=np.bool_)
+        self._windows = {float(length_s): _Window(float(length_s)) for length_s in windows_s}
+        self._lock = threading.Lock()
+        self.trades = 0
+        self.last_price: float | None = None
+        self.last_at: float | None = None
+        self._last_sign = 0
+
+    def add(self, price: float, volume: float, at: float | None = None) -> None:
+        at = time.monotonic() if at is None else at
+        with self._lock:
+            seq = self.trades
+            if seq >= self.capacity:
+                # The slot about to be reused still holds the oldest trade: windows that reach back to it lose it
+                overwritten = seq - self.capacity
+                for window in self._windows.values():
+                    if window.tail <= overwritten:
+                        self._evict_through(window, overwritten)
+
+            last_price = self.last_price
+            if last_price is None:
+                sign, move, has_move = 0, 0.0, False
+            else:
+                move = price - last_price
+                sign = 1 if move > 0 else -1 if move < 0 else self._last_sign
+                has_move = True
+
+            i = seq % self.capacity
+            self._at[i] = at
+            self._price[i] = price
+            self._volume[i] = volume
+            self._sign[i] = sign
+            self._move[i] = move
+            self._has_move[i] = has_move
+
+            for window in self._windows.values():
+                window.count += 1
+                window.volume += volume
+                window.notional += price * volume
+                window.signed_volume += sign * volume
+                if has_move:
+                    window.moves += 1
+                    window.move_sum += move
+                    window.move_sq_sum += move * move
+                self._expire(window, at)
+
+            self.trades = seq + 1
+            self.last_price = price
+            self.last_at = at
+            self._last_sign = sign
+
+    def _evict_through(self, window: _Window, seq: int) -> None:
+        while window.tail <= seq and window.count:
+            i = window.tail % self.capacity
+            volume = float(self._volume[i])
+            window.count -= 1
+            window.volume -= volume
+            window.notional -= float(self._price[i]) * volume
+            window.signed_volume -= int(self._sign[i]) * volume
+            if self._has_move[i]:
+                move = float(self._move[i])
+                window.moves -= 1
+                window.move_sum -= move
+                window.move_sq_sum -= move * move
+            window.tail += 1
+        if not window.count:
+            window.clear()
+            window.tail = seq + 1
+
+    def _expire(self, window: _Window, now: float) -> None:
+        cutoff = now - window.length_s
+        while window.count and self._at[window.tail % self.capacity] <= cutoff:
+            self._evict_through(window, window.tail)
+
+    def _window(self, window_s: float, now: float | None) -> _Window:
+        window = self._windows[float(window_s)]
+        self._expire(window, time.monotonic() if now is None else now)
+        return window
+
+    def count(self, window_s: float, now: float | None = None) -> int:
+        with self._lock:
+            return self._window(window_s, now).count
+
+    def volume(self, window_s: float, now: float | None = None) -> float:
+        with self._lock:
+            return self._window(window_s, now).volume
+
+    def vwap(self, window_s: float, now: float | None = None) -> float | None:
+        with self._lock:
+            window = self._window(window_s, now)
+            return window.notional / window.volume if window.volume > 0 else None
+
+    def imbalance(self, window_s: float, now: float | None = None) -> float:
+        with self._lock:
+            window = self._window(window_s, now)
+            return window.signed_volume / window.volume if window.volume > 0 else 0.0
+
+    def volatility(self, window_s: float, now: float | None = None) -> float | None:
+        with self._lock:
+            window = self._window(window_s, now)
+            if window.moves < 2:
+                return None
+            mean = window.move_sum / window.moves
+            return math.sqrt(max(window.move_sq_sum / window.moves - mean * mean, 0.0))
+
+    def last_trade_age(self, now: float | None = None) -> float | None:
+        last_at = self.last_at
+        if last_at is None:
+            return None
+        return (time.monotonic() if now is None else now) - last_at
+
+    def snapshot(self, window_s: float, now: float | None = None) -> dict[str, float | None]:
+        now = time.monotonic() if now is None else now
+        return {
+            "trades": self.count(window_s, now),
+            "volume": self.volume(window_s, now),
+            "vwap": self.vwap(window_s, now),
+            "imbalance": self.imbalance(window_s, now),
+            "volatility": self.volatility(window_s, now),
+            "last_trade_age": self.last_trade_age(now),
+        }
+
+class TradeFlowIndicators:
+    """
+    One `TradeFlow` per product, fed with the `trade` events of the market stream.
+    """
+
+    def __init__(self, windows_s=WINDOWS_S, capacity: int = 4096):
+        self.windows_s = tuple(windows_s)
+        self.capacity = capacity
+        self._flows: dict[str, TradeFlow] = {}
+
+    def __getitem__(self, product: str) -> TradeFlow:
+        flow = self._flows.get(product)
+        if flow is None:
+            flow = self._flows.setdefault(product, TradeFlow(self.windows_s, self.capacity))
+        return flow
+
+    def __contains__(self, product: str) -> bool:
+        return product in self._flows
+
+    def on_trades(self, trades: list[dict] | dict, at: float | None = None) -> None:
+        at = time.monotonic() if at is None else at
+        for trade in trades if isinstance(trades, list) else [trades]:
+            self[trade["product"]].add(trade["price"], trade["volume"], at)
+
+    def snapshot(self, window_s: float) -> dict[str, dict[str, float | None]]:
+        now = time.monotonic()
+        return {product: flow.snapshot(window_s, now) for product, flow in self._flows.items()}
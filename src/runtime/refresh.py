@@ -0,0 +1,92 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+import pandas as pd
+
+from src.indicators.flights import ChangeSet
+from src.indicators.markets import PRICE6_END, PRICE6_START
+
+def munich_now() -> pd.Timestamp:
+    # Schedule times are naive Munich local time
+    return pd.Timestamp.now(tz='Europe/Berlin').tz_localize(None)
+
+@dataclass(frozen=True)
+class RefreshDecision:
+    interval_s: float
+    reason: str
+
+class AdaptiveRefresh:
+    """
+    Picks the interval to the next fair-value refresh.
+
+    `observe` is given the `ChangeSet` of every fresh schedule and tracks how many flights are added,
+    cancelled or re-timed per second, smoothed over refreshes. The interval aims at about
+    `changes_per_refresh` changed flights per refresh. Within `boundary_s` of the start or end of
+    the price6 window, where a few minutes decide which bucket a flight settles in, the interval is capped
+    at a value that shrinks linearly from `base_interval_s` to `min_interval_s` at the boundary.
+    Once the window has closed it is `max_interval_s`.
+    """
+
+    def __init__(self, min_interval_s: float = 30, max_interval_s: float = 900, base_interval_s: float = 180,
+                 changes_per_refresh: float = 5, boundary_s: float = 3600, smoothing: float = 0.5,
+                 window_start: pd.Timestamp = PRICE6_START, window_end: pd.Timestamp = PRICE6_END,
+                 now: Callable[[], pd.Timestamp] = munich_now):
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.base_interval_s = base_interval_s
+        self.changes_per_refresh = changes_per_refresh
+        self.boundary_s = boundary_s
+        self.smoothing = smoothing
+        self.window_start = window_start
+        self.window_end = window_end
+        self._now = now
+        self._lock = threading.Lock()
+        self._observed_at: float | None = None
+        self.last_changes = 0
+        # Changed flights per second; None until two schedules have been seen
+        self.change_rate: float | None = None
+        self.last: RefreshDecision | None = None
+
+    def observe(self, changes: ChangeSet) -> None:
+        """
+        Records the changes of a fresh schedule. The first change set (every flight new) only sets the clock.
+        """
+        with self._lock:
+            if self._observed_at is not None:
+                rate = len(changes) / max(changes.at - self._observed_at, 1e-3)
+                self.change_rate = rate if self.change_rate is None else (
+                    self.smoothing * rate + (1 - self.smoothing) * self.change_rate)
+                self.last_changes = len(changes)
+            self._observed_at = changes.at
+
+    def next_interval(self) -> RefreshDecision:
+        now = self._now()
+        with self._lock:
+            change_rate = self.change_rate
+            last_changes = self.last_changes
+
+        if now > self.window_end:
+            decision = RefreshDecision(self.max_interval_s, "price6 window closed")
+        else:
+            if change_rate is None:
+                interval = self.base_interval_s
+                reason = "no change rate yet"
+            else:
+                interval = self.changes_per_refresh / change_rate if change_rate > 0 else self.max_interval_s
+                reason = f"{last_changes} flights changed, {change_rate * 60:.1f}/min"
+
+            boundary, to_boundary = min(
+                (("start", (self.window_start - now).total_seconds()), ("end", (self.window_end - now).total_seconds())),
+                key=lambda item: abs(item[1]),
+            )
+            if abs(to_boundary) < self.boundary_s:
+                cap = self.min_interval_s + (self.base_interval_s - self.min_interval_s) * abs(to_boundary) / self.boundary_s
+                if cap < interval:
+                    interval = cap
+                    reason += f", {to_boundary / 60:.0f} min to price6 window {boundary}"
+
+            decision = RefreshDecision(min(max(interval, self.min_interval_s), self.max_interval_s), reason)
+
+        self.last = decision
+        return decision
@@ -0,0 +1,139 @@
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+import schedule
+
+from src.runtime.refresh import AdaptiveRefresh
+
+logger = logging.getLogger("TradingBot")
+
+@dataclass(frozen=True)
+class FairValues:
+    """
+    Immutable snapshot of one fair-value refresh. Readers grab the current one
+    with a single attribute read and never see a half-updated state.
+    """
+    m5: float
+    m6: float
+    m5_std: float = 0.0
+    m6_std: float = 0.0
+    timestamp: float = field(default_factory=time.time)
+
+class Runtime:
+    """
+    Event-driven main loop.
+
+    The loop sleeps until the next scheduled job is due or `stop()` is called, instead of polling.
+    The fair-value refresh runs on a background worker and publishes a new `FairValues` snapshot,
+    which is swapped in atomically; a refresh that is still running is never started twice.
+
+    Refreshes run every `refresh_interval_s`, or, with a `policy`, at the interval the policy picks
+    after each refresh (counted from its end). SIGUSR1 triggers a refresh on demand, as does `refresh_now`.
+    Without `refresh` (a bot reading a shared fair-value feed) it only runs the scheduled jobs.
+    """
+
+    def __init__(self, refresh: Callable[[], FairValues | None] | None, refresh_interval_s: float = 180,
+                 scheduler: schedule.Scheduler | None = None, policy: AdaptiveRefresh | None = None):
+        self._refresh = refresh
+        self._refresh_interval_s = refresh_interval_s
+        self._scheduler = scheduler or schedule.Scheduler()
+        self._policy = policy
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fair-value-refresh")
+        self._running_refresh: Future | None = None
+        self._refresh_job: schedule.Job | None = None
+        # Handed from the refresh worker (or a signal handler) to the loop, which owns the scheduler
+        self._next_interval_s: float | None = None
+        self._refresh_requested = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self.snapshot: FairValues | None = None
+
+    @property
+    def scheduler(self) -> schedule.Scheduler:
+        return self._scheduler
+
+    def publish(self, snapshot: FairValues | None):
+        if snapshot is not None:
+            self.snapshot = snapshot
+
+    def refresh_now(self) -> Future | None:
+        """
+        Starts a refresh on the worker, or returns the one already running.
+        """
+        if self._refresh is None:
+            return None
+        with self._lock:
+            if self._running_refresh is None or self._running_refresh.done():
+                self._running_refresh = self._worker.submit(self._run_refresh)
+            return self._running_refresh
+
+    def _run_refresh(self):
+        try:
+            snapshot = self._refresh()
+        except Exception as e:
+            logger.error(f"Fair-value refresh failed: {e}")
+            snapshot = None
+        self.publish(snapshot)
+
+        if self._policy is not None:
+            decision = self._policy.next_interval()
+            logger.info(f"Next fair-value refresh in {decision.interval_s:.0f}s ({decision.reason})")
+            with self._lock:
+                self._next_interval_s = decision.interval_s
+            self._wake.set()
+        return snapshot
+
+    def _request_refresh(self):
+        self._refresh_requested = True
+        self._wake.set()
+
+    def _schedule_refresh(self, interval_s: float):
+        if self._refresh_job is not None:
+            self._scheduler.cancel_job(self._refresh_job)
+        self._refresh_job = self._scheduler.every(interval_s).seconds.do(self.refresh_now)
+
+    def run(self):
+        """
+        Blocks until `stop()` is called, SIGTERM arrives or the process is interrupted.
+        """
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+            if hasattr(signal, "SIGUSR1"):
+                signal.signal(signal.SIGUSR1, lambda signum, frame: self._request_refresh())
+
+        if self._refresh is not None:
+            self._schedule_refresh(self._refresh_interval_s)
+        try:
+            while not self._stop.is_set():
+                with self._lock:
+                    interval_s, self._next_interval_s = self._next_interval_s, None
+                if interval_s is not None:
+                    self._schedule_refresh(interval_s)
+                if self._refresh_requested:
+                    self._refresh_requested = False
+                    logger.info("Fair-value refresh requested")
+                    self.refresh_now()
+
+                self._scheduler.run_pending()
+                idle = self._scheduler.idle_seconds
+                self._wake.wait(timeout=None if idle is None else max(idle, 0))
+                self._wake.clear()
+        except KeyboardInterrupt:
+            self._stop.set()
+        finally:
+            self._scheduler.clear()
+            self._refresh_job = None
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def shutdown(self):
+        self.stop()
+        self._worker.shutdown(wait=False, cancel_futures=True)
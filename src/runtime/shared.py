@@ -0,0 +1,215 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from src.indicators.buckets import Price6Buckets
+from src.runtime.runtime import FairValues
+
+_MAGIC = b'FAIRVAL2'
+# magic, seqlock counter, producer generation, m5, m6, m5_std, m6_std, timestamp, bucket count,
+# first bucket start (ns), bucket length (ns)
+_HEADER = struct.Struct('<8sQQ5dI4xqq')
+_SEQ = struct.Struct('<Q')
+_SEQ_OFFSET = 8
+# Counter and generation, read together
+_STATE = struct.Struct('<QQ')
+_VALUES = struct.Struct('<5d')
+_VALUES_OFFSET = 24
+_N_BUCKETS_FIELD = 8
+# A publish takes microseconds; a counter still odd after this long belongs to a writer that died mid-publish
+MAX_WAIT_S = 200e-6
+# Bound on re-reads of a payload that keeps changing underneath the reader
+MAX_RETRIES = 100
+
+def default_path() -> str:
+    # /dev/shm keeps the segment in memory on Linux; elsewhere the page cache does the same for a small file
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'imcity_fair_values')
+
+SHARED_FAIR_VALUES_PATH = default_path()
+
+def _size(n_buckets: int) -> int:
+    return _HEADER.size + n_buckets * 3 * 8
+
+class FairValuePublisher:
+    """
+    Single writer of the shared fair-value segment: a small memory-mapped file holding the latest `FairValues`
+    and the price6 bucket counts and terms, guarded by a seqlock.
+
+    A publish makes the counter odd, writes the payload and makes it even again, so readers in other
+    processes never block the writer and detect (and retry) a read that overlapped a write.
+    Every publisher writes a new `generation` (its start time) into the header, so readers drop what they
+    cached from an earlier producer even where the restarted counter comes back to the same value.
+    """
+
+    def __init__(self, path: str = SHARED_FAIR_VALUES_PATH, n_buckets: int | None = None):
+        self.path = path
+        self.n_buckets = len(Price6Buckets().terms) if n_buckets is None else n_buckets
+        self._lock = threading.Lock()
+
+        size = _size(self.n_buckets)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.generation = time.time_ns()
+        # Odd while the header is rewritten, so a reader halfway through a read of the old producer's values
+        # retries; then counter 0: nothing published yet
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, 1)
+        _HEADER.pack_into(self._map, 0, _MAGIC, 1, self.generation, 0.0, 0.0, 0.0, 0.0, 0.0, self.n_buckets, 0, 0)
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, 0)
+        offset = _HEADER.size
+        self._arrivals = np.frombuffer(self._map, dtype='<i8', count=self.n_buckets, offset=offset)
+        self._departures = np.frombuffer(self._map, dtype='<i8', count=self.n_buckets, offset=offset + 8 * self.n_buckets)
+        self._terms = np.frombuffer(self._map, dtype='<f8', count=self.n_buckets, offset=offset + 16 * self.n_buckets)
+        self._seq = 0
+
+    def publish(self, fair_values: FairValues, buckets: Price6Buckets | None = None) -> int:
+        """
+        Writes a new snapshot. Returns its version (the even seqlock counter).
+        """
+        with self._lock:
+            self._seq += 1
+            _SEQ.pack_into(self._map, _SEQ_OFFSET, self._seq)
+            _VALUES.pack_into(self._map, _VALUES_OFFSET, fair_values.m5, fair_values.m6,
+                              fair_values.m5_std, fair_values.m6_std, fair_values.timestamp)
+            if buckets is not None:
+                self._arrivals[:] = buckets.arrivals
+                self._departures[:] = buckets.departures
+                self._terms[:] = buckets.terms
+                struct.pack_into('<qq', self._map, _HEADER.size - 16,
+                                 buckets.bucket_starts[0].value, buckets.bucket_starts.freq.nanos)
+            self._seq += 1
+            _SEQ.pack_into(self._map, _SEQ_OFFSET, self._seq)
+            return self._seq
+
+    def close(self, unlink: bool = False) -> None:
+        # The arrays are views into the map and must go first
+        self._arrivals = self._departures = self._terms = None
+        self._map.close()
+        if unlink:
+            os.unlink(self.path)
+
+class FairValueReader:
+    """
+    Lock-free reader of a `FairValuePublisher` segment, for any number of processes.
+
+    `snapshot` returns the latest `FairValues` (None until the first publish, or while the producer
+    has not created the segment yet) in about a microsecond: when the version is unchanged it returns
+    the object it built last time. It has the same name as `Runtime.snapshot`, so a bot can read from either.
+
+    A reader never waits on the producer for long: if the counter stays odd for `MAX_WAIT_S` (the
+    producer was killed mid-publish), `snapshot` returns the last values it read, and later reads of the
+    same stuck counter return them at once, so the bot's age check can pause quoting.
+    """
+
+    def __init__(self, path: str = SHARED_FAIR_VALUES_PATH, retry_s: float = 1.0):
+        self.path = path
+        self.retry_s = retry_s
+        self._map: mmap.mmap | None = None
+        self._attempted_at = 0.0
+        self._state: tuple[int, int] = (0, 0)
+        self._stuck: tuple[int, int] | None = None
+        self._cached: FairValues | None = None
+        self.retries = 0
+        self.stalls = 0
+
+    def _attach(self) -> bool:
+        now = time.monotonic()
+        if now - self._attempted_at < self.retry_s:
+            return False
+        self._attempted_at = now
+        try:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return False
+        if self._map[:len(_MAGIC)] != _MAGIC:
+            self._map.close()
+            self._map = None
+            return False
+        return True
+
+    @property
+    def version(self) -> int:
+        return self._state[0]
+
+    def _stable_state(self) -> tuple[int, int] | None:
+        """
+        (counter, generation) once the counter is even, or None if the writer looks stuck mid-publish.
+        """
+        deadline = None
+        while True:
+            state = _STATE.unpack_from(self._map, _SEQ_OFFSET)
+            if not state[0] & 1:
+                self._stuck = None
+                return state
+            if state == self._stuck:
+                # Already waited for this publish on an earlier read
+                return None
+            now = time.perf_counter()
+            if deadline is None:
+                deadline = now + MAX_WAIT_S
+            elif now > deadline:
+                break
+            self.retries += 1
+            # The writer is mid-publish; let it finish rather than spin through its time slice
+            time.sleep(0)
+        self._stuck = state
+        self.stalls += 1
+        return None
+
+    @property
+    def snapshot(self) -> FairValues | None:
+        if self._map is None and not self._attach():
+            return None
+        state = self._stable_state()
+        if state is None or state == self._state:
+            return self._cached
+        for _ in range(MAX_RETRIES):
+            values = _VALUES.unpack_from(self._map, _VALUES_OFFSET)
+            after = _STATE.unpack_from(self._map, _SEQ_OFFSET)
+            if after == state:
+                break
+            self.retries += 1
+            state = self._stable_state()
+            if state is None:
+                return self._cached
+        else:
+            return self._cached
+        # Counter 0 is a (re)started producer that has not published yet
+        self._state = state
+        self._cached = FairValues(*values) if state[0] else None
+        return self._cached
+
+    def buckets(self) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        """
+        Copies of the price6 bucket arrivals, departures and metric terms of the latest publish.
+        """
+        if self._map is None and not self._attach():
+            return None
+        n_buckets = _HEADER.unpack_from(self._map, 0)[_N_BUCKETS_FIELD]
+        offset = _HEADER.size
+        for _ in range(MAX_RETRIES):
+            state = self._stable_state()
+            if state is None:
+                return None
+            arrivals = np.frombuffer(self._map, dtype='<i8', count=n_buckets, offset=offset).copy()
+            departures = np.frombuffer(self._map, dtype='<i8', count=n_buckets, offset=offset + 8 * n_buckets).copy()
+            terms = np.frombuffer(self._map, dtype='<f8', count=n_buckets, offset=offset + 16 * n_buckets).copy()
+            if _STATE.unpack_from(self._map, _SEQ_OFFSET) == state:
+                return arrivals, departures, terms
+            self.retries += 1
+        return None
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
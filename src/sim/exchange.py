@@ -0,0 +1,510 @@
+import bisect
+import json
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from imcity_template import Product
+
+DEFAULT_PRODUCTS = (
+    Product(symbol='5_Flights', tickSize=1.0, startingPrice=3000, contractSize=1),
+    Product(symbol='6_Airport', tickSize=1.0, startingPrice=100, contractSize=1),
+)
+MARKET_USER = 'market'
+# A stream with no events for this long gets a comment line, so clients can tell it is alive
+KEEPALIVE_S = 15.0
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+@dataclass
+class SimOrder:
+    id: str
+    user: str
+    product: str
+    side: str
+    price: float
+    volume: int
+    filled: int = 0
+    timestamp: str = field(default_factory=now_iso)
+
+    @property
+    def remaining(self) -> int:
+        return self.volume - self.filled
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": "FILLED" if self.remaining <= 0 else "PART_FILLED" if self.filled else "ACTIVE",
+            "product": self.product,
+            "side": self.side,
+            "price": self.price,
+            "volume": self.volume,
+            "filled": self.filled,
+            "user": self.user,
+            "timestamp": self.timestamp,
+            "targetUser": None,
+            "message": None,
+        }
+
+class _BookSide:
+    """
+    Resting orders of one side at each price, queued in time priority, plus the sorted price list.
+    """
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        self.levels: dict[float, list[SimOrder]] = {}
+        self._keys: list[float] = []
+
+    def _key(self, price: float) -> float:
+        return -price if self.descending else price
+
+    def best(self) -> float | None:
+        return self._key(self._keys[0]) if self._keys else None
+
+    def add(self, order: SimOrder):
+        level = self.levels.get(order.price)
+        if level is None:
+            level = self.levels[order.price] = []
+            bisect.insort(self._keys, self._key(order.price))
+        level.append(order)
+
+    def remove(self, order: SimOrder):
+        level = self.levels[order.price]
+        level.remove(order)
+        if not level:
+            del self.levels[order.price]
+            del self._keys[bisect.bisect_left(self._keys, self._key(order.price))]
+
+    def prices(self) -> list[float]:
+        return [self._key(key) for key in self._keys]
+
+class MatchingEngine:
+    """
+    Price-time priority matching for a few products, with per-user orders and positions.
+
+    Every change to a book is published to the subscribers (one per SSE stream) as the exchange's
+    `order` event rendered for that subscriber's user, and every match as a `trade` event.
+    All state is guarded by one lock; the engine is small enough that this is not the bottleneck.
+    """
+
+    def __init__(self, products=DEFAULT_PRODUCTS):
+        self.products = {product.symbol: product for product in products}
+        self._books = {symbol: (_BookSide(True), _BookSide(False)) for symbol in self.products}
+        self._orders: dict[str, SimOrder] = {}
+        self._positions: dict[str, dict[str, int]] = {}
+        self._subscribers: list[tuple[str, queue.SimpleQueue]] = []
+        self._next_id = 0
+        self._lock = threading.RLock()
+        self.events_published = 0
+        self.trades = 0
+
+    def submit(self, user: str, product: str, side: str, price: float, volume: int) -> dict:
+        """
+        Matches a limit order against the opposite side and rests what is left. Returns the order as the REST API does.
+        """
+        if product not in self.products or side not in ("BUY", "SELL") or volume <= 0:
+            raise ValueError(f"Invalid order: {product} {side} {volume}@{price}")
+
+        with self._lock:
+            self._next_id += 1
+            order = SimOrder(str(self._next_id), user, product, side, float(price), int(volume))
+            bids, asks = self._books[product]
+            own, opposite = (bids, asks) if side == "BUY" else (asks, bids)
+
+            trades = []
+            while order.remaining > 0:
+                best = opposite.best()
+                if best is None or (best > order.price if side == "BUY" else best < order.price):
+                    break
+                resting = opposite.levels[best][0]
+                traded = min(order.remaining, resting.remaining)
+                order.filled += traded
+                resting.filled += traded
+                if resting.remaining <= 0:
+                    opposite.remove(resting)
+                    del self._orders[resting.id]
+                buyer, seller = (user, resting.user) if side == "BUY" else (resting.user, user)
+                self._add_position(buyer, product, traded)
+                self._add_position(seller, product, -traded)
+                trades.append({
+                    "timestamp": now_iso(), "product": product, "buyer": buyer,
+                    "seller": seller, "volume": traded, "price": best,
+                })
+
+            if order.remaining > 0:
+                own.add(order)
+                self._orders[order.id] = order
+
+            self.trades += len(trades)
+            self._publish(product, trades)
+            return order.to_dict()
+
+    def cancel(self, user: str, order_id: str) -> dict | None:
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None or order.user != user:
+                return None
+            self._remove(order)
+            self._publish(order.product)
+            return order.to_dict()
+
+    def cancel_at(self, user: str, product: str, price: float) -> list[dict]:
+        with self._lock:
+            cancelled = [o for o in self._orders.values() if o.user == user and o.product == product and o.price == price]
+            for order in cancelled:
+                self._remove(order)
+            if cancelled:
+                self._publish(product)
+            return [order.to_dict() for order in cancelled]
+
+    def _remove(self, order: SimOrder):
+        bids, asks = self._books[order.product]
+        (bids if order.side == "BUY" else asks).remove(order)
+        del self._orders[order.id]
+
+    def _add_position(self, user: str, product: str, volume: int):
+        positions = self._positions.setdefault(user, {})
+        positions[product] = positions.get(product, 0) + volume
+
+    def orders_of(self, user: str, product: str | None = None) -> list[SimOrder]:
+        with self._lock:
+            return [o for o in self._orders.values() if o.user == user and (product is None or o.product == product)]
+
+    def positions_of(self, user: str) -> list[dict]:
+        with self._lock:
+            positions = self._positions.get(user, {})
+            return [
+                {"product": symbol, "volume": positions.get(symbol, 0), "netPosition": positions.get(symbol, 0)}
+                for symbol in self.products
+            ]
+
+    def best_prices(self, product: str) -> tuple[float | None, float | None]:
+        with self._lock:
+            bids, asks = self._books[product]
+            return bids.best(), asks.best()
+
+    def depth(self, product: str) -> tuple[int, int]:
+        with self._lock:
+            bids, asks = self._books[product]
+            return len(bids.levels), len(asks.levels)
+
+    def book_event(self, product: str, user: str) -> dict:
+        """
+        The `order` event payload for `product` as `user` sees it (own volume split out per level).
+        """
+        with self._lock:
+            bids, asks = self._books[product]
+            return {
+                "productsymbol": product,
+                "tickSize": self.products[product].tickSize,
+                "buyOrders": self._levels(bids, user),
+                "sellOrders": self._levels(asks, user),
+            }
+
+    @staticmethod
+    def _levels(side: _BookSide, user: str) -> dict:
+        levels = {}
+        for price in side.prices():
+            orders = side.levels[price]
+            levels[str(price)] = {
+                "marketVolume": sum(o.remaining for o in orders),
+                "userVolume": sum(o.remaining for o in orders if o.user == user),
+            }
+        return levels
+
+    def subscribe(self, user: str) -> queue.SimpleQueue:
+        """
+        Registers a stream for `user`; it starts with the current book of every product.
+        """
+        events = queue.SimpleQueue()
+        with self._lock:
+            for symbol in self.products:
+                events.put(("order", json.dumps(self.book_event(symbol, user))))
+            self._subscribers.append((user, events))
+        return events
+
+    def unsubscribe(self, events: queue.SimpleQueue):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[1] is not events]
+
+    def close_streams(self):
+        with self._lock:
+            for _, events in self._subscribers:
+                events.put(None)
+            self._subscribers = []
+
+    def _publish(self, product: str, trades: list[dict] | None = None):
+        for user, events in self._subscribers:
+            if trades:
+                events.put(("trade", json.dumps(trades)))
+            events.put(("order", json.dumps(self.book_event(product, user))))
+        self.events_published += 1
+
+class MarketFlow(threading.Thread):
+    """
+    Background order flow from other participants: at `event_rate` book changes per second it adds,
+    cancels or crosses orders around a random-walking mid, keeping about `depth` levels on each side.
+    New orders rest `half_spread` to `half_spread + depth - 1` ticks away from the mid.
+    """
+
+    def __init__(self, engine: MatchingEngine, event_rate: float = 20.0, depth: int = 5, half_spread: int = 1,
+                 seed: int | None = None):
+        super().__init__(name="market-flow", daemon=True)
+        self.engine = engine
+        self.event_rate = event_rate
+        self.depth = depth
+        self.half_spread = half_spread
+        self._rng = random.Random(seed)
+        self._mids = {symbol: float(product.startingPrice) for symbol, product in engine.products.items()}
+        self._stop = threading.Event()
+
+    def seed_books(self):
+        for symbol in self.engine.products:
+            for _ in range(self.depth):
+                self._add(symbol, "BUY")
+                self._add(symbol, "SELL")
+
+    def _add(self, symbol: str, side: str):
+        tick = self.engine.products[symbol].tickSize
+        offset = (self.half_spread + self._rng.randrange(self.depth)) * tick
+        price = self._mids[symbol] - offset if side == "BUY" else self._mids[symbol] + offset
+        self.engine.submit(MARKET_USER, symbol, side, price, self._rng.randint(1, 20))
+
+    def step(self):
+        symbol = self._rng.choice(list(self.engine.products))
+        tick = self.engine.products[symbol].tickSize
+        roll = self._rng.random()
+        if roll < 0.05:
+            # Mid moves; a marketable order takes out the touch on that side
+            self._mids[symbol] += tick if self._rng.random() < 0.5 else -tick
+            bid, ask = self.engine.best_prices(symbol)
+            if self._rng.random() < 0.5 and ask is not None:
+                self.engine.submit(MARKET_USER, symbol, "BUY", ask, self._rng.randint(1, 5))
+            elif bid is not None:
+                self.engine.submit(MARKET_USER, symbol, "SELL", bid, self._rng.randint(1, 5))
+            return
+
+        side = "BUY" if self._rng.random() < 0.5 else "SELL"
+        n_bids, n_asks = self.engine.depth(symbol)
+        resting = [o for o in self.engine.orders_of(MARKET_USER, symbol) if o.side == side]
+        if (n_bids if side == "BUY" else n_asks) >= self.depth and resting and roll < 0.5:
+            self.engine.cancel(MARKET_USER, self._rng.choice(resting).id)
+        else:
+            self._add(symbol, side)
+
+    def run(self):
+        interval = 1 / self.event_rate
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            self.step()
+            # Absolute deadlines, so the rate holds even when a step is slow
+            next_at += interval
+            self._stop.wait(max(next_at - time.monotonic(), 0))
+
+    def stop(self):
+        self._stop.set()
+
+class _ExchangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "SimExchange"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body=None, headers: dict | None = None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _user(self) -> str | None:
+        user = self.server.tokens.get(self.headers.get("Authorization", ""))
+        if user is None:
+            self._reply(401, {"message": "Unauthorized"})
+        return user
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self._body()
+        self.server.inject_latency()
+        if path == "/api/user/authenticate":
+            token = f"Bearer sim-{body['username']}"
+            self.server.tokens[token] = body["username"]
+            self._reply(200, {}, {"Authorization": token})
+            return
+
+        user = self._user()
+        if user is None:
+            return
+        if path == "/api/order":
+            self.server.record_order(user, "POST", body.get("product"))
+            try:
+                order = self.server.engine.submit(user, body["product"], body["side"], body["price"], body["volume"])
+            except (KeyError, ValueError) as e:
+                self._reply(400, {"message": str(e)})
+                return
+            self._reply(200, order)
+        else:
+            self._reply(404, {"message": f"Unknown path {path}"})
+
+    def do_DELETE(self):
+        url = urlsplit(self.path)
+        self.server.inject_latency()
+        user = self._user()
+        if user is None:
+            return
+        if url.path.startswith("/api/order/"):
+            self.server.record_order(user, "DELETE", None)
+            order = self.server.engine.cancel(user, url.path.rsplit("/", 1)[1])
+            if order is None:
+                self._reply(404, {"message": "Order not found"})
+            else:
+                self._reply(200, order)
+        elif url.path == "/api/order":
+            query = parse_qs(url.query)
+            cancelled = self.server.engine.cancel_at(user, query["product"][0], float(query["price"][0]))
+            self._reply(200, cancelled)
+        else:
+            self._reply(404, {"message": f"Unknown path {url.path}"})
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/api/market/stream":
+            self._stream()
+            return
+
+        self.server.inject_latency()
+        user = self._user()
+        if user is None:
+            return
+        engine = self.server.engine
+        if path == "/api/order/current-user":
+            self._reply(200, [order.to_dict() for order in engine.orders_of(user)])
+        elif path == "/api/position/current-user":
+            self._reply(200, engine.positions_of(user))
+        elif path == "/api/product":
+            self._reply(200, [dict(product) for product in engine.products.values()])
+        else:
+            self._reply(404, {"message": f"Unknown path {path}"})
+
+    def _stream(self):
+        user = self._user()
+        if user is None:
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        # One chunk per event: clients reading a plain body would wait for a full read buffer
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+
+        events = self.server.engine.subscribe(user)
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=KEEPALIVE_S)
+                except queue.Empty:
+                    self._write_chunk(b": keepalive\n\n")
+                    continue
+                if event is None:
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+                name, data = event
+                self._write_chunk(f"event: {name}\ndata: {data}\n\n".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.engine.unsubscribe(events)
+
+    def _write_chunk(self, payload: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+
+class SimExchange(ThreadingHTTPServer):
+    """
+    Local stand-in for the CMI exchange: the REST endpoints `BaseBot` uses and the SSE market stream,
+    backed by a `MatchingEngine` and fed by `MarketFlow`.
+
+    `latency_ms` (+ uniform `jitter_ms`) is added to every REST call. `order_log` keeps the arrival
+    time (monotonic), method and product of every order request from a user other than the market, for load tests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, engine: MatchingEngine | None = None,
+                 event_rate: float = 20.0, depth: int = 5, half_spread: int = 1, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, seed: int | None = None):
+        super().__init__((host, port), _ExchangeHandler)
+        self.engine = engine or MatchingEngine()
+        self.flow = MarketFlow(self.engine, event_rate, depth, half_spread, seed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens: dict[str, str] = {}
+        self.order_log: list[tuple[float, str, str | None]] = []
+        self._rng = random.Random(seed)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def inject_latency(self):
+        delay_ms = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+    def record_order(self, user: str, method: str, product: str | None):
+        if user != MARKET_USER:
+            self.order_log.append((time.monotonic(), method, product))
+
+    def start(self) -> "SimExchange":
+        self.flow.seed_books()
+        self._thread = threading.Thread(target=self.serve_forever, name="sim-exchange", daemon=True)
+        self._thread.start()
+        # With no background flow the books only change through the API (e.g. a load test driving ticks)
+        if self.flow.event_rate > 0:
+            self.flow.start()
+        return self
+
+    def close(self):
+        self.flow.stop()
+        self.engine.close_streams()
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local exchange simulator")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--event-rate", type=float, default=20.0)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--half-spread", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    exchange = SimExchange(port=args.port, event_rate=args.event_rate, depth=args.depth,
+                           half_spread=args.half_spread, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms).start()
+    print(f"Simulated exchange on {exchange.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        exchange.close()
@@ -0,0 +1,357 @@
+import gzip
+import json
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+from urllib.parse import urlsplit
+
+from imcity_template import BaseBot, LocalBook, OrderBook, OrderRequest, json_loads
+from src.sim.exchange import SimOrder, now_iso
+
+_MAGIC = b'SSELOG1\n'
+# Per event: wall-clock receive time (ns), event kind, payload length; then the payload as received
+_RECORD = struct.Struct('<qBI')
+EVENT_KINDS = ('order', 'trade')
+
+def _open(path: str, mode: str):
+    # gzip at level 1 shrinks the repeated full-book snapshots about 10x for little CPU
+    return gzip.open(path, mode, compresslevel=1) if path.endswith('.gz') else open(path, mode)
+
+class StreamRecorder:
+    """
+    Logs the raw SSE events with their receive time, compressed if `path` ends in .gz.
+
+    `record` runs on the SSE reader thread, so it only appends to a buffered file;
+    the buffer is flushed to disk every `flush_interval_s`.
+    """
+
+    def __init__(self, path: str, flush_interval_s: float = 1.0):
+        self.path = path
+        self.flush_interval_s = flush_interval_s
+        self.events = 0
+        self._file = _open(path, 'wb')
+        self._file.write(_MAGIC)
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, event: str, data: str | bytes, received_ns: int | None = None) -> None:
+        if event not in EVENT_KINDS:
+            return
+        payload = data if isinstance(data, bytes) else data.encode()
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(_RECORD.pack(received_ns or time.time_ns(), EVENT_KINDS.index(event), len(payload)))
+            self._file.write(payload)
+            self.events += 1
+            if time.monotonic() - self._flushed_at >= self.flush_interval_s:
+                self._file.flush()
+                self._flushed_at = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self) -> "StreamRecorder":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_stream(path: str) -> Iterator[tuple[int, str, bytes]]:
+    """
+    Yields (received_ns, event, payload) from a `StreamRecorder` log. A torn last record is ignored.
+    """
+    with _open(path, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not an SSE log")
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            received_ns, kind, length = _RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield received_ns, EVENT_KINDS[kind], payload
+
+class ReplayFills:
+    """
+    Fill model for replays. The recorded book is taken as given and our orders never enter it:
+    an order that crosses the latest book fills at once against the other participants' volume,
+    and a resting order fills at its own price when a later book or trade goes through it.
+    Fills come back to the bot as trade events, like on the exchange.
+    """
+
+    def __init__(self, username: str):
+        self.username = username
+        self.books: dict[str, OrderBook] = {}
+        self.positions: dict[str, int] = {}
+        self.cash: dict[str, float] = {}
+        self.fills = 0
+        self._orders: dict[str, SimOrder] = {}
+        self._pending_trades: list[dict] = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _fill(self, order: SimOrder, price: float, volume: int):
+        order.filled += volume
+        signed = volume if order.side == "BUY" else -volume
+        self.positions[order.product] = self.positions.get(order.product, 0) + signed
+        self.cash[order.product] = self.cash.get(order.product, 0.0) - signed * price
+        self.fills += 1
+        buyer, seller = (self.username, "market") if order.side == "BUY" else ("market", self.username)
+        self._pending_trades.append({
+            "timestamp": now_iso(), "product": order.product, "buyer": buyer,
+            "seller": seller, "volume": volume, "price": price,
+        })
+
+    def submit(self, product: str, side: str, price: float, volume: int) -> dict:
+        with self._lock:
+            self._next_id += 1
+            order = SimOrder(f"replay-{self._next_id}", self.username, product, side, float(price), int(volume))
+            book = self.books.get(product)
+            if book is not None:
+                levels = book.asks if side == "BUY" else book.bids
+                for i, level_price in enumerate(levels.prices):
+                    if order.remaining <= 0 or (level_price > price if side == "BUY" else level_price < price):
+                        break
+                    available = levels.volumes[i] - levels.own_volumes[i]
+                    if available > 0:
+                        self._fill(order, level_price, min(order.remaining, available))
+            if order.remaining > 0:
+                self._orders[order.id] = order
+            return order.to_dict()
+
+    def cancel(self, order_id: str) -> dict | None:
+        with self._lock:
+            order = self._orders.pop(order_id, None)
+            return order.to_dict() if order else None
+
+    def cancel_at(self, product: str, price: float) -> list[dict]:
+        with self._lock:
+            cancelled = [o for o in self._orders.values() if o.product == product and o.price == price]
+            for order in cancelled:
+                del self._orders[order.id]
+            return [order.to_dict() for order in cancelled]
+
+    def orders(self) -> list[dict]:
+        with self._lock:
+            return [order.to_dict() for order in self._orders.values()]
+
+    def on_book(self, book: OrderBook) -> None:
+        with self._lock:
+            self.books[book.product] = book
+            best_bid, best_ask = book.best_other_bid_price, book.best_other_ask_price
+            for order in [o for o in self._orders.values() if o.product == book.product]:
+                crossed = best_ask if order.side == "BUY" else best_bid
+                if crossed is not None and (crossed <= order.price if order.side == "BUY" else crossed >= order.price):
+                    self._fill(order, order.price, order.remaining)
+                    del self._orders[order.id]
+
+    def on_trades(self, trades: list[dict]) -> None:
+        with self._lock:
+            for trade in trades:
+                for order in [o for o in self._orders.values() if o.product == trade["product"]]:
+                    if order.side == "BUY" and trade["price"] < order.price or order.side == "SELL" and trade["price"] > order.price:
+                        self._fill(order, order.price, min(order.remaining, trade["volume"]))
+                        if order.remaining <= 0:
+                            del self._orders[order.id]
+
+    def take_trades(self) -> list[dict]:
+        with self._lock:
+            trades, self._pending_trades = self._pending_trades, []
+            return trades
+
+@dataclass
+class _Response:
+    status_code: int
+    body: object = None
+    headers: dict = field(default_factory=dict)
+
+    def json(self):
+        return self.body
+
+    @property
+    def text(self) -> str:
+        return json.dumps(self.body)
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode()
+
+class ReplayTransport:
+    """
+    Drop-in for `imcity_template.Transport` that answers the bot's REST calls from a `ReplayFills`.
+    """
+
+    token = "Bearer replay"
+
+    def __init__(self, fills: ReplayFills):
+        self.fills = fills
+
+    def request(self, method: str, path: str, json=None, params=None, **kwargs) -> _Response:
+        path = urlsplit(path).path
+        if method == "POST" and path == "/api/order":
+            return _Response(200, self.fills.submit(json["product"], json["side"], json["price"], json["volume"]))
+        if method == "DELETE" and path.startswith("/api/order/"):
+            order = self.fills.cancel(path.rsplit("/", 1)[1])
+            return _Response(200, order) if order else _Response(404, {"message": "Order not found"})
+        if method == "DELETE" and path == "/api/order":
+            return _Response(200, self.fills.cancel_at(params["product"], float(params["price"])))
+        if method == "GET" and path == "/api/order/current-user":
+            return _Response(200, self.fills.orders())
+        if method == "GET" and path == "/api/position/current-user":
+            return _Response(200, [
+                {"product": product, "volume": volume, "netPosition": volume}
+                for product, volume in self.fills.positions.items()
+            ])
+        if method == "GET" and path == "/api/product":
+            return _Response(200, [
+                {"symbol": symbol, "tickSize": book.tick_size, "startingPrice": 0, "contractSize": 1}
+                for symbol, book in self.fills.books.items()
+            ])
+        return _Response(404, {"message": f"Unknown path {path}"})
+
+    def get(self, path: str, **kwargs) -> _Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> _Response:
+        return self.request("POST", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> _Response:
+        return self.request("DELETE", path, **kwargs)
+
+    def refresh_token(self, rejected: str | None) -> str:
+        return self.token
+
+    def close(self):
+        pass
+
+class InlineGateway:
+    """
+    Drop-in for `imcity_template.OrderGateway` that makes each call on the calling thread and returns
+    it as an already completed future. Replays have no network to wait on, so the worker pool would
+    only add thread hand-offs to every requote.
+    """
+
+    def __init__(self, bot: BaseBot):
+        self._bot = bot
+
+    @staticmethod
+    def _call(call: Callable, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(call(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def submit(self, order_request: OrderRequest) -> Future:
+        return self._call(self._bot.send_order, order_request)
+
+    def submit_many(self, order_requests: list[OrderRequest]) -> list[Future]:
+        return [self.submit(order_request) for order_request in order_requests]
+
+    def cancel(self, order_id: str) -> Future:
+        return self._call(self._bot.cancel_order_by_id, order_id)
+
+    def cancel_many(self, order_ids: list[str]) -> list[Future]:
+        return [self.cancel(order_id) for order_id in order_ids]
+
+    def close(self):
+        pass
+
+@dataclass
+class ReplayStats:
+    events: int = 0
+    order_events: int = 0
+    trade_events: int = 0
+    fills: int = 0
+    recorded_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    positions: dict = field(default_factory=dict)
+    cash: dict = field(default_factory=dict)
+
+class ReplayEngine:
+    """
+    Feeds a recorded session into a `BaseBot` subclass's `on_orderbook` / `on_trades`, on the calling thread.
+
+    `speed=None` replays as fast as possible; otherwise events are paced at `speed` times the recorded
+    pace (1.0 = wall-clock time). The bot's REST calls go to a `ReplayFills` model instead of the network,
+    made inline by an `InlineGateway` when replaying as fast as possible. `on_clock`, if given, is called
+    with each event's recorded time (ns) before the event is handled, e.g. to publish fair values as of then.
+    """
+
+    def __init__(self, bot: BaseBot, path: str, speed: float | None = None,
+                 on_clock: Callable[[int], object] | None = None):
+        self.bot = bot
+        self.path = path
+        self.speed = speed
+        self.on_clock = on_clock
+        self.fills = ReplayFills(bot.username)
+        self.books: dict[str, LocalBook] = {}
+
+        bot.transport = ReplayTransport(self.fills)
+        if speed is None:
+            bot.gateway.close()
+            bot.gateway = InlineGateway(bot)
+
+    def run(self) -> ReplayStats:
+        stats = ReplayStats()
+        started = time.perf_counter()
+        first_ns = None
+        last_ns = None
+
+        for received_ns, event, payload in read_stream(self.path):
+            if first_ns is None:
+                first_ns = received_ns
+            last_ns = received_ns
+            if self.speed:
+                delay = (received_ns - first_ns) / 1e9 / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            if self.on_clock:
+                self.on_clock(received_ns)
+
+            data = json_loads(payload)
+            stats.events += 1
+            if event == "order":
+                stats.order_events += 1
+                symbol = data["productsymbol"]
+                book = self.books.get(symbol)
+                if book is None:
+                    book = self.books[symbol] = LocalBook(symbol, data["tickSize"])
+                view = book.update(data)
+                self.fills.on_book(view)
+                self._deliver_trades()
+                self.bot.on_orderbook(view)
+            else:
+                stats.trade_events += 1
+                trades = data if isinstance(data, list) else [data]
+                self.fills.on_trades(trades)
+                self.bot.orders.on_trades(data)
+                self.bot.positions.on_trades(data)
+                self.bot.on_trades(data)
+            self._deliver_trades()
+
+        stats.fills = self.fills.fills
+        stats.recorded_seconds = (last_ns - first_ns) / 1e9 if first_ns is not None else 0.0
+        stats.wall_seconds = time.perf_counter() - started
+        stats.positions = dict(self.fills.positions)
+        stats.cash = dict(self.fills.cash)
+        return stats
+
+    def _deliver_trades(self):
+        """
+        Hands our own fills to the bot as the exchange would, as a trade event.
+        """
+        trades = self.fills.take_trades()
+        if trades:
+            self.bot.orders.on_trades(trades)
+            self.bot.positions.on_trades(trades)
+            self.bot.on_trades(trades)
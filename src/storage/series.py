@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# One fixed-width record per fair-value estimate and the std of each settlement value around it (NaN if
+# unknown); timestamps are UTC ns since the epoch, so they only ever increase (local time repeats an hour
+# when daylight saving time ends)
+SERIES_DTYPE = np.dtype([('timestamp', '<i8'), ('market5_estimate', '<f8'), ('market6_estimate', '<f8'),
+                         ('market5_std', '<f8'), ('market6_std', '<f8')])
+_ESTIMATES_DTYPE = np.dtype([('timestamp', '<i8'), ('market5_estimate', '<f8'), ('market6_estimate', '<f8')])
+_MAGIC = b'FVSERIES'
+SERIES_VERSION = 3
+# Older versions are still read (with NaN stds), never appended to: version 1 has naive local timestamps,
+# version 2 UTC ones, neither has the stds
+_LOCAL_TIME_VERSION = 1
+_RECORD_DTYPES = {1: _ESTIMATES_DTYPE, 2: _ESTIMATES_DTYPE, SERIES_VERSION: SERIES_DTYPE}
+_HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('record_size', '<u4')])
+HEADER_SIZE = _HEADER.itemsize
+
+def _header(version: int = SERIES_VERSION) -> bytes:
+    return np.array([(_MAGIC, version, _RECORD_DTYPES[version].itemsize)], dtype=_HEADER).tobytes()
+
+def _to_ns(timestamp) -> int:
+    """
+    Epoch ns of `timestamp`; an aware one is converted to UTC, a naive one is taken as UTC already.
+    """
+    return pd.Timestamp(timestamp).value
+
+def series_version(path: str) -> int:
+    """
+    Format version of a series file. Raises ValueError if it is not one.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) == HEADER_SIZE:
+        magic, version, record_size = np.frombuffer(header, dtype=_HEADER)[0]
+        if magic == _MAGIC and version in _RECORD_DTYPES and record_size == _RECORD_DTYPES[version].itemsize:
+            return int(version)
+    raise ValueError(f"{path} is not a series file")
+
+class SeriesWriter:
+    """
+    Append-only writer of `SERIES_DTYPE` records.
+
+    Appends are buffered and fsynced every `fsync_every` records or `fsync_interval_s` seconds,
+    whichever comes first, so a crash loses at most one batch and never the history before it.
+    A torn record left at the end by a crash is cut off when the file is opened again.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 16, fsync_interval_s: float = 5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval_s = fsync_interval_s
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+        self._file = open(path, 'a+b')
+        size = self._file.seek(0, os.SEEK_END)
+        if size == 0:
+            self._file.write(_header())
+            self.sync()
+            return
+
+        self._file.seek(0)
+        if self._file.read(HEADER_SIZE) != _header():
+            self._file.close()
+            raise ValueError(f"{path} is not a version {SERIES_VERSION} series file")
+        torn = (size - HEADER_SIZE) % SERIES_DTYPE.itemsize
+        if torn:
+            self._file.truncate(size - torn)
+
+    def append(self, m5_est: float, m6_est: float, m5_std: float = np.nan, m6_std: float = np.nan,
+               timestamp: datetime | None = None) -> None:
+        """
+        Appends one record, stamped now unless `timestamp` is given (naive means UTC).
+        """
+        ns = time.time_ns() if timestamp is None else _to_ns(timestamp)
+        record = np.array([(ns, m5_est, m6_est, m5_std, m6_std)], dtype=SERIES_DTYPE)
+        with self._lock:
+            self._file.write(record.tobytes())
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._synced_at >= self.fsync_interval_s:
+                self._sync()
+
+    def append_many(self, records: np.ndarray) -> None:
+        with self._lock:
+            self._file.write(records.astype(SERIES_DTYPE, copy=False).tobytes())
+            self._sync()
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._file.flush()
+            return (os.fstat(self._file.fileno()).st_size - HEADER_SIZE) // SERIES_DTYPE.itemsize
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def __enter__(self) -> "SeriesWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_series(path: str, start=None, end=None) -> np.ndarray:
+    """
+    Records with start <= timestamp <= end (either bound optional) as a `SERIES_DTYPE` array.
+    The file is memory-mapped and the range found by binary search, so only that range is read.
+    Timestamps and bounds are UTC (naive bounds are taken as UTC), except in version 1 files, whose
+    timestamps and bounds are naive local time. Files older than version 3 read with NaN stds.
+    """
+    dtype = _RECORD_DTYPES[series_version(path)]
+    size = os.path.getsize(path)
+    count = (size - HEADER_SIZE) // dtype.itemsize
+    if count <= 0:
+        return np.empty(0, dtype=SERIES_DTYPE)
+
+    records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+    timestamps = records['timestamp']
+    lo = 0 if start is None else int(np.searchsorted(timestamps, _to_ns(start), side='left'))
+    hi = count if end is None else int(np.searchsorted(timestamps, _to_ns(end), side='right'))
+    if dtype == SERIES_DTYPE:
+        return np.array(records[lo:hi])
+    result = np.empty(hi - lo, dtype=SERIES_DTYPE)
+    for name in SERIES_DTYPE.names:
+        result[name] = records[name][lo:hi] if name in dtype.names else np.nan
+    return result
+
+def read_series_frame(path: str, start=None, end=None) -> pd.DataFrame:
+    """
+    `read_series` as a DataFrame indexed by timestamp: UTC-aware, or naive local time for a version 1 file.
+    Convert with `tz_convert` for display.
+    """
+    records = read_series(path, start, end)
+    index = pd.DatetimeIndex(records['timestamp'].view('datetime64[ns]'), name='timestamp')
+    if series_version(path) != _LOCAL_TIME_VERSION:
+        index = index.tz_localize('UTC')
+    return pd.DataFrame({name: records[name] for name in SERIES_DTYPE.names[1:]}, index=index)
+
+def _local_to_utc_ns(timestamp: datetime) -> int:
+    # Naive local time of this machine; in the repeated hour at the end of daylight saving time, the first one
+    return _to_ns(timestamp.astimezone())
+
+def _import(records: np.ndarray, path: str) -> int:
+    if os.path.exists(path) and os.path.getsize(path) > HEADER_SIZE:
+        raise FileExistsError(f"{path} already holds records")
+    records.sort(order='timestamp', kind='stable')
+    with SeriesWriter(path) as writer:
+        writer.append_many(records)
+    return len(records)
+
+def import_json_series(json_path: str, path: str) -> int:
+    """
+    One-time import of the old `add_to_series` JSON history into a new series file. Returns the number of records.
+    Its naive timestamps are taken as local time of this machine, which wrote them.
+    """
+    with open(json_path) as f:
+        entries = json.load(f)
+
+    records = np.array(
+        [(_local_to_utc_ns(datetime.fromisoformat(e['timestamp'])), e['market5_estimate'], e['market6_estimate'],
+          np.nan, np.nan) for e in entries],
+        dtype=SERIES_DTYPE,
+    )
+    return _import(records, path)
+
+def import_old_series(old_path: str, path: str) -> int:
+    """
+    One-time import of an older series file into a new one, with NaN stds. The naive timestamps of a
+    version 1 file are converted like `import_json_series` does.
+    """
+    records = read_series(old_path)
+    if series_version(old_path) == _LOCAL_TIME_VERSION:
+        for record in records:
+            record['timestamp'] = _local_to_utc_ns(pd.Timestamp(record['timestamp']).to_pydatetime())
+    return _import(records, path)
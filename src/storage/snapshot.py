@@ -0,0 +1,80 @@
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.runtime.runtime import FairValues
+
+_VERSION = 1
+# Order of the fair-value fields in the snapshot's `fair_values` array
+_FAIR_VALUE_FIELDS = ('m5', 'm6', 'm5_std', 'm6_std', 'timestamp')
+
+@dataclass(frozen=True)
+class WarmStart:
+    """
+    State of the last successful refresh: the parsed schedules and the fair values computed from them.
+    `saved_at` is the wall-clock time of the save; the fair values keep their own timestamp.
+    """
+    arrivals: pd.DataFrame
+    departures: pd.DataFrame
+    fair_values: FairValues
+    saved_at: float
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.fair_values.timestamp
+
+def _schedule_arrays(schedule_df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    if schedule_df.empty:
+        return np.empty(0, dtype='<U1'), np.empty(0, dtype=np.int64)
+    flight_nums = schedule_df['flight_num'].to_numpy(dtype=str)
+    expected_times = schedule_df.index.values.astype('datetime64[ns]').view(np.int64)
+    return flight_nums, expected_times
+
+def _schedule_df(flight_nums: np.ndarray, expected_times: np.ndarray) -> pd.DataFrame:
+    if not len(flight_nums):
+        return pd.DataFrame()
+    # Same layout as `columns_to_schedule_df`, already sorted when it was saved
+    index = pd.to_datetime(expected_times.view('datetime64[ns]')).rename('expected_time')
+    return pd.DataFrame({'flight_num': flight_nums.astype(object)}, index=index)
+
+def save_snapshot(path: str, arrivals: pd.DataFrame, departures: pd.DataFrame, fair_values: FairValues) -> None:
+    """
+    Writes the schedules and fair values as an uncompressed .npz (plain arrays, no pickles).
+    The file is written next to `path` and renamed over it, so a crash never leaves a torn snapshot.
+    """
+    arrival_flights, arrival_times = _schedule_arrays(arrivals)
+    departure_flights, departure_times = _schedule_arrays(departures)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            version=np.int64(_VERSION),
+            saved_at=np.float64(time.time()),
+            fair_values=np.array([getattr(fair_values, name) for name in _FAIR_VALUE_FIELDS], dtype=np.float64),
+            arrival_flights=arrival_flights,
+            arrival_times=arrival_times,
+            departure_flights=departure_flights,
+            departure_times=departure_times,
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_snapshot(path: str) -> WarmStart | None:
+    """
+    The snapshot at `path`, or None if there is none. Raises ValueError for a file of another version.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if int(data['version']) != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} snapshot")
+        return WarmStart(
+            arrivals=_schedule_df(data['arrival_flights'], data['arrival_times']),
+            departures=_schedule_df(data['departure_flights'], data['departure_times']),
+            fair_values=FairValues(**dict(zip(_FAIR_VALUE_FIELDS, data['fair_values'].tolist()))),
+            saved_at=float(data['saved_at']),
+        )
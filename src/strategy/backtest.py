@@ -0,0 +1,269 @@
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.sim.replay import read_stream
+from src.storage.series import read_series_frame
+from src.strategy.quoting import QuoteParams, quote_arrays
+
+# Fair-value series column of each quoted product, and the column of its settlement std
+FAIR_VALUE_COLUMNS = {'5_Flights': 'market5_estimate', '6_Airport': 'market6_estimate'}
+FAIR_STD_COLUMNS = {'5_Flights': 'market5_std', '6_Airport': 'market6_std'}
+
+@dataclass(frozen=True)
+class ProductTape:
+    """
+    One product's recorded market: the top of book of other participants at every book event
+    (NaN for an empty side) and the trades, all timestamped in ns since the epoch.
+    """
+    timestamp: np.ndarray
+    best_bid: np.ndarray
+    best_ask: np.ndarray
+    bid_volume: np.ndarray
+    ask_volume: np.ndarray
+    trade_timestamp: np.ndarray
+    trade_price: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+def _top(levels: dict, descending: bool) -> tuple[float, int]:
+    best, volume = np.nan, 0
+    for price, level in levels.items():
+        other = level["marketVolume"] - level["userVolume"]
+        if other > 0:
+            price = float(price)
+            if volume == 0 or (price > best if descending else price < best):
+                best, volume = price, other
+    return best, volume
+
+def load_tape(path: str) -> dict[str, ProductTape]:
+    """
+    Reads a `StreamRecorder` log into one `ProductTape` per product.
+    """
+    books: dict[str, list] = {}
+    trades: dict[str, list] = {}
+    for received_ns, event, payload in read_stream(path):
+        data = json.loads(payload)
+        if event == "order":
+            bid, bid_volume = _top(data["buyOrders"], True)
+            ask, ask_volume = _top(data["sellOrders"], False)
+            books.setdefault(data["productsymbol"], []).append((received_ns, bid, ask, bid_volume, ask_volume))
+        else:
+            for trade in data if isinstance(data, list) else [data]:
+                trades.setdefault(trade["product"], []).append((received_ns, trade["price"]))
+
+    tapes = {}
+    for product, rows in books.items():
+        timestamp, bid, ask, bid_volume, ask_volume = (np.array(column) for column in zip(*rows))
+        product_trades = trades.get(product, [])
+        tapes[product] = ProductTape(
+            timestamp=timestamp.astype(np.int64),
+            best_bid=bid.astype(np.float64),
+            best_ask=ask.astype(np.float64),
+            bid_volume=bid_volume.astype(np.int64),
+            ask_volume=ask_volume.astype(np.int64),
+            trade_timestamp=np.array([t for t, _ in product_trades], dtype=np.int64),
+            trade_price=np.array([p for _, p in product_trades], dtype=np.float64),
+        )
+    return tapes
+
+def load_fair_values(path: str, tz: str = 'UTC') -> pd.DataFrame:
+    """
+    Fair-value history from the series file, or from the old JSON history, indexed by naive UTC.
+    Series files store UTC; the naive timestamps of the JSON history and of version 1 series files are
+    taken to be in `tz` (the clock of the machine that wrote them).
+    """
+    if path.endswith('.json'):
+        frame = pd.read_json(path, convert_dates=['timestamp']).set_index('timestamp').sort_index()
+    else:
+        frame = read_series_frame(path)
+    if frame.index.tz is None:
+        frame.index = frame.index.tz_localize(tz)
+    frame.index = frame.index.tz_convert('UTC').tz_localize(None)
+    return frame
+
+def align_fair_values(tapes: dict[str, ProductTape], fair_values: pd.DataFrame,
+                      columns: dict[str, str] = FAIR_VALUE_COLUMNS) -> dict[str, np.ndarray]:
+    """
+    For every book event, the latest fair value published before it (NaN before the first one).
+    With `columns=FAIR_STD_COLUMNS`, the std published with it instead (NaN where none was recorded).
+    """
+    fair_ns = fair_values.index.values.astype('datetime64[ns]').view(np.int64)
+    aligned = {}
+    for product, tape in tapes.items():
+        column = columns.get(product)
+        values = np.full(len(tape), np.nan)
+        if column in fair_values and len(fair_ns):
+            i = np.searchsorted(fair_ns, tape.timestamp, side='right') - 1
+            values[i >= 0] = fair_values[column].to_numpy(np.float64)[i[i >= 0]]
+        aligned[product] = values
+    return aligned
+
+def _interval_trade_extremes(tape: ProductTape) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Lowest and highest trade price after each book event and up to the next one (NaN if none).
+    """
+    n = len(tape)
+    low = np.full(n, np.nan)
+    high = np.full(n, np.nan)
+    if not len(tape.trade_timestamp):
+        return low, high
+    starts = np.searchsorted(tape.trade_timestamp, tape.timestamp, side='right')
+    ends = np.append(starts[1:], len(tape.trade_timestamp))
+    has_trades = ends > starts
+    if has_trades.any():
+        # Empty intervals are skipped, so each reduction runs exactly to its interval's end
+        low[has_trades] = np.minimum.reduceat(tape.trade_price, starts[has_trades])
+        high[has_trades] = np.maximum.reduceat(tape.trade_price, starts[has_trades])
+    return low, high
+
+def _simulate(tape: ProductTape, fair_value: np.ndarray, fair_std: np.ndarray, params: QuoteParams,
+              trade_low: np.ndarray, trade_high: np.ndarray) -> dict:
+    """
+    Quotes every tick as `CustomBot` does and fills the quote against the tape, all ticks at once.
+
+    The bot replaces its order whenever the quote changes and sends a new one after a fill, so the
+    order resting after tick i is always tick i's quote and the ticks can be evaluated independently
+    (which leaves out `inventory_skew`, as it makes each quote depend on the fills before it):
+    it takes the touch if it crosses it, and the rest fills at its own price if the next book
+    or a trade before it goes through that price. An unknown (NaN) std quotes `min_spread` alone.
+    """
+    valid, is_buy, price = quote_arrays(tape.best_bid, tape.best_ask, fair_value, np.nan_to_num(fair_std), params)
+    valid &= ~np.isnan(fair_value)
+
+    touch = np.where(is_buy, tape.best_ask, tape.best_bid)
+    touch_volume = np.where(is_buy, tape.ask_volume, tape.bid_volume)
+    with np.errstate(invalid='ignore'):
+        crosses = valid & np.where(is_buy, price >= touch, price <= touch)
+        aggressive = np.where(crosses, np.minimum(params.volume, touch_volume), 0)
+        resting = np.where(valid, params.volume - aggressive, 0)
+
+        next_bid = np.append(tape.best_bid[1:], np.nan)
+        next_ask = np.append(tape.best_ask[1:], np.nan)
+        through = np.where(
+            is_buy,
+            (next_ask <= price) | (trade_low < price),
+            (next_bid >= price) | (trade_high > price),
+        )
+    passive = np.where(through, resting, 0)
+
+    sign = np.where(is_buy, 1, -1)
+    filled = aggressive + passive
+    position = np.cumsum(sign * filled)
+    cash = -float(np.sum(np.where(aggressive > 0, sign * aggressive * touch, 0.0))
+                  + np.sum(np.where(passive > 0, sign * passive * price, 0.0)))
+
+    changed = np.ones(len(tape), dtype=bool)
+    changed[1:] = (price[1:] != price[:-1]) | (is_buy[1:] != is_buy[:-1]) | ~valid[:-1] | (filled[:-1] > 0)
+    sent = valid & changed
+
+    mids = (tape.best_bid + tape.best_ask) / 2
+    marks = mids[~np.isnan(mids)]
+    final_position = int(position[-1]) if len(position) else 0
+    return {
+        "pnl": cash + final_position * (marks[-1] if len(marks) else 0.0),
+        "orders": int(sent.sum()),
+        "fills": int((filled > 0).sum()),
+        "traded_volume": int(filled.sum()),
+        "inventory": final_position,
+        "max_inventory": int(np.abs(position).max()) if len(position) else 0,
+    }
+
+def run_backtest(tapes: dict[str, ProductTape], fair_values: dict[str, np.ndarray], params: QuoteParams,
+                 trade_extremes: dict[str, tuple[np.ndarray, np.ndarray]] | None = None,
+                 fair_stds: dict[str, np.ndarray] | None = None) -> dict:
+    """
+    PnL (marked at the last mid), fill rate and inventory of one parameter set, in total and per product.
+    `fair_stds` are aligned like `fair_values` (see `align_fair_values`); without them every std is 0.
+    """
+    fair_stds = fair_stds or {product: np.zeros(len(tape)) for product, tape in tapes.items()}
+    trade_extremes = trade_extremes or {product: _interval_trade_extremes(tape) for product, tape in tapes.items()}
+    result = asdict(params)
+    totals = {"pnl": 0.0, "orders": 0, "fills": 0, "traded_volume": 0, "max_inventory": 0}
+    for product, tape in tapes.items():
+        stats = _simulate(tape, fair_values[product], fair_stds[product], params, *trade_extremes[product])
+        totals["pnl"] += stats["pnl"]
+        totals["orders"] += stats["orders"]
+        totals["fills"] += stats["fills"]
+        totals["traded_volume"] += stats["traded_volume"]
+        totals["max_inventory"] = max(totals["max_inventory"], stats["max_inventory"])
+        result[f"pnl_{product}"] = stats["pnl"]
+        result[f"inventory_{product}"] = stats["inventory"]
+    result.update(totals)
+    result["fill_rate"] = totals["fills"] / totals["orders"] if totals["orders"] else 0.0
+    return result
+
+def grid(**values) -> list[QuoteParams]:
+    """
+    Every combination of the given `QuoteParams` field values, e.g. grid(min_spread=[...], volume=[1, 2]).
+    """
+    return [QuoteParams(**dict(zip(values, combination))) for combination in itertools.product(*values.values())]
+
+# Set once per worker process, so the tapes are not pickled with every task
+_worker_state = None
+
+def _init_worker(tapes, fair_values, fair_stds=None):
+    global _worker_state
+    trade_extremes = {product: _interval_trade_extremes(tape) for product, tape in tapes.items()}
+    _worker_state = (tapes, fair_values, trade_extremes, fair_stds)
+
+def _run_chunk(params_list: list[QuoteParams]) -> list[dict]:
+    tapes, fair_values, trade_extremes, fair_stds = _worker_state
+    return [run_backtest(tapes, fair_values, params, trade_extremes, fair_stds) for params in params_list]
+
+def sweep(tapes: dict[str, ProductTape], fair_values: dict[str, np.ndarray], params_list: list[QuoteParams],
+          processes: int | None = None, fair_stds: dict[str, np.ndarray] | None = None) -> pd.DataFrame:
+    """
+    Backtests every parameter set on a process pool and returns the results, best PnL first.
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes <= 1:
+        _init_worker(tapes, fair_values, fair_stds)
+        results = _run_chunk(params_list)
+    else:
+        # A few chunks per worker keeps them busy without paying task overhead per configuration
+        size = max(1, len(params_list) // (processes * 4))
+        chunks = [params_list[i:i + size] for i in range(0, len(params_list), size)]
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(tapes, fair_values, fair_stds)) as pool:
+            results = [result for chunk in pool.map(_run_chunk, chunks) for result in chunk]
+    return pd.DataFrame(results).sort_values('pnl', ascending=False, ignore_index=True)
+
+# min_spread in price units; the half spread is max(min_spread, spread_per_std * fair std), so with the
+# recorded stds (m6 about 36) spread_per_std sets most quotes. inventory_skew (price units per contract)
+# stays at 0: `_simulate` cannot model it
+DEFAULT_GRID = dict(
+    min_spread=[0.0, 1.0, 2.0, 5.0, 10.0, 20.0],
+    spread_per_std=[0.0, 0.1, 0.25, 0.5, 0.75, 1.0],
+    fair_weight=[0.0, 0.25, 0.5, 0.75, 0.9],
+    volume=[1, 2, 5],
+)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parameter sweep of the quote over a recorded session")
+    parser.add_argument("books", help="SSE log written by src.sim.replay.StreamRecorder")
+    parser.add_argument("fair_values", help="price_estimates_series.bin (or the old .json)")
+    parser.add_argument("--tz", default="UTC",
+                        help="time zone of naive fair-value timestamps (old JSON history and version 1 series files only)")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    tapes = load_tape(args.books)
+    fair_values = load_fair_values(args.fair_values, args.tz)
+    aligned = align_fair_values(tapes, fair_values)
+    aligned_stds = align_fair_values(tapes, fair_values, FAIR_STD_COLUMNS)
+    if not any(np.isfinite(stds).any() for stds in aligned_stds.values()):
+        print("No fair-value stds in this history (recorded from series version 3 on): quoting min_spread alone")
+    results = sweep(tapes, aligned, grid(**DEFAULT_GRID), args.processes, aligned_stds)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results.head(args.top))
@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+@dataclass(frozen=True)
+class QuoteParams:
+    """
+    Parameters of the single-order quote.
+    The quote is centred on a blend of the book mid and the fair value (`fair_weight` of the latter)
+    and rests a half spread of at least `min_spread`, or `spread_per_std` settlement stds if wider,
+    on the passive side: below that centre for a buy, above it for a sell. Spreads are in price units,
+    as market 6 settles around zero where a spread relative to the price would blow up.
+    With `inventory_skew` the fair value is moved against the current position by that many price units
+    per contract held, so a long position leans towards selling, and lower, and a short one towards buying.
+    """
+    min_spread: float = 2.0
+    spread_per_std: float = 0.5
+    fair_weight: float = 0.5
+    volume: int = 1
+    inventory_skew: float = 0.0
+
+def quote(best_bid: float, best_ask: float, fair_value: float, fair_std: float,
+          params: QuoteParams = QuoteParams(), position: int = 0) -> tuple[bool, int, float] | None:
+    """
+    The order to rest as (is_buy, price, mean_price), or None when the book gives no usable mid.
+    """
+    if best_bid is None or best_ask is None or best_bid >= best_ask:
+        return None
+
+    half_spread = max(params.min_spread, params.spread_per_std * fair_std)
+    fair_value -= params.inventory_skew * position
+    mid = (best_bid + best_ask) / 2
+    mean_price = (1 - params.fair_weight) * mid + params.fair_weight * fair_value
+
+    is_buy = fair_value > mean_price
+    price = round(mean_price - half_spread if is_buy else mean_price + half_spread)
+    return is_buy, price, mean_price
+
+def quote_arrays(best_bid: np.ndarray, best_ask: np.ndarray, fair_value: np.ndarray, fair_std: np.ndarray,
+                 params: QuoteParams = QuoteParams(), position: np.ndarray | int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    `quote` over whole arrays of ticks. Returns (valid, is_buy, price); NaN bids/asks mark an empty side.
+    """
+    valid = ~np.isnan(best_bid) & ~np.isnan(best_ask) & (best_bid < best_ask)
+
+    half_spread = np.maximum(params.min_spread, params.spread_per_std * fair_std)
+    fair_value = fair_value - params.inventory_skew * position
+    mid = (best_bid + best_ask) / 2
+    mean_price = (1 - params.fair_weight) * mid + params.fair_weight * fair_value
+
+    is_buy = fair_value > mean_price
+    # np.round rounds halves to even like the built-in round
+    price = np.round(np.where(is_buy, mean_price - half_spread, mean_price + half_spread))
+    return valid, is_buy, price
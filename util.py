@@ -1,42 +1,63 @@
-import json
-from datetime import datetime
 import os # To check if the file exists
+import threading
 
-TIME_SERIES_FILE = "price_estimates_series.json"
+from src.storage.series import SERIES_VERSION, SeriesWriter, import_json_series, import_old_series, series_version
+from src.storage.snapshot import WarmStart, load_snapshot, save_snapshot
 
-def add_to_series(m5_est: float, m6_est: float):
+# History written by earlier versions; imported into TIME_SERIES_FILE on first use
+JSON_SERIES_FILE = "price_estimates_series.json"
+TIME_SERIES_FILE = "price_estimates_series.bin"
+# A TIME_SERIES_FILE in an older format is kept here (with its version) once imported
+OLD_SERIES_FILE = "price_estimates_series.v{version}.bin"
+# Schedules and fair values of the last refresh, loaded on startup. Only useful on storage that outlives
+# the process: a Heroku dyno's filesystem is wiped on every restart, so point WARM_START_PATH at a
+# persistent volume there. The default (relative to the working directory) is for local runs.
+SNAPSHOT_FILE = os.environ.get("WARM_START_PATH", "warm_start.npz")
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_series_writer() -> SeriesWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            if os.path.exists(TIME_SERIES_FILE) and (version := series_version(TIME_SERIES_FILE)) < SERIES_VERSION:
+                old_file = OLD_SERIES_FILE.format(version=version)
+                os.replace(TIME_SERIES_FILE, old_file)
+                count = import_old_series(old_file, TIME_SERIES_FILE)
+                print(f"Imported {count} entries from {old_file} into {TIME_SERIES_FILE} (version {SERIES_VERSION})")
+            elif not os.path.exists(TIME_SERIES_FILE) and os.path.exists(JSON_SERIES_FILE):
+                count = import_json_series(JSON_SERIES_FILE, TIME_SERIES_FILE)
+                print(f"Imported {count} entries from {JSON_SERIES_FILE} into {TIME_SERIES_FILE}")
+            _writer = SeriesWriter(TIME_SERIES_FILE)
+    return _writer
+
+def add_to_series(m5_est: float, m6_est: float, m5_std: float = float('nan'), m6_std: float = float('nan')):
     """
-    Creates the JSON file if it doesn't exist, and appends a new entry 
-    with the current datetime and the two estimates.
+    Appends a new entry with the current time (UTC), the two estimates and their stds to the series file.
+    O(1) per call; read the history back with `src.storage.series.read_series_frame`.
     """
-    
-    # 1. Prepare the new data entry
-    timestamp = datetime.now().isoformat()
-    new_entry = {
-        "timestamp": timestamp,
-        "market5_estimate": m5_est,
-        "market6_estimate": m6_est
-    }
-
-    # 2. Check if file exists and load existing data or initialize new data
-    data = []
-    if os.path.exists(TIME_SERIES_FILE):
-        try:
-            with open(TIME_SERIES_FILE, 'r') as f:
-                data = json.load(f)
-        except json.JSONDecodeError:
-            # Handle empty or invalid JSON file by starting fresh
-            print(f"Warning: Could not decode JSON from {TIME_SERIES_FILE}. Starting new series.")
-            data = []
-    
-    # 3. Append the new entry
-    data.append(new_entry)
-    
-    # 4. Write all data back to the file
     try:
-        with open(TIME_SERIES_FILE, 'w') as f:
-            # Use indent for readability in the file
-            json.dump(data, f, indent=4)
-        print(f"Successfully appended new data point to {TIME_SERIES_FILE}")
+        get_series_writer().append(m5_est, m6_est, m5_std, m6_std)
+    except Exception as e:
+        print(f"Error writing to file {TIME_SERIES_FILE}: {e}")
+
+def close_series():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+def save_warm_start(arrivals, departures, fair_values):
+    try:
+        save_snapshot(SNAPSHOT_FILE, arrivals, departures, fair_values)
+    except Exception as e:
+        print(f"Error writing to file {SNAPSHOT_FILE}: {e}")
+
+def load_warm_start() -> WarmStart | None:
+    try:
+        return load_snapshot(SNAPSHOT_FILE)
     except Exception as e:
-        print(f"Error writing to file {TIME_SERIES_FILE}: {e}")
\ No newline at end of file
+        print(f"Error reading file {SNAPSHOT_FILE}: {e}")
+        return None